@@ -0,0 +1,163 @@
+"""
+Admission control & load shedding for the pricing service.
+
+During a spike, answering every request late is worse than
+answering most of them on time & turning the rest away at once.
+An AdmissionController decides, before a request is priced,
+whether to take it:
+
+    503 Service Unavailable  too many requests are in flight
+                             (read, but not yet answered)
+                             already, or recent requests took
+                             longer than the latency threshold.
+    429 Too Many Requests    the client has used up its token
+                             bucket, i.e. sent more than its rate.
+
+Both checks are a few integer & float operations, & a rejected
+request never touches the index; so a rejection is cheap.
+"""
+
+
+# import necessary modules
+import time
+from collections import OrderedDict
+
+
+# each request moves the mean latency this fraction of the way
+# towards its own latency.
+LATENCY_WEIGHT = 0.05
+
+
+class TokenBucket(object):
+    def __init__(self, rate, burst, now):
+        """
+        Initialize a full bucket that refills at rate tokens per
+        second, & holds at most burst tokens.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+
+    def take(self, now):
+        """
+        Take one token, refilling the bucket first for the time
+        passed since it was last used.
+        Return True if there was a token to take.
+        ~~~
+        runtime: O(1)
+        """
+        tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if tokens < 1:
+            self.tokens = tokens
+            return False
+        self.tokens = tokens - 1
+        return True
+
+
+class AdmissionController(object):
+    def __init__(self, rate=100.0, burst=200, max_in_flight=1000,
+                 max_latency=0.5, max_clients=100000, clock=time.monotonic):
+        """
+        Initialize admission control for a service.
+        rate & burst set each client's token bucket, in requests
+        per second; None turns rate limits off. max_in_flight
+        bounds the queue of requests admitted but not yet
+        released, & max_latency (in seconds) sheds load once the
+        recent mean latency of requests, from admission to
+        release, passes it; None turns either check off.
+        At most max_clients buckets are kept, dropping the least
+        recently seen client's first.
+        """
+        if rate is not None and (rate <= 0 or burst < 1):
+            raise ValueError("rate must be positive, & burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.max_latency = max_latency
+        self.max_clients = max_clients
+        self.clock = clock
+
+        # {client: TokenBucket}, least recently seen first.
+        self.buckets = OrderedDict()
+
+        self.in_flight = 0
+
+        # a moving average of request latency, in seconds.
+        self.latency = 0.0
+
+        self.admitted = 0
+        self.rate_limited = 0
+        self.shed = 0
+
+
+    def __repr__(self):
+        """
+        Visually represent this controller using a string.
+        Return the formatted string.
+        """
+        return (f"AdmissionController({self.in_flight} in flight, "
+                f"{self.latency * 1000:.2f} ms mean latency)")
+
+
+    def stats(self):
+        """
+        Return a dictionary of the controller's counters.
+        """
+        return {
+            "in_flight": self.in_flight,
+            "latency_ms": round(self.latency * 1000, 3),
+            "clients": len(self.buckets),
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "shed": self.shed,
+        }
+
+
+    def admit(self, client):
+        """
+        Decide whether to serve a request of client (an API key
+        or address). An admitted request must be released once
+        it has been answered.
+        Return None if it is admitted, or else the (status,
+        payload) to reject it with.
+        ~~~
+        runtime: O(1)
+        """
+        if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+            self.shed += 1
+            return 503, {"error": "too many requests in flight"}
+        if self.max_latency is not None and self.latency > self.max_latency:
+            # a request is still let in when none are in flight,
+            # so the average can come back down after the spike.
+            if self.in_flight:
+                self.shed += 1
+                return 503, {"error": "service is overloaded"}
+
+        if self.rate is not None:
+            now = self.clock()
+            bucket = self.buckets.get(client)
+            if bucket is None:
+                bucket = self.buckets[client] = TokenBucket(
+                    self.rate, self.burst, now)
+                if len(self.buckets) > self.max_clients:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(client)
+            if not bucket.take(now):
+                self.rate_limited += 1
+                return 429, {"error": "rate limit exceeded"}
+
+        self.in_flight += 1
+        self.admitted += 1
+        return None
+
+
+    def release(self, latency):
+        """
+        Mark an admitted request as answered after latency seconds.
+        """
+        self.in_flight -= 1
+        self.latency += (latency - self.latency) * LATENCY_WEIGHT
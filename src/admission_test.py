@@ -0,0 +1,73 @@
+from admission import AdmissionController, TokenBucket
+import unittest
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class AdmissionTest(unittest.TestCase):
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=2, burst=3, now=0.0)
+        assert [bucket.take(0.0) for _ in range(4)] == [True, True, True, False]
+        # Half a second refills one token at 2 per second
+        assert bucket.take(0.5) and not bucket.take(0.5)
+        # The bucket never holds more than its burst
+        assert sum(bucket.take(100.0) for _ in range(5)) == 3
+
+    def test_rate_limit_per_client(self):
+        clock = FakeClock()
+        admission = AdmissionController(rate=1, burst=2, clock=clock)
+        assert admission.admit('a') is None
+        assert admission.admit('a') is None
+        assert admission.admit('a')[0] == 429
+        # Another client has a bucket of its own
+        assert admission.admit('b') is None
+        clock.now = 1.0
+        assert admission.admit('a') is None
+        assert admission.stats()['rate_limited'] == 1
+
+    def test_max_in_flight(self):
+        admission = AdmissionController(rate=None, max_in_flight=2)
+        assert admission.admit('a') is None
+        assert admission.admit('a') is None
+        assert admission.admit('a')[0] == 503
+        admission.release(0.001)
+        assert admission.admit('a') is None
+        assert admission.stats()['shed'] == 1
+
+    def test_latency_threshold(self):
+        admission = AdmissionController(rate=None, max_latency=0.1)
+        for _ in range(100):
+            admission.admit('a')
+            admission.release(1.0)
+        assert admission.latency > 0.1
+        # One request is still let in, so the average can recover
+        assert admission.admit('a') is None
+        assert admission.admit('b')[0] == 503
+        admission.release(0.0)
+        assert admission.in_flight == 0
+
+    def test_max_clients(self):
+        admission = AdmissionController(max_clients=2)
+        for client in ('a', 'b', 'a', 'c'):
+            admission.admit(client)
+            admission.release(0.0)
+        # b was the least recently seen client
+        assert list(admission.buckets) == ['a', 'c']
+
+    def test_bad_settings(self):
+        with self.assertRaises(ValueError):
+            AdmissionController(rate=0)
+        with self.assertRaises(ValueError):
+            AdmissionController(burst=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
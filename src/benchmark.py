@@ -0,0 +1,906 @@
+"""
+Benchmarks for the route cost lookup engines.
+
+Each benchmark builds an engine from a route list, then
+prices a list of phone numbers with it. Route lists are
+either a data file name (like "route-costs-106000"), or
+"synthetic-N" for N seeded random routes.
+
+usage:
+    python benchmark.py flat route-costs-106000
+    python benchmark.py flat synthetic-10000000
+    python benchmark.py lookup route-costs-106000
+    python benchmark.py batch route-costs-106000
+    python benchmark.py range route-costs-106000
+    python benchmark.py mmap route-costs-106000
+    python benchmark.py parallel route-costs-35000 route-costs-106000
+    python benchmark.py delta route-costs-106000 10 100 1000 10000
+    python benchmark.py ranked route-costs-35000 route-costs-106000
+    python benchmark.py radix route-costs-106000
+    python benchmark.py hash route-costs-106000
+    python benchmark.py parse route-costs-1000000
+    python benchmark.py shards route-costs-1000000
+    python benchmark.py cluster route-costs-106000 route-costs-1000000
+    python benchmark.py microbatch route-costs-106000
+    python benchmark.py admission route-costs-106000
+    python benchmark.py suite results.json
+    python benchmark.py suite results.json route-costs-106000 synthetic-1000000
+    python benchmark.py regress old-results.json new-results.json
+"""
+
+
+# import necessary modules
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+import convert # local module
+import loader # local module
+from decimaltree import DecimalSearchTree
+from fixedpoint import MICROS, parse_micros
+from flattree import FlatDecimalTree
+
+
+def synthetic_routes(count, seed=0):
+    """
+    Generate count random (prefix, price in micro-dollars) routes.
+    Prefixes are 4 to 11 digits long, without the "+".
+    The same seed always generates the same routes.
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        length = rng.randint(4, 11)
+        prefix = str(rng.randint(1, 9)) + "".join(
+            rng.choice("0123456789") for _ in range(length - 1))
+        # a price of whole cents, in micro-dollars.
+        yield prefix, round(rng.random() * 100) * 10000
+
+
+def synthetic_phones(count, seed=0):
+    """
+    Generate count random 11 digit phone numbers.
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield str(rng.randint(10 ** 10, 10 ** 11 - 1))
+
+
+def read_routes(name):
+    """
+    Generate the (prefix, price in micro-dollars) routes of a
+    route list. The "+" is removed from each prefix.
+    """
+    if name.startswith("synthetic-"):
+        yield from synthetic_routes(int(name.split("-")[1]))
+        return
+
+    path = os.path.join(convert.DATA_FOLDER, name + ".txt")
+    with open(path) as file:
+        for line in file:
+            route, price = line.split(",")
+            yield route[1:], parse_micros(price)
+
+
+def read_phones(name):
+    """
+    Return the phone numbers of a data file as a list.
+    The "+" is removed from each number.
+    """
+    if name.startswith("synthetic-"):
+        return list(synthetic_phones(int(name.split("-")[1])))
+
+    path = os.path.join(convert.DATA_FOLDER, name + ".txt")
+    with open(path) as file:
+        return [line.strip()[1:] for line in file if line.strip()]
+
+
+def build(engine_class, routes, carrier="Carrier A"):
+    """
+    Build an engine by inserting every route into it.
+    Return the engine & the build time in seconds.
+    """
+    start = time.perf_counter()
+    engine = engine_class()
+    for prefix, price in routes:
+        engine.insert(prefix, (carrier, price))
+    return engine, time.perf_counter() - start
+
+
+def build_memory(engine_class, routes):
+    """
+    Build an engine while tracing allocations.
+    Return the number of bytes the finished engine holds.
+    """
+    tracemalloc.start()
+    engine, _ = build(engine_class, routes)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del engine
+    return size
+
+
+def lookup_rate(engine, phones):
+    """
+    Price every phone number once.
+    Return the number of lookups per second.
+    """
+    start = time.perf_counter()
+    for phone in phones:
+        engine.get_price(phone)
+    return len(phones) / (time.perf_counter() - start)
+
+
+def compare_flat_tree(route_data, phone_data="phone-numbers-10000"):
+    """
+    Compare the node-per-digit DecimalSearchTree with the
+    array backed FlatDecimalTree on the same route list.
+    """
+    phones = read_phones(phone_data)
+    print(f"routes: {route_data}, phones: {phone_data}")
+    print(f"{'engine':>18} {'build s':>9} {'MB':>9} {'lookups/s':>11}")
+
+    for engine_class in (DecimalSearchTree, FlatDecimalTree):
+        engine, build_time = build(engine_class, read_routes(route_data))
+        rate = lookup_rate(engine, phones)
+        del engine
+        size = build_memory(engine_class, read_routes(route_data))
+        print(f"{engine_class.__name__:>18} {build_time:>9.2f} "
+              f"{size / (1 << 20):>9.1f} {rate:>11.0f}")
+
+
+def recursive_get_price(tree, phone, node="ROOT", best_data=None):
+    """
+    The recursive DecimalSearchTree.get_price we started with.
+    It slices the phone# & recurses once per digit; it is kept
+    here only as a baseline for the lookup benchmark.
+    """
+    if node == "ROOT":
+        node = tree.root
+    if node is None or not phone:
+        return best_data
+    next = node.next[int(phone[0])]
+    if node.data:
+        if not best_data or node.data[1] < best_data[1]:
+            best_data = node.data
+    return recursive_get_price(tree, phone[1:], next, best_data)
+
+
+def compare_lookup(route_data, phone_data="phone-numbers-10000",
+                   rounds=5):
+    """
+    Compare the per lookup latency of the recursive & the
+    iterative DecimalSearchTree.get_price on the same tree.
+    """
+    tree, _ = build(DecimalSearchTree, read_routes(route_data))
+    phones = read_phones(phone_data)
+    print(f"routes: {route_data}, phones: {phone_data}")
+
+    lookups = {
+        "recursive": lambda phone: recursive_get_price(tree, phone),
+        "iterative": tree.get_price,
+    }
+    for name, get_price in lookups.items():
+        # keep the best of a few rounds to hide any noise.
+        best = float("inf")
+        for _ in range(int(rounds)):
+            start = time.perf_counter()
+            for phone in phones:
+                get_price(phone)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:>10}: {best / len(phones) * 1e6:.2f} us/lookup")
+
+
+def compare_batch(route_data, phone_data="phone-numbers-10000",
+                  rounds=5):
+    """
+    Compare pricing numbers one get_price at a time with the
+    sorted, shared walk of price_many, on each tree engine.
+    """
+    phones = read_phones(phone_data)
+    print(f"routes: {route_data}, phones: {phone_data}")
+
+    for engine_class in (DecimalSearchTree, FlatDecimalTree):
+        engine, _ = build(engine_class, read_routes(route_data))
+        lookups = {
+            "get_price": lambda: [engine.get_price(p) for p in phones],
+            "price_many": lambda: engine.price_many(phones),
+        }
+        for name, price_all in lookups.items():
+            best = float("inf")
+            for _ in range(int(rounds)):
+                start = time.perf_counter()
+                price_all()
+                best = min(best, time.perf_counter() - start)
+            print(f"{engine_class.__name__:>18} {name:>10}: "
+                  f"{len(phones) / best:>10.0f} numbers/s")
+
+
+def compare_range(route_data, phone_data="synthetic-1000000"):
+    """
+    Compare the sorted trie walk of FlatDecimalTree.price_many
+    with the vectorized binary search of PrefixRangeIndex.
+    """
+    # numpy is only needed for this benchmark.
+    import numpy as np
+    from rangeindex import PrefixRangeIndex
+
+    phones = read_phones(phone_data)
+    phone_array = np.array(phones)
+    print(f"routes: {route_data}, phones: {phone_data}")
+
+    flat, build_time = build(FlatDecimalTree, read_routes(route_data))
+    print(f"{'FlatDecimalTree':>18} build: {build_time:.2f} s")
+    ranges, build_time = build(PrefixRangeIndex, read_routes(route_data))
+    start = time.perf_counter()
+    ranges._build()
+    build_time += time.perf_counter() - start
+    print(f"{'PrefixRangeIndex':>18} build: {build_time:.2f} s")
+
+    lookups = {
+        "flat price_many": lambda: flat.price_many(phones),
+        "range price_many": lambda: ranges.price_many(phones),
+        "range lookup": lambda: ranges.lookup(phone_array),
+    }
+    for name, price_all in lookups.items():
+        start = time.perf_counter()
+        price_all()
+        rate = len(phones) / (time.perf_counter() - start)
+        print(f"{name:>18}: {rate:>10.0f} numbers/s")
+
+
+def _mapped_worker(path, phones):
+    """
+    Map a saved tree & price every phone number with it.
+    Return the seconds spent mapping, & the lookups per second.
+    """
+    start = time.perf_counter()
+    tree = FlatDecimalTree.load(path)
+    load_time = time.perf_counter() - start
+    return load_time, lookup_rate(tree, phones)
+
+
+def compare_mmap(route_data, phone_data="phone-numbers-10000",
+                 workers=4):
+    """
+    Compare building a FlatDecimalTree in every worker with
+    saving it once, & memory mapping it in every worker.
+    """
+    import tempfile
+
+    phones = read_phones(phone_data)
+    print(f"routes: {route_data}, phones: {phone_data}")
+
+    tree, build_time = build(FlatDecimalTree, read_routes(route_data))
+    print(f"{'build':>10}: {build_time:.3f} s, "
+          f"{lookup_rate(tree, phones):.0f} lookups/s")
+
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "routes.idx")
+    start = time.perf_counter()
+    tree.save(path)
+    print(f"{'save':>10}: {time.perf_counter() - start:.3f} s, "
+          f"{os.path.getsize(path) / (1 << 20):.1f} mb on disk")
+
+    with multiprocessing.Pool(int(workers)) as pool:
+        results = pool.starmap(
+            _mapped_worker, [(path, phones)] * int(workers))
+    for number, (load_time, rate) in enumerate(results):
+        print(f"{'worker ' + str(number):>10}: {load_time:.5f} s to map, "
+              f"{rate:.0f} lookups/s")
+
+    os.remove(path)
+    os.rmdir(folder)
+
+
+def compare_parallel(*route_data):
+    """
+    Time loader.load_parallel with 1, 2, 4 & 8 workers.
+    Every route list given is loaded as a separate carrier.
+    """
+    import loader
+
+    carriers = {}
+    for number, name in enumerate(route_data):
+        carriers[f"Carrier {number}"] = os.path.join(
+            convert.DATA_FOLDER, name + ".txt")
+    print(f"routes: {', '.join(route_data)}, "
+          f"{multiprocessing.cpu_count()} cpus")
+
+    start = time.perf_counter()
+    tree = FlatDecimalTree()
+    for carrier, path in carriers.items():
+        loader.load_routes(tree, carrier, path, report_every=0)
+    print(f"{'sequential':>10}: {time.perf_counter() - start:.2f} s")
+
+    for workers in (1, 2, 4, 8):
+        start = time.perf_counter()
+        # small chunks, so even one file keeps 8 workers busy.
+        loader.load_parallel(
+            FlatDecimalTree(), carriers, workers, chunk_size=1 << 20)
+        print(f"{workers:>2} workers: {time.perf_counter() - start:.2f} s")
+
+
+def compare_delta(route_data, *sizes):
+    """
+    Compare rebuilding a CarrierPriceTree with applying just
+    the delta of a carrier's changed route list to it.
+    """
+    import routediff
+    from carriertree import CarrierPriceTree
+
+    sizes = [int(size) for size in sizes] or [10, 100, 1000, 10000]
+    old_table = {}
+    for prefix, price in read_routes(route_data):
+        old_table[prefix] = min(price, old_table.get(prefix, price))
+    print(f"routes: {route_data}, {len(old_table)} prefixes")
+
+    rng = random.Random(0)
+    prefixes = list(old_table)
+    for size in sizes:
+        # change a third, remove a third, & add a third.
+        new_table = dict(old_table)
+        for prefix in rng.sample(prefixes, size * 2 // 3):
+            if rng.random() < 0.5:
+                new_table[prefix] = old_table[prefix] + 10000
+            else:
+                del new_table[prefix]
+        for prefix, price in synthetic_routes(size - size * 2 // 3, size):
+            new_table[prefix] = price
+
+        tree = CarrierPriceTree()
+        for prefix, price in old_table.items():
+            tree.insert(prefix, ("Carrier A", price))
+
+        start = time.perf_counter()
+        delta = routediff.diff_tables(old_table, new_table)
+        diff_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tree.apply_delta("Carrier A", delta)
+        apply_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rebuilt = CarrierPriceTree()
+        for prefix, price in new_table.items():
+            rebuilt.insert(prefix, ("Carrier A", price))
+        rebuild_time = time.perf_counter() - start
+
+        print(f"{size:>8} changes: diff {diff_time:.4f} s, "
+              f"apply {apply_time:.4f} s, rebuild {rebuild_time:.4f} s")
+
+
+def compare_ranked(*route_data):
+    """
+    Compare the single winner FlatDecimalTree with the
+    RankedFlatTree, which keeps every carrier of every prefix.
+    Every route list given is loaded as a separate carrier.
+    """
+    from rankedtree import RankedFlatTree
+
+    phones = read_phones("phone-numbers-10000")
+    print(f"routes: {', '.join(route_data)}")
+    print(f"{'engine':>18} {'build s':>9} {'MB':>9} {'B/entry':>9} "
+          f"{'lookups/s':>11}")
+
+    for engine_class in (FlatDecimalTree, RankedFlatTree):
+        tracemalloc.start()
+        start = time.perf_counter()
+        engine = engine_class()
+        entries = 0
+        for number, name in enumerate(route_data):
+            for prefix, price in read_routes(name):
+                engine.insert(prefix, (f"Carrier {number}", price))
+                entries += 1
+        build_time = time.perf_counter() - start
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        lookups = {"get_price": engine.get_price}
+        if engine_class is RankedFlatTree:
+            lookups["top_k"] = engine.top_k
+        for name, lookup in lookups.items():
+            start = time.perf_counter()
+            for phone in phones:
+                lookup(phone)
+            rate = len(phones) / (time.perf_counter() - start)
+            print(f"{engine_class.__name__:>18} {build_time:>9.2f} "
+                  f"{size / (1 << 20):>9.1f} {size / entries:>9.1f} "
+                  f"{rate:>11.0f}  {name}")
+        del engine
+
+
+def count_nodes(tree):
+    """
+    Return the number of nodes of a node based search tree.
+    """
+    count = 0
+    stack = [tree.root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(child for child in node.next if child)
+    return count
+
+
+def compare_radix(route_data, phone_data="phone-numbers-10000", rounds=5):
+    """
+    Compare the node per digit DecimalSearchTree with the path
+    compressed RadixSearchTree on the same route list.
+    """
+    from radixtree import RadixSearchTree
+
+    phones = read_phones(phone_data)
+    print(f"routes: {route_data}, phones: {phone_data}")
+    print(f"{'engine':>18} {'build s':>9} {'nodes':>10} {'MB':>9} "
+          f"{'us/lookup':>10}")
+
+    for engine_class in (DecimalSearchTree, RadixSearchTree):
+        engine, build_time = build(engine_class, read_routes(route_data))
+        nodes = count_nodes(engine)
+        best = float("inf")
+        for _ in range(int(rounds)):
+            start = time.perf_counter()
+            for phone in phones:
+                engine.get_price(phone)
+            best = min(best, time.perf_counter() - start)
+        del engine
+        size = build_memory(engine_class, read_routes(route_data))
+        print(f"{engine_class.__name__:>18} {build_time:>9.2f} {nodes:>10} "
+              f"{size / (1 << 20):>9.1f} {best / len(phones) * 1e6:>10.2f}")
+
+
+def compare_hash(route_data, phone_data="phone-numbers-10000"):
+    """
+    Compare the trie engines with the length-bucketed hash
+    tables of PrefixHashIndex on the same route list.
+    """
+    from hashindex import PrefixHashIndex
+
+    phones = read_phones(phone_data)
+    print(f"routes: {route_data}, phones: {phone_data}")
+    print(f"{'engine':>18} {'build s':>9} {'MB':>9} {'lookups/s':>11}")
+
+    for engine_class in (DecimalSearchTree, FlatDecimalTree, PrefixHashIndex):
+        engine, build_time = build(engine_class, read_routes(route_data))
+        rate = lookup_rate(engine, phones)
+        del engine
+        size = build_memory(engine_class, read_routes(route_data))
+        print(f"{engine_class.__name__:>18} {build_time:>9.2f} "
+              f"{size / (1 << 20):>9.1f} {rate:>11.0f}")
+
+
+def line_routes(path):
+    """
+    The per line route parser loader.iter_routes started as.
+    It is kept here only as a baseline for the parse benchmark.
+    """
+    with open(path) as file:
+        for line in file:
+            route, comma, price = line.partition(",")
+            if comma:
+                yield route.lstrip("+"), round(float(price) * MICROS)
+
+
+def compare_parse(route_data, rounds=3):
+    """
+    Compare parsing a route file one line at a time with the
+    bulk block parser of loader, with & without inserting the
+    routes into a FlatDecimalTree.
+    """
+    path = os.path.join(convert.DATA_FOLDER, route_data + ".txt")
+    print(f"routes: {route_data}")
+
+    def per_line():
+        prefixes, prices = [], array("I")
+        for prefix, price in line_routes(path):
+            prefixes.append(prefix)
+            prices.append(price)
+
+    def bulk():
+        for prefixes, prices in loader.iter_route_blocks(path):
+            pass
+
+    def per_line_load():
+        tree = FlatDecimalTree()
+        for prefix, price in line_routes(path):
+            tree.insert(prefix, ("Carrier A", price))
+
+    def bulk_load():
+        loader.load_routes(FlatDecimalTree(), "Carrier A", path, 0)
+
+    for name, parse in (("per line", per_line), ("bulk", bulk),
+                        ("per line + tree", per_line_load),
+                        ("bulk + tree", bulk_load)):
+        best = float("inf")
+        for _ in range(int(rounds)):
+            start = time.perf_counter()
+            parse()
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:>16}: {best:.3f} s")
+
+
+def compare_shards(route_data, phone_data="phone-numbers-10000",
+                   max_shards=4):
+    """
+    Compare opening one flat index file with opening the same
+    routes split into 2 digit shards, & pricing the numbers of
+    a single region (the most common leading digits) with each.
+    """
+    import shutil
+    import tempfile
+    import shardindex
+    from shardindex import ShardedIndex
+
+    phones = read_phones(phone_data)
+    region = max(set(phone[:2] for phone in phones),
+                 key=[phone[:2] for phone in phones].count)
+    regional = [phone for phone in phones if phone.startswith(region)]
+    carriers = {"Carrier A": os.path.join(convert.DATA_FOLDER, route_data + ".txt")}
+    print(f"routes: {route_data}, phones: {phone_data}, "
+          f"{len(regional)} in region +{region}")
+
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "routes.idx")
+    shards = os.path.join(folder, "shards")
+    sources = list(carriers.values())
+
+    start = time.perf_counter()
+    tree = FlatDecimalTree()
+    loader.load_routes(tree, "Carrier A", sources[0], report_every=0)
+    tree.save(path, sources)
+    del tree
+    print(f"{'one file':>10}: {time.perf_counter() - start:.2f} s to build")
+    start = time.perf_counter()
+    shardindex.build_shards(shards, carriers, 2)
+    print(f"{'shards':>10}: {time.perf_counter() - start:.2f} s to build")
+
+    start = time.perf_counter()
+    tree = FlatDecimalTree.load(path, sources)
+    open_time = time.perf_counter() - start
+    print(f"{'one file':>10}: {open_time * 1000:.2f} ms to open, "
+          f"{lookup_rate(tree, regional):.0f} regional lookups/s, "
+          f"{lookup_rate(tree, phones):.0f} lookups/s")
+
+    start = time.perf_counter()
+    index = ShardedIndex.open(shards, sources, int(max_shards))
+    open_time = time.perf_counter() - start
+    regional_rate = lookup_rate(index, regional)
+    resident = len(index.shards)
+    print(f"{'shards':>10}: {open_time * 1000:.2f} ms to open, "
+          f"{regional_rate:.0f} regional lookups/s "
+          f"({resident}/{len(index.keys)} shards loaded), "
+          f"{lookup_rate(index, phones):.0f} lookups/s "
+          f"({index.loads} loads, {index.evictions} evictions)")
+
+    del tree, index
+    shutil.rmtree(folder)
+
+
+def compare_cluster(*route_data, phone_data="phone-numbers-10000",
+                    clients=8, batch_size=500):
+    """
+    Time a PricingCluster of 1, 2, 4 & 8 shard workers. Every
+    route list given is loaded as a separate carrier. Lookups
+    are timed one at a time, as one whole batch, & as batches
+    of batch_size sent by many client threads at once.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from cluster import PricingCluster
+
+    carriers = {}
+    for number, name in enumerate(route_data):
+        carriers[f"Carrier {number}"] = os.path.join(
+            convert.DATA_FOLDER, name + ".txt")
+    phones = read_phones(phone_data)
+    batches = [phones[start:start + batch_size]
+               for start in range(0, len(phones), batch_size)]
+    print(f"routes: {', '.join(route_data)}, phones: {phone_data}, "
+          f"{multiprocessing.cpu_count()} cpus")
+    print(f"{'workers':>8} {'start s':>8} {'max MB':>8} {'total MB':>9} "
+          f"{'single/s':>9} {'batch/s':>9} {f'{clients} clients/s':>12}")
+
+    for workers in (1, 2, 4, 8):
+        start = time.perf_counter()
+        with PricingCluster(carriers, workers) as router:
+            start_time = time.perf_counter() - start
+            memory = [stats["peak_memory_mb"] for stats in router.stats()]
+            single = lookup_rate(router, phones)
+
+            start = time.perf_counter()
+            router.price_many(phones)
+            batch = len(phones) / (time.perf_counter() - start)
+
+            with ThreadPoolExecutor(clients) as pool:
+                start = time.perf_counter()
+                list(pool.map(router.price_many, batches * clients))
+                concurrent = (len(phones) * clients
+                              / (time.perf_counter() - start))
+
+        print(f"{workers:>8} {start_time:>8.2f} {max(memory):>8.1f} "
+              f"{sum(memory):>9.1f} {single:>9.0f} {batch:>9.0f} "
+              f"{concurrent:>12.0f}")
+
+
+def _service_worker(route_data, batch_delay, connection, admission=None):
+    """
+    Serve a FlatDecimalTree of a route list over HTTP, with
+    micro-batching if batch_delay is not None, & an optional
+    AdmissionController. The port it listens on is sent back
+    over connection.
+    """
+    import asyncio
+    import service
+
+    engine, _ = build(FlatDecimalTree, read_routes(route_data))
+    pricing = service.PricingService(engine, batch_delay, admission=admission)
+
+    async def serve():
+        server = await pricing.start(port=0)
+        connection.send(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def _serve_load(route_data, load, connections, batch_delay=None,
+                admission=None):
+    """
+    Start the pricing service in its own process, & send it the
+    load generator's requests. Return the load generator summary.
+    """
+    import asyncio
+    import loadgen
+
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=_service_worker,
+        args=(route_data, batch_delay, sender, admission))
+    process.start()
+    port = receiver.recv()
+    try:
+        return asyncio.run(loadgen.run("127.0.0.1", port, load, connections))
+    finally:
+        process.terminate()
+        process.join()
+
+
+def compare_microbatch(route_data, phone_data="phone-numbers-10000",
+                       requests=20000, connections=64):
+    """
+    Run the load generator against the pricing service without
+    micro-batching, & with a batch delay of 0, 1, 2 & 5 ms.
+    The service runs in its own process.
+    """
+    import loadgen
+
+    path = os.path.join(convert.DATA_FOLDER, phone_data + ".txt")
+    with open(path) as file:
+        phones = [line.strip() for line in file if line.strip()]
+    load = loadgen.make_requests(phones, int(requests))
+    print(f"routes: {route_data}, {requests} requests "
+          f"over {connections} connections")
+    print(f"{'batching':>10} {'req/min':>10} {'p50 ms':>8} {'p99 ms':>8}")
+
+    for batch_delay in (None, 0, 0.001, 0.002, 0.005):
+        summary = _serve_load(route_data, load, int(connections), batch_delay)
+        name = "off" if batch_delay is None else f"{batch_delay * 1000:g} ms"
+        print(f"{name:>10} {summary['per_minute']:>10.0f} "
+              f"{summary['p50_ms']:>8.2f} {summary['p99_ms']:>8.2f}")
+
+
+def compare_admission(route_data, phone_data="phone-numbers-10000",
+                      requests=20000, connections=64, clients=4):
+    """
+    Run the load generator against the pricing service without
+    admission control, with limits it never reaches (to time the
+    checks), & with limits the load goes past.
+    """
+    import loadgen
+    from admission import AdmissionController
+
+    path = os.path.join(convert.DATA_FOLDER, phone_data + ".txt")
+    with open(path) as file:
+        phones = [line.strip() for line in file if line.strip()]
+    load = loadgen.make_requests(phones, int(requests), int(clients))
+    print(f"routes: {route_data}, {requests} requests over {connections} "
+          f"connections from {clients} clients")
+    print(f"{'admission':>22} {'req/min':>10} {'p50 ms':>8} {'p99 ms':>8}  "
+          f"statuses")
+
+    cases = [
+        ("off", None),
+        ("never reached", AdmissionController(
+            rate=1e9, burst=1e9, max_in_flight=1 << 30, max_latency=60)),
+        ("500/s per client", AdmissionController(
+            rate=500, burst=100, max_in_flight=None, max_latency=None)),
+        ("16 in flight", AdmissionController(
+            rate=None, max_in_flight=16, max_latency=None)),
+        ("1 ms mean latency", AdmissionController(
+            rate=None, max_in_flight=None, max_latency=0.001)),
+    ]
+    for name, admission in cases:
+        summary = _serve_load(route_data, load, int(connections),
+                              admission=admission)
+        statuses = dict(sorted(summary["statuses"].items()))
+        print(f"{name:>22} {summary['per_minute']:>10.0f} "
+              f"{summary['p50_ms']:>8.2f} {summary['p99_ms']:>8.2f}  "
+              f"{statuses}")
+
+
+def suite_engines():
+    """
+    Return the {name: engine class} of every lookup engine.
+    The range index needs numpy, so it is left out without it.
+    """
+    from hashindex import PrefixHashIndex
+    from radixtree import RadixSearchTree
+
+    engines = {
+        "decimal": DecimalSearchTree,
+        "radix": RadixSearchTree,
+        "flat": FlatDecimalTree,
+        "hash": PrefixHashIndex,
+    }
+    try:
+        from rangeindex import PrefixRangeIndex
+        engines["range"] = PrefixRangeIndex
+    except ImportError:
+        pass
+    return engines
+
+
+def data_names(pattern):
+    """
+    Return the names of the data files matching a pattern,
+    smallest first.
+    """
+    paths = glob.glob(os.path.join(convert.DATA_FOLDER, pattern + ".txt"))
+    paths.sort(key=os.path.getsize)
+    return [os.path.basename(path)[:-len(".txt")] for path in paths]
+
+
+def run_case(engine_name, route_data, phone_data, rounds=3):
+    """
+    Build one engine from a route list, then time single &
+    batch lookups of every phone list with it.
+    This runs in a fresh process, so the peak memory is its own.
+    Return a list of result dictionaries, one per phone list.
+    """
+    engine_class = suite_engines()[engine_name]
+    memory_before = loader.peak_memory()
+    engine, build_time = build(engine_class, read_routes(route_data))
+
+    # the range index finishes its build on the first lookup,
+    # so that lookup is counted as part of the build.
+    start = time.perf_counter()
+    engine.price_many(["1"])
+    build_time += time.perf_counter() - start
+    peak = loader.peak_memory()
+
+    results = []
+    for name in phone_data:
+        phones = read_phones(name)
+        single = batch = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for phone in phones:
+                engine.get_price(phone)
+            single = min(single, time.perf_counter() - start)
+            start = time.perf_counter()
+            engine.price_many(phones)
+            batch = min(batch, time.perf_counter() - start)
+        results.append({
+            "engine": engine_name,
+            "routes": route_data,
+            "route_count": engine.size,
+            "phones": name,
+            "phone_count": len(phones),
+            "build_seconds": round(build_time, 4),
+            "single_us": round(single / max(len(phones), 1) * 1e6, 4),
+            "batch_us": round(batch / max(len(phones), 1) * 1e6, 4),
+            "peak_memory_mb": round(peak, 2),
+            "memory_growth_mb": round(peak - memory_before, 2),
+        })
+    return results
+
+
+def run_suite(output, *route_data):
+    """
+    Benchmark every engine on every route list & phone list,
+    & write the results to output as json. Route lists default
+    to every route-costs file, plus synthetic 1M & 10M routes.
+    Each engine is built in a fresh process, so a slow or huge
+    build never skews the next one.
+    """
+    route_data = route_data or (
+        data_names("route-costs-*")
+        + ["synthetic-1000000", "synthetic-10000000"])
+    phone_data = data_names("phone-numbers-*")
+    engines = suite_engines()
+
+    results = []
+    for routes in route_data:
+        for engine_name in engines:
+            with multiprocessing.Pool(1) as pool:
+                cases = pool.apply(run_case, (engine_name, routes, phone_data))
+            for case in cases:
+                print(f"{routes:>20} {engine_name:>8} {case['phones']:>20} "
+                      f"build {case['build_seconds']:>8.2f} s "
+                      f"single {case['single_us']:>7.2f} us "
+                      f"batch {case['batch_us']:>7.2f} us "
+                      f"peak {case['peak_memory_mb']:>8.1f} mb")
+            results.extend(cases)
+
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": multiprocessing.cpu_count(),
+        "results": results,
+    }
+    with open(output, "w") as file:
+        json.dump(report, file, indent=1)
+
+
+def compare_results(old_output, new_output, threshold="0.1"):
+    """
+    Compare two suite result files, & print every measurement
+    that got worse by more than threshold (10% by default).
+    """
+    threshold = float(threshold)
+    metrics = ("build_seconds", "single_us", "batch_us", "peak_memory_mb")
+
+    def cases(path):
+        with open(path) as file:
+            return {
+                (case["engine"], case["routes"], case["phones"]): case
+                for case in json.load(file)["results"]}
+
+    old_cases = cases(old_output)
+    regressions = 0
+    for key, case in cases(new_output).items():
+        old_case = old_cases.get(key)
+        if old_case is None:
+            continue
+        for metric in metrics:
+            old, new = old_case[metric], case[metric]
+            if old and (new - old) / old > threshold:
+                regressions += 1
+                print(f"{' '.join(key)} {metric}: {old} -> {new} "
+                      f"(+{(new - old) / old:.0%})")
+    print(f"{regressions} regressions")
+
+
+BENCHMARKS = {
+    "flat": compare_flat_tree,
+    "lookup": compare_lookup,
+    "batch": compare_batch,
+    "range": compare_range,
+    "mmap": compare_mmap,
+    "parallel": compare_parallel,
+    "delta": compare_delta,
+    "ranked": compare_ranked,
+    "radix": compare_radix,
+    "hash": compare_hash,
+    "suite": run_suite,
+    "regress": compare_results,
+    "parse": compare_parse,
+    "shards": compare_shards,
+    "cluster": compare_cluster,
+    "microbatch": compare_microbatch,
+    "admission": compare_admission,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in BENCHMARKS:
+        print(__doc__)
+        sys.exit(1)
+    BENCHMARKS[sys.argv[1]](*sys.argv[2:])
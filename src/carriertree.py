@@ -0,0 +1,123 @@
+# This tree remembers every carrier's price for every prefix.
+# A DecimalSearchTree only keeps the cheapest carrier, so once
+# a carrier changes or drops a route, the runner-up is lost.
+# Here each node keeps {carrier: price}, & its data is still
+# the cheapest (carrier, price); so lookups work exactly as in
+# the DecimalSearchTree, & a carrier's routes can be updated
+# one prefix at a time without rebuilding anything.
+
+from decimaltree import DecimalTreeNode, DecimalSearchTree
+
+
+class CarrierPriceNode(DecimalTreeNode):
+    def __init__(self, data=None):
+        """
+        Initialize a node with no carrier prices yet.
+        """
+        super().__init__(data)
+        # {carrier name: price}, or None for a waypoint.
+        self.prices = None
+
+
+class CarrierPriceTree(DecimalSearchTree):
+    node_class = CarrierPriceNode
+
+    def __repr__(self):
+        """
+        Visually represent this tree using a string.
+        Return the formatted string.
+        """
+        return f"CarrierPriceTree({self.size} nodes)"
+
+
+    def _refresh(self, node):
+        """
+        Pick the cheapest carrier of a node as its data.
+        On a tie, the carrier that was added first wins.
+        ~~~
+        runtime: O(c)
+        --> c is the number of carriers with this prefix.
+        """
+        had_data = node.data is not None
+        if node.prices:
+            carrier = min(node.prices, key=node.prices.get)
+            node.data = (carrier, node.prices[carrier])
+        else:
+            node.prices = None
+            node.data = None
+        self.size += (node.data is not None) - had_data
+
+
+    def insert(self, phone, data):
+        """
+        insert a given {phone:(carrier, price)} pair.
+        if the carrier already has a price for this prefix,
+        the lower of the two is kept, like a DecimalSearchTree.
+        ~~~
+        runtime: O(L + c)
+        --> L is the length of the phone number,
+            & c is the number of carriers with this prefix.
+        """
+        carrier, price = data
+        node = self._make_path(phone)
+        if node.prices is None:
+            node.prices = {}
+        old_price = node.prices.get(carrier)
+        if old_price is None or price < old_price:
+            node.prices[carrier] = price
+            self._refresh(node)
+
+
+    def set_price(self, phone, carrier, price):
+        """
+        Set a carrier's price for a prefix, replacing any old one.
+        The cheapest carrier of the prefix is picked again.
+        """
+        node = self._make_path(phone)
+        if node.prices is None:
+            node.prices = {}
+        node.prices[carrier] = price
+        self._refresh(node)
+
+
+    def remove_price(self, phone, carrier):
+        """
+        Remove a carrier's price for a prefix.
+        If another carrier has this prefix, it takes over.
+        Return True if there was a price to remove.
+        """
+        node = self._find_path(phone)
+        if node is None or not node.prices or carrier not in node.prices:
+            return False
+        del node.prices[carrier]
+        self._refresh(node)
+        return True
+
+
+    def carrier_prices(self, phone):
+        """
+        Return a copy of {carrier: price} stored exactly at phone.
+        """
+        node = self._find_path(phone)
+        if node is None or not node.prices:
+            return {}
+        return dict(node.prices)
+
+
+    def apply_delta(self, carrier, delta):
+        """
+        Apply a RouteDelta of one carrier to this tree.
+        Added & changed prefixes get the new price, & removed
+        prefixes fall back to the next cheapest carrier.
+        Return the number of prefixes that were touched.
+        ~~~
+        runtime: O(d * (L + c))
+        --> d is the size of the delta, not of the route list.
+        """
+        for phone, price in delta.added.items():
+            self.set_price(phone, carrier, price)
+        for phone, price in delta.changed.items():
+            self.set_price(phone, carrier, price)
+        for phone in delta.removed:
+            self.remove_price(phone, carrier)
+        return len(delta.added) + len(delta.changed) + len(delta.removed)
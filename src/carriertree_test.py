@@ -0,0 +1,58 @@
+from carriertree import CarrierPriceTree
+from routediff import RouteDelta
+import unittest
+
+
+class CarrierPriceTreeTest(unittest.TestCase):
+
+    def make_tree(self):
+        tree = CarrierPriceTree()
+        tree.insert('1415', ('A', 20000))
+        tree.insert('1415', ('B', 30000))
+        tree.insert('1415234', ('B', 50000))
+        return tree
+
+    def test_insert_keeps_every_carrier(self):
+        tree = self.make_tree()
+        assert tree.size == 2
+        assert tree.search('1415') == ('A', 20000)
+        assert tree.carrier_prices('1415') == {'A': 20000, 'B': 30000}
+        # A carrier's own duplicate keeps its lower price
+        tree.insert('1415', ('B', 40000))
+        assert tree.carrier_prices('1415') == {'A': 20000, 'B': 30000}
+
+    def test_rejects_non_digits(self):
+        tree = self.make_tree()
+        with self.assertRaises(ValueError):
+            tree.insert('+1415', ('C', 10000))
+        with self.assertRaises(ValueError):
+            tree.carrier_prices('1415-234')
+
+    def test_remove_falls_back_to_next_carrier(self):
+        tree = self.make_tree()
+        assert tree.remove_price('1415', 'A') is True
+        assert tree.search('1415') == ('B', 30000)
+        assert tree.remove_price('1415', 'A') is False
+        assert tree.remove_price('1415', 'B') is True
+        assert tree.search('1415') is None
+        assert tree.size == 1
+        # The longer route still matches, the shorter one is gone
+        assert tree.get_price('14152345678') == ('B', 50000)
+        assert tree.get_price('14159999999') is None
+
+    def test_set_price_replaces(self):
+        tree = self.make_tree()
+        tree.set_price('1415', 'B', 10000)
+        assert tree.search('1415') == ('B', 10000)
+        tree.set_price('1415', 'B', 90000)
+        assert tree.search('1415') == ('A', 20000)
+
+    def test_apply_delta(self):
+        tree = self.make_tree()
+        delta = RouteDelta(added={'44': 500000}, changed={'1415': 10000},
+                           removed={'1415234'})
+        assert tree.apply_delta('B', delta) == 3
+        assert tree.search('44') == ('B', 500000)
+        assert tree.search('1415') == ('B', 10000)
+        assert tree.get_price('14152345678') == ('B', 10000)
+        assert tree.size == 2
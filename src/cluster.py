@@ -0,0 +1,355 @@
+"""
+A pricing cluster: the prefix space split over local processes.
+
+Each shard worker is a process that owns a set of leading digit
+keys (like "44" & "86"). It streams every carrier's route file,
+keeps only the routes of its own keys in a FlatDecimalTree
+(the same longest prefix semantics as DecimalSearchTree), &
+answers lookups over a local socket. So no one process has to
+hold every route.
+
+A ShardRouter is a thin lookup engine in front of the workers:
+get_price forwards a number to the worker that owns it, &
+price_many sends each worker its share of a batch at once, then
+gathers the answers in order. It can be served over HTTP like
+any other engine; its lookups wait on sockets, so the service
+calls them off its event loop.
+
+The protocol is one line per request & one JSON line per reply:
+
+    P 14152345678 442071234567\\n   ->  [["A", 20000], null]\\n
+    S\\n                            ->  {"routes": 812, ...}\\n
+
+usage:
+    python cluster.py [workers] [port] route-costs-106000 route-costs-35000
+    python cluster.py 4 8080 route-costs-1000000
+"""
+
+
+# import necessary modules
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import sys
+import threading
+import convert # local module
+import loader # local module
+import service # local module
+from flattree import FlatDecimalTree
+from shardindex import phone_key, shard_keys
+
+
+# a worker keeps only a fraction of the routes it parses, so it
+# reads smaller blocks than the loader, or the block would be
+# most of its memory.
+BLOCK_SIZE = 1 << 20
+
+
+def assign_keys(workers, digits=2):
+    """
+    Deal every leading digit key out to the workers in turn.
+    Neighbouring keys go to different workers, so one busy
+    region is spread over all of them.
+    Return a list of key sets, one per worker.
+    """
+    keys = [str(number).rjust(digits, "0") for number in range(10 ** digits)]
+    return [set(keys[worker::workers]) for worker in range(workers)]
+
+
+def load_shard(engine, carriers, keys, digits=2):
+    """
+    Insert the routes of many carriers whose prefixes belong to
+    one of keys into engine. A prefix shorter than the keys is
+    kept if it covers any of them.
+    carriers is a dict of {carrier name: route file path}.
+    Return the number of routes inserted.
+    """
+    count = 0
+    for carrier, path in carriers.items():
+        for prefixes, prices in loader.iter_route_blocks(path, BLOCK_SIZE):
+            for prefix, price in zip(prefixes, prices):
+                if len(prefix) >= digits:
+                    if prefix[:digits] not in keys:
+                        continue
+                elif keys.isdisjoint(shard_keys(prefix, digits)):
+                    continue
+                engine.insert(prefix, (carrier, price))
+                count += 1
+    return count
+
+
+class ShardHandler(socketserver.StreamRequestHandler):
+    # replies are small, so they are sent at once.
+    disable_nagle_algorithm = True
+
+
+    def handle(self):
+        """
+        Answer every request line sent over one connection.
+        """
+        engine = self.server.engine
+        for line in self.rfile:
+            command, _, numbers = line.decode().partition(" ")
+            command = command.strip()
+            if command == "P":
+                reply = engine.price_many(numbers.split())
+            elif command == "S":
+                reply = {
+                    "keys": sorted(self.server.keys),
+                    "routes": engine.size,
+                    "peak_memory_mb": round(loader.peak_memory(), 2),
+                }
+            else:
+                reply = {"error": f"unknown command {command!r}"}
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+
+class ShardServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def run_worker(carriers, keys, digits, connection, host="127.0.0.1"):
+    """
+    The main function of a shard worker process. Load the
+    routes of keys, then send the address it listens on back
+    over connection, & serve lookups until it is stopped.
+    """
+    engine = FlatDecimalTree()
+    load_shard(engine, carriers, keys, digits)
+    server = ShardServer((host, 0), ShardHandler)
+    server.engine = engine
+    server.keys = keys
+    connection.send(server.server_address)
+    connection.close()
+    server.serve_forever()
+
+
+class ShardClient(object):
+    def __init__(self, address):
+        """
+        Initialize a connection to one shard worker.
+        """
+        self.address = address
+        self.socket = socket.create_connection(address)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.socket.makefile("rwb")
+
+        # one request is in flight per connection at a time.
+        self.lock = threading.Lock()
+
+
+    def send(self, request):
+        """
+        Send one request line, without waiting for its reply.
+        The lock must be held.
+        """
+        self.file.write(request.encode() + b"\n")
+        self.file.flush()
+
+
+    def receive(self):
+        """
+        Read the reply to the last request. The lock must be held.
+        """
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError(f"shard worker {self.address} hung up")
+        return json.loads(line)
+
+
+    def request(self, request):
+        """
+        Send one request line. Return its decoded reply.
+        """
+        with self.lock:
+            self.send(request)
+            return self.receive()
+
+
+    def close(self):
+        """
+        Close the connection to the worker.
+        """
+        self.file.close()
+        self.socket.close()
+
+
+class ShardRouter(object):
+    # lookups wait on socket round trips (see service.py).
+    blocking = True
+
+
+    def __init__(self, addresses, key_sets, digits=2):
+        """
+        Initialize a router over running shard workers.
+        addresses[i] is the (host, port) of the worker that
+        owns the keys of key_sets[i].
+        """
+        self.digits = digits
+        self.clients = [ShardClient(address) for address in addresses]
+
+        # {leading digits: client of the worker that owns them}
+        self.owners = {}
+        for client, keys in zip(self.clients, key_sets):
+            for key in keys:
+                self.owners[key] = client
+
+
+    def __repr__(self):
+        """
+        Visually represent this router using a string.
+        Return the formatted string.
+        """
+        return f"ShardRouter({len(self.clients)} workers)"
+
+
+    def stats(self):
+        """
+        Return the stats dictionary of every worker.
+        """
+        return [client.request("S") for client in self.clients]
+
+
+    def get_price(self, phone):
+        """
+        Find the longest matching prefix of a phone number on
+        the worker that owns it.
+        Return its (carrier, price), or None if none match.
+        """
+        if not phone:
+            return None
+        client = self.owners[phone_key(phone, self.digits)]
+        data = client.request("P " + phone)[0]
+        return tuple(data) if data is not None else None
+
+
+    def price_many(self, phones):
+        """
+        Find the longest matching prefix of many phone numbers.
+        Every worker is sent its share of the batch before any
+        reply is read, so the workers price them in parallel.
+        Return a list of (carrier, price) or None, in the same
+        order as the given phone numbers.
+        """
+        groups = {}
+        for index, phone in enumerate(phones):
+            if phone:
+                client = self.owners[phone_key(phone, self.digits)]
+                groups.setdefault(client, []).append(index)
+
+        # locks are always taken in the same (worker) order, so
+        # two batches running at once can not deadlock.
+        clients = [client for client in self.clients if client in groups]
+        results = [None] * len(phones)
+        for client in clients:
+            client.lock.acquire()
+        try:
+            for client in clients:
+                client.send("P " + " ".join(
+                    [phones[index] for index in groups[client]]))
+            for client in clients:
+                for index, data in zip(groups[client], client.receive()):
+                    if data is not None:
+                        results[index] = tuple(data)
+        finally:
+            for client in clients:
+                client.lock.release()
+        return results
+
+
+    def close(self):
+        """
+        Close the connections to every worker.
+        """
+        for client in self.clients:
+            client.close()
+
+
+class PricingCluster(object):
+    def __init__(self, carriers, workers=4, digits=2):
+        """
+        Initialize a cluster of shard workers for the route
+        files of many carriers; nothing runs until start().
+        carriers is a dict of {carrier name: route file path}.
+        """
+        if not 1 <= workers <= 10 ** digits:
+            raise ValueError(f"workers must be from 1 to {10 ** digits}")
+        self.carriers = carriers
+        self.digits = digits
+        self.key_sets = assign_keys(workers, digits)
+        self.processes = []
+        self.router = None
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+    def start(self):
+        """
+        Start every worker, wait until each has loaded its
+        routes, & connect a router to them. Return the router.
+        """
+        connections = []
+        for keys in self.key_sets:
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=run_worker, daemon=True,
+                args=(self.carriers, keys, self.digits, sender))
+            process.start()
+            sender.close()
+            self.processes.append(process)
+            connections.append(receiver)
+
+        addresses = []
+        for connection, process in zip(connections, self.processes):
+            try:
+                addresses.append(connection.recv())
+            except EOFError:
+                self.stop()
+                raise RuntimeError(
+                    f"shard worker exited with code {process.exitcode}")
+        self.router = ShardRouter(addresses, self.key_sets, self.digits)
+        return self.router
+
+
+    def stop(self):
+        """
+        Close the router & stop every worker.
+        """
+        if self.router is not None:
+            self.router.close()
+            self.router = None
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+
+
+def main(workers, port, *route_data):
+    """
+    Start a cluster of workers for the route lists, one carrier
+    each, & serve lookups over HTTP through its router.
+    """
+    carriers = {
+        f"Carrier {chr(ord('A') + number)}":
+            os.path.join(convert.DATA_FOLDER, name + ".txt")
+        for number, name in enumerate(route_data)}
+    with PricingCluster(carriers, int(workers)) as router:
+        asyncio.run(service.serve(service.PricingService(router), port=int(port)))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print(__doc__)
+        sys.exit(1)
+    main(*sys.argv[1:])
@@ -0,0 +1,64 @@
+import cluster
+from cluster import PricingCluster
+from decimaltree import DecimalSearchTree
+from fixedpoint import parse_micros
+import os
+import shutil
+import tempfile
+import unittest
+
+
+ROUTES_A = '+1,0.5\n+1415,0.02\n+44,0.1\n+4420,0.07\n+86,0.3\n+7,0.4\n'
+ROUTES_B = '+1415,0.01\n+4,0.2\n+449,0.04\n+0,0.9\n'
+PHONES = ['14155550000', '1212', '442071234567', '4499', '4', '41',
+          '8613800000000', '79161234567', '33123', '0123', '']
+
+
+class PricingClusterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.carriers = {}
+        self.tree = DecimalSearchTree()
+        for name, text in (('A', ROUTES_A), ('B', ROUTES_B)):
+            path = os.path.join(self.folder, name + '.txt')
+            with open(path, 'w') as file:
+                file.write(text)
+            self.carriers[name] = path
+            for line in text.splitlines():
+                prefix, price = line[1:].split(',')
+                self.tree.insert(prefix, (name, parse_micros(price)))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_assign_keys(self):
+        key_sets = cluster.assign_keys(3, 2)
+        assert sum(len(keys) for keys in key_sets) == 100
+        assert set().union(*key_sets) == {str(n).rjust(2, '0') for n in range(100)}
+        assert '44' in key_sets[44 % 3]
+        assert cluster.assign_keys(1, 1) == [set('0123456789')]
+
+    def test_matches_one_tree(self):
+        for workers in (1, 3):
+            with PricingCluster(self.carriers, workers) as router:
+                expected = [self.tree.get_price(phone) for phone in PHONES]
+                assert [router.get_price(phone) for phone in PHONES] == expected
+                assert router.price_many(PHONES) == expected
+
+    def test_workers_hold_only_their_routes(self):
+        with PricingCluster(self.carriers, 2, digits=1) as router:
+            stats = router.stats()
+        assert [stats[0]['keys'], stats[1]['keys']] == [
+            list('02468'), list('13579')]
+        # Worker 0 holds +0, +4, +44, +4420, +449 & +86;
+        # worker 1 holds +1, +1415 (from both carriers) & +7
+        assert stats[0]['routes'] == 6 and stats[1]['routes'] == 3
+
+    def test_too_many_workers(self):
+        with self.assertRaises(ValueError):
+            PricingCluster(self.carriers, 11, digits=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
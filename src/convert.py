@@ -1,4 +1,7 @@
 import os
+import indexfile # local module
+import loader # local module
+from array import array
 
 
 # find the src directory - this holds our python files.
@@ -11,39 +14,74 @@ DATA_FOLDER = os.path.abspath(os.path.join(
 
 def parse_data(file_name, make_dict_helper):
     """
-    read_data() will check if the python data file exists.
-    if it doesn"t exist, it will open the text data file,
-    & it will then create the respective python data file.
+    parse_data() will check if the binary index file exists,
+    & if it is still up to date with its text data file.
+    if not, it will parse the text data file into a dictionary,
+    & it will then write the respective binary index file.
+    return the dictionary of the data.
     """
     # record the path of the text data files.
     file_path_txt = os.path.join(
         DATA_FOLDER, file_name + ".txt")
 
-    # record the path of the python data files.
-    file_path_py = os.path.join(
-        SRC_FOLDER, file_name + ".py")
+    # record the path of the binary index files.
+    file_path_idx = os.path.join(
+        DATA_FOLDER, file_name + ".idx")
 
-    try: # do nothing if the python data file exists.
-        # open the python file if it exists...
-        file = open(file_path_py, "r")
-        # if there was no error, it exists!
-
-    except: # otherwise, process the text data file.
-        # open text file for reading.
-        txt_file = open(file_path_txt, "r")
-        # create new python file for writing.
-        py_file = open(file_path_py, "w+")
+    # read the index file if it exists & is not stale.
+    columns = indexfile.read_index(file_path_idx, file_path_txt)
+    if columns is not None:
+        return _columns_to_dict(columns)
 
+    # otherwise, process the text data file.
+    with open(file_path_txt, "r") as txt_file:
         # generate dictionary using the helper function.
         dictionary = make_dict_helper(txt_file)
-        file_content = "dictionary = " + str(dictionary)
 
-        # print data into file to be imported later.
-        print(file_content, file=py_file)
+    # save it into the index file to be read later.
+    indexfile.write_index(
+        file_path_idx, _dict_to_columns(dictionary), file_path_txt)
+    return dictionary
 
-        # close files for good practice.
-        txt_file.close()
-        py_file.close()
+
+def _dict_to_columns(dictionary):
+    """
+    Turn a {number: price or None} dictionary into columns.
+    - the numbers are joined into one block of text.
+    - the prices, if any, become an array of uint32
+      micro-dollars (see fixedpoint).
+    """
+    columns = {}
+    columns["prefixes"] = array("B", "\n".join(dictionary).encode())
+    if any(value is not None for value in dictionary.values()):
+        columns["prices"] = array("I", dictionary.values())
+    return columns
+
+
+def _columns_to_dict(columns):
+    """
+    Turn the columns of an index file back into a dictionary.
+    Both steps run in C: splitting the text, & zipping it up.
+    """
+    text = columns["prefixes"].tobytes().decode()
+    numbers = text.split("\n") if text else []
+    if "prices" in columns:
+        return dict(zip(numbers, columns["prices"]))
+    return dict.fromkeys(numbers)
+
+
+def read_phone_data(file_name):
+    """
+    Return the {phone number: None} dictionary of a data file.
+    """
+    return parse_data(file_name, _make_phone_dict)
+
+
+def read_route_data(file_name):
+    """
+    Return the {route number: lowest price} dictionary of a data file.
+    """
+    return parse_data(file_name, _make_route_dict)
 
 
 def _make_phone_dict(file):
@@ -52,7 +90,7 @@ def _make_phone_dict(file):
     for line in file.readlines():
         # get the phone number from this line.
         # remove the \n newline char, its not needed.
-        phone = line[:-2]
+        phone = line.strip()
         # add the phone number to the dictionary.
         # notice how there is no value associated with it.
         phone_dict[phone] = None
@@ -63,20 +101,14 @@ def _make_phone_dict(file):
 def _make_route_dict(file):
     # start with an empty dictionary of route costs.
     route_dict = {}
-    for line in file.readlines():
-        # get the route and price from this line.
-        route, price = line.split(",")
-        price = float(price)
+    # split the whole file into a column of routes & a column
+    # of prices at once, rather than one line at a time.
+    routes, prices = loader.parse_routes(file.read(), strip_plus=False)
+    for route, price in zip(routes, prices):
         # check if route exists.
-        if route in route_dict:
-            # if it does, check its price.
-            if price < route_dict[route]:
-                # if the price is lower, update it!
-                route_dict[route] = price
-            else:
-                pass
-        # otherwise, create a new price list with one value.
-        else:
+        old_price = route_dict.get(route)
+        # if it does not, or if the price is lower, update it!
+        if old_price is None or price < old_price:
             route_dict[route] = price
     # return the comprehensive route_dict we just created.
     return route_dict
@@ -85,9 +117,9 @@ def _make_route_dict(file):
 def main(phone_data=None, route_data=None):
     # ensure data is given.
     if phone_data and route_data:
-        # parse given data into files.
-        parse_data(phone_data, _make_phone_dict)
-        parse_data(route_data, _make_route_dict)
+        # parse given data into index files.
+        read_phone_data(phone_data)
+        read_route_data(route_data)
 
     else:
         # no data was specified.
@@ -106,6 +138,7 @@ def main(phone_data=None, route_data=None):
             "route-costs-600",
             "route-costs-35000",
             "route-costs-106000",
+            # the larger files are written by generate.py.
             "route-costs-1000000",
             "route-costs-10000000",
         )
@@ -114,12 +147,12 @@ def main(phone_data=None, route_data=None):
         for data in phone_data_files:
             # emphasize this is the phone_data.
             phone_data = data
-            parse_data(phone_data, _make_phone_dict)
+            read_phone_data(phone_data)
 
         for data in route_data_files:
             # emphasize this is the route_data.
             route_data = data
-            parse_data(route_data, _make_route_dict)
+            read_route_data(route_data)
 
 
 if __name__ == "__main__":
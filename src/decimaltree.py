@@ -3,6 +3,13 @@
 # This code is inspired by SW Harrison's implementations.
 # Thank him for taking time to explain this data structure!
 
+# map each digit character to its child index.
+# a dictionary lookup is cheaper than calling int().
+# any other character is a KeyError, which the walks turn into
+# a ValueError, like the other engines raise.
+DIGITS = {str(digit): digit for digit in range(10)}
+
+
 class DecimalTreeNode(object):
     def __init__(self, data=None):
         """
@@ -83,18 +90,21 @@ class DecimalTreeNode(object):
 
 
 class DecimalSearchTree(object):
+    # the class of every node this tree generates.
+    node_class = DecimalTreeNode
+
     def __init__(self, items=None):
         """
         Initialize search tree with given items.
         """
         # the root node will always be empty.
-        self.root = DecimalTreeNode()
+        self.root = self.node_class()
         self.size = 0
 
         # insert items
         if items is not None:
-            for item in items:
-                self.insert(item)
+            for phone, data in items:
+                self.insert(phone, data)
 
         # a node's item will be a tuple.
         # (carrier name, (route number, route price))
@@ -152,7 +162,7 @@ class DecimalSearchTree(object):
             the item is at the tail of the linked list.
         '''
         # find a node with the given item, if any.
-        node = self._find_path_recursive(number, self.root)
+        node = self._find_path(number)
         # return True if it is found, or False if not.
         return node is not None
 
@@ -174,7 +184,7 @@ class DecimalSearchTree(object):
             the item is at the tail of the linked list.
         """
         # find a node with the given item, if any.
-        node = self._find_path_recursive(item, self.root)
+        node = self._find_path(item)
         # return the node if it is found, or None if not.
         return node.data if node is not None else None
 
@@ -185,7 +195,7 @@ class DecimalSearchTree(object):
         #   it has too much going on, break apart.
 
 
-    def insert(self, phone, data, node="ROOT"):
+    def insert(self, phone, data):
         """
         insert a given {phone:item} pair into this tree.
         traverse the tree using the phone number.
@@ -193,159 +203,211 @@ class DecimalSearchTree(object):
         we might have to generate a sequence of empty nodes.
         these empty nodes still have semantic meaning.
         the tree must maintain a strict sorted structure.
-        ---
-        best case runtime: O(1)
-        --> the root node is our parent node.
-        ---
-        median case runtime: O(ln(n))
-        --> our parent node is a leaf in a balanced tree.
-        ---
-        worst case runtime: O(n)
-        --> the tree can be represented using a linked list.
-            our parent node is the tail of the linked list.
-        """
-        # check if we start at the root node.
-        if node == "ROOT":
-            node = self.root
-
-        # check whether our phone# is an empty string.
-        # that would mean the node is our injection site!
-        if not phone:
-            # now inject data at our node.
-            # first ensure there is no data at our node.
-            if node.data is None:
-                node.data = data
-                self.size += 1
-
-            # data will be (carrier name, price).
-            # - HACK: would it not make more sense to use.
-            # - a dictionary for data? {carrier name: price}
-            # if there is already data, keep the lower one!
-            elif node.data[1] > data[1]:
-                node.data = data
-
-        else:
-            # find digit.
-            digit = int(phone[0])
-            # remove digit from phone# string.
-            phone = phone[1:]
-            # grab our next node.
-            next = node.next[digit]
-
-            # check if next node exists.
-            if next is None:
-                # initialize empty node and point to it.
-                next = DecimalTreeNode()
-
-            # recursively call insert here.
-            # - use remaining phone number,
-            # - the same data,
-            # - and the next node determined by this digit.
-            self.insert(phone, data, next)
-
-
-    def _find_path_recursive(self, phone, node="ROOT"):
+        ~~~
+        best & worst case runtime: O(L)
+        --> L is the length of the phone number.
+            we take one step down the tree per digit,
+            & never copy the remaining phone# string.
+        """
+        node = self._make_path(phone)
+
+        # now inject data at our node.
+        # first ensure there is no data at our node.
+        if node.data is None:
+            node.data = data
+            self.size += 1
+
+        # data will be (carrier name, price).
+        # - HACK: would it not make more sense to use.
+        # - a dictionary for data? {carrier name: price}
+        # if there is already data, keep the lower one!
+        elif node.data[1] > data[1]:
+            node.data = data
+
+
+    def _make_path(self, phone):
+        """
+        find the node at the end of a phone number's path,
+        generating any missing nodes on the way, & return it.
+        ~~~
+        best & worst case runtime: O(L)
+        --> L is the length of the phone number.
+        """
+        node = self.root
+
+        # walk down the tree one digit at a time.
+        try:
+            for char in phone:
+                # find digit.
+                digit = DIGITS[char]
+                # grab our next node.
+                next = node.next[digit]
+
+                # check if next node exists.
+                if next is None:
+                    # initialize empty node and point to it.
+                    next = self.node_class()
+                    node.next[digit] = next
+
+                node = next
+        except KeyError:
+            raise ValueError(f"not a digit string: {phone!r}") from None
+
+        return node
+
+
+    def _find_path(self, phone):
         """
         find a node by following a given path, & return it.
         the path is equal to the given phone number.
-        traverse tree recursively starting at a given node.
+        return None if the path is a dead-end.
         ~~~
-        best case runtime: O(1)
-        --> the root node is our parent node.
-        ---
-        median case runtime: O(ln(n))
-        --> our parent node is a leaf in a balanced tree.
-        ---
-        worst case runtime: O(n)
-        --> the tree can be represented using a linked list.
-            parent node is at the tail of the linked list.
+        best & worst case runtime: O(L)
+        --> L is the length of the phone number.
         """
-        # check if we start at the root node.
-        if node == "ROOT":
-            node = self.root
+        node = self.root
 
-        # if node is None, the path is a dead-end.
-        if node is None:
-            return None
+        try:
+            for char in phone:
+                # grab our next node.
+                node = node.next[DIGITS[char]]
+                # if node is None, the path is a dead-end.
+                if node is None:
+                    return None
+        except KeyError:
+            raise ValueError(f"not a digit string: {phone!r}") from None
 
-        # check whether our phone# is an empty string.
-        # that would mean we have found our node!
-        elif not phone:
-            return node
+        return node
 
-        else:
-            # find digit.
-            digit = int(phone[0])
-            # remove digit from phone# string.
-            phone = phone[1:]
-            # grab our next node.
-            next = node.next[digit]
 
-            # recursively call find_path here.
-            # - use remaining phone number,
-            # - and the next node determined by this digit.
-            return self._find_path_recursive(phone, next)
+    def get_price(self, phone):
+        """
+        Find the longest matching prefix of a phone number.
+        Return its data (carrier, price), or None if no
+        route matches the phone number at all.
+        Raise ValueError if it walks into a character that is
+        not a digit.
+        ~~~
+        best & worst case runtime: O(L)
+        --> L is the length of the phone number.
+        """
+        node = self.root
+        best_data = None
 
+        try:
+            for char in phone:
+                # grab our next node.
+                node = node.next[DIGITS[char]]
 
-    def get_price(self, phone, node="ROOT", best_data=None):
+                # if node is None, the path is a dead-end.
+                # return the last data that we found.
+                if node is None:
+                    break
+
+                # node.data doesn't have to exist.
+                # this happens often; it represents a waypoint.
+                # otherwise this route is longer than any before,
+                # so it is more specific & replaces best_data.
+                if node.data is not None:
+                    best_data = node.data
+        except KeyError:
+            raise ValueError(f"not a digit string: {phone!r}") from None
+
+        return best_data
+
+
+    def trace(self, phone):
         """
-        Find the longest matching prefix of a phone number.
-        We traverse this tree recursively.
-        Return its price and carrier.
-        """
-        # check if we start at the root node.
-        if node=="ROOT":
-            node=self.root
-
-        # if node is None, the path is a dead-end.
-        # return the last data that we found.
-        if node is None:
-            return best_data
-
-        # check whether our phone# is an empty string.
-        # that would mean we have found our node!
-        elif not phone:
-            return best_data
-
-        else:
-            # find digit.
-            digit = int(phone[0])
-            # remove digit from phone# string.
-            phone = phone[1:]
-            # grab our next node.
-            next = node.next[digit]
-
-            # if the next node has data,
-            # it might be better than our best_data.
-            # lets peek inside and check.
-            if node.data:
-                # our best_data could still be None here.
-                # this happens when we don't find any data,
-                # even if we traversed a few nodes yet.
-                # in this case we grab the nodes data.
-                if not best_data:
-                    # the node's data could still be None!
-                    # this represents a waypoint node;
-                    # its an expected result.
-                    return self.get_price(
-                        phone, next, node.data)
-
-                # if the node's data is better,
-                # replace our best_data with it.
-                elif node.data[1] < best_data[1]:
-                    return self.get_price(
-                        phone, next, node.data)
-
-                # leave our best_data alone if we didn't
-                # find better data in the node.
-                elif node.data[1] >= best_data[1]:
-                    return self.get_price(
-                        phone, next, best_data)
-
-            # node.data doesn't have to exist.
-            # this happens often; it represents a waypoint.
-            # in this case we continue to the next node,
-            # but make no changes to our best_data.
-            else:
-                return self.get_price(
-                    phone, next, best_data)
+        Find the longest matching prefix of a phone number like
+        get_price, & count the work it took. This is for
+        instrumentation; get_price itself counts nothing.
+        Return (data, nodes visited, match depth); the match
+        depth is the length of the matched prefix, or 0.
+        ~~~
+        best & worst case runtime: O(L)
+        """
+        node = self.root
+        best_data = None
+        visited = 0
+        depth = 0
+
+        try:
+            for char in phone:
+                node = node.next[DIGITS[char]]
+                if node is None:
+                    break
+                visited += 1
+                if node.data is not None:
+                    best_data = node.data
+                    depth = visited
+        except KeyError:
+            raise ValueError(f"not a digit string: {phone!r}") from None
+
+        return best_data, visited, depth
+
+
+    def price_many(self, phones):
+        """
+        Find the longest matching prefix of many phone numbers.
+        Return a list of data (carrier, price) or None, in the
+        same order as the given phone numbers.
+        The numbers are walked in sorted order, so neighbours
+        share the walk down their common prefix; a number that
+        runs into the same dead-end as its neighbour is priced
+        without walking at all.
+        ~~~
+        runtime: O(n log n + S)
+        --> n numbers are sorted, & S is the number of digits
+            that are not shared with the previous number.
+        """
+        results = [None] * len(phones)
+
+        # path_nodes[d] is the node reached after d digits of
+        # the previous number, & path_data[d] is the deepest
+        # data found on the way there.
+        path_nodes = [self.root]
+        path_data = [None]
+        previous = ""
+
+        # every number starting with dead_key runs into the
+        # same dead-end as the previous one, & gets its result.
+        # no string starts with an empty tuple of prefixes, so
+        # nothing matches at first (not even a bad "+" number).
+        dead_key = ()
+
+        for index in sorted(range(len(phones)), key=phones.__getitem__):
+            phone = phones[index]
+            if phone.startswith(dead_key):
+                results[index] = path_data[-1]
+                continue
+
+            # count the leading digits shared with the previous
+            # number; their part of the walk is already done.
+            shared = 0
+            limit = min(len(path_nodes) - 1, len(phone))
+            while shared < limit and phone[shared] == previous[shared]:
+                shared += 1
+            del path_nodes[shared + 1:]
+            del path_data[shared + 1:]
+            node = path_nodes[shared]
+            best_data = path_data[shared]
+            dead_key = ()
+
+            # walk on from the deepest shared node.
+            try:
+                for position in range(shared, len(phone)):
+                    node = node.next[DIGITS[phone[position]]]
+                    if node is None:
+                        dead_key = phone[:position + 1]
+                        break
+                    if node.data is not None:
+                        best_data = node.data
+                    path_nodes.append(node)
+                    path_data.append(best_data)
+            except KeyError:
+                raise ValueError(f"not a digit string: {phone!r}") from None
+
+            results[index] = path_data[-1]
+            previous = phone
+
+        return results
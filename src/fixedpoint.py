@@ -0,0 +1,64 @@
+"""
+Fixed-point prices, counted in whole micro-dollars.
+
+Route prices are decimals like 0.02, which a float can only
+approximate; two prices that print the same may then compare
+as different. Stored as an integer count of micro-dollars
+instead, every price with up to 6 decimals is exact, it fits a
+4 byte unsigned column (up to $4294.967295), & ties compare
+equal, so the first carrier inserted deterministically wins.
+
+Prices are micro-dollars from end to end: the loader parses
+the price text of a route file straight into them, every
+engine stores & returns them, & they are only turned back into
+decimal text for output (the result writer & the service).
+"""
+
+
+# micro-dollars per dollar.
+MICROS = 1000000
+
+# the largest price a uint32 column can hold.
+MAX_MICROS = 0xFFFFFFFF
+
+
+def check_micros(micros):
+    """
+    Return micros, a price in micro-dollars, unchanged.
+    Raise ValueError if it is not a whole number that fits a
+    uint32 column (a float price in dollars, say).
+    """
+    if not isinstance(micros, int) or not 0 <= micros <= MAX_MICROS:
+        raise ValueError(f"not a price in micro-dollars: {micros!r}")
+    return micros
+
+
+def parse_micros(text):
+    """
+    Turn the decimal text of a price, like "0.02", straight into
+    micro-dollars without going through a float. Digits past
+    the sixth decimal are rounded half up.
+    Raise ValueError if it is not a price, or does not fit.
+    """
+    text = text.strip()
+    whole, _, fraction = text.partition(".")
+    if not (whole or fraction) or not (whole + fraction).isdigit() \
+            or not text.isascii():
+        raise ValueError(f"not a price: {text!r}")
+    fraction = fraction.ljust(7, "0")
+    micros = int(whole or "0") * MICROS + int(fraction[:6])
+    if fraction[6] >= "5":
+        micros += 1
+    if micros > MAX_MICROS:
+        raise ValueError(f"price out of range: {text!r}")
+    return micros
+
+
+def format_micros(micros):
+    """
+    Turn micro-dollars into the decimal text of the route file
+    format. Like a float, at least one decimal is kept: 20000
+    becomes "0.02", & 1000000 becomes "1.0".
+    """
+    whole, fraction = divmod(micros, MICROS)
+    return f"{whole}.{str(fraction).rjust(6, '0').rstrip('0') or '0'}"
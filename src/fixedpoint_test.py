@@ -0,0 +1,38 @@
+from fixedpoint import MAX_MICROS, check_micros, format_micros, parse_micros
+import unittest
+
+
+class FixedPointTest(unittest.TestCase):
+
+    def test_check_micros(self):
+        assert check_micros(20000) == 20000
+        assert check_micros(MAX_MICROS) == MAX_MICROS
+        for price in (0.02, -1, MAX_MICROS + 1, '20000'):
+            with self.assertRaises(ValueError):
+                check_micros(price)
+
+    def test_round_trip(self):
+        for text in ('0.02', '0.1', '0.33', '1.5', '0.000001', '12.345678'):
+            assert format_micros(parse_micros(text)) == text
+            assert parse_micros(text) / 1e6 == float(text)
+
+    def test_parse_micros(self):
+        assert parse_micros('0.02\n') == 20000
+        assert parse_micros('0.40') == 400000
+        assert parse_micros('3') == 3000000
+        assert parse_micros('.5') == 500000
+        # The seventh decimal rounds half up
+        assert parse_micros('0.0000005') == 1
+        assert parse_micros('0.0000004') == 0
+        for text in ('-0.5', '', '.', '1e-3', '0.0x', '4294.967296', '²'):
+            with self.assertRaises(ValueError):
+                parse_micros(text)
+
+    def test_format_micros(self):
+        assert format_micros(0) == '0.0'
+        assert format_micros(1000000) == '1.0'
+        assert format_micros(20000) == '0.02'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,425 @@
+# This tree is a compact twin of the DecimalSearchTree.
+# Rather than one python object per digit, every node is
+# just an index into a handful of contiguous typed arrays.
+# The public api (insert, search, get_price...) is the same.
+
+from array import array
+import indexfile # local module
+from fixedpoint import check_micros
+
+
+# every node owns a block of 10 child slots in one array.
+# the root is node 0, so it can never be anyone's child;
+# this lets us use 0 as the "no child here" marker.
+EMPTY_BLOCK = array("I", [0] * 10)
+
+# a node without any data stores this carrier id.
+NO_CARRIER = 0xFFFF
+
+
+def check_digits(phone):
+    """
+    Raise ValueError unless phone is a string of ascii digits.
+    A stray "+", space or dash would otherwise be walked as a
+    digit, & land in a sibling's slot or past the node's block.
+    """
+    if phone and not (phone.isascii() and phone.isdigit()):
+        raise ValueError(f"not a digit string: {phone!r}")
+
+
+class FlatDecimalTree(object):
+    def __init__(self, items=None):
+        """
+        Initialize flat search tree with given items.
+        items is an iterable of (phone, (carrier, price)).
+        """
+        # children[10 * node + digit] is the child node index.
+        # 4 bytes per slot, so 40 bytes per node.
+        self.children = array("I", EMPTY_BLOCK)
+
+        # one entry per node, aligned with the node index.
+        # - carriers holds a small integer carrier id.
+        # - prices holds that carrier's price for the route,
+        #   in whole micro-dollars (see fixedpoint).
+        self.carriers = array("H", [NO_CARRIER])
+        self.prices = array("I", [0])
+
+        # carrier names are stored once, & referenced by id.
+        self.carrier_names = []
+        self.carrier_ids = {}
+
+        # like DecimalSearchTree, size counts the routes.
+        self.size = 0
+
+        # insert items
+        if items is not None:
+            for phone, data in items:
+                self.insert(phone, data)
+
+
+    def __repr__(self):
+        """
+        Visually represent this tree using a string.
+        Return the formatted string.
+        """
+        return f"FlatDecimalTree({self.size} nodes)"
+
+
+    def node_count(self):
+        """
+        Return the number of nodes, including waypoints.
+        """
+        return len(self.carriers)
+
+
+    def nbytes(self):
+        """
+        Return the number of bytes held by the typed arrays.
+        """
+        return sum(
+            column.itemsize * len(column)
+            for column in (self.children, self.carriers, self.prices))
+
+
+    def save(self, path, sources=None):
+        """
+        Save this tree to an index file at path.
+        sources are the route files the tree was built from;
+        load() refuses the file once any of them has changed.
+        """
+        indexfile.write_index(path, self._columns(), sources)
+
+
+    def _columns(self):
+        """
+        Return the {name: typed array} columns of this tree.
+        """
+        return {
+            "children": self.children,
+            "carriers": self.carriers,
+            "prices": self.prices,
+            "names": array("B", "\n".join(self.carrier_names).encode()),
+            "size": array("Q", [self.size]),
+        }
+
+
+    @classmethod
+    def load(cls, path, sources=None, use_mmap=True):
+        """
+        Load a tree that was saved to an index file at path.
+        With use_mmap, the file is memory mapped read-only; the
+        tree then reads straight from the page cache, & every
+        process that loads the same file shares one copy of it.
+        A mapped tree can be searched, but not inserted into.
+        Return None if the file is missing or stale.
+        """
+        if use_mmap:
+            columns = indexfile.map_index(path, sources)
+        else:
+            columns = indexfile.read_index(path, sources)
+        if columns is None:
+            return None
+
+        tree = cls()
+        tree._use_columns(columns)
+        return tree
+
+
+    def _use_columns(self, columns):
+        """
+        Point this tree at columns read back from an index file.
+        """
+        self.children = columns["children"]
+        self.carriers = columns["carriers"]
+        self.prices = columns["prices"]
+        self.size = columns["size"][0]
+        names = bytes(columns["names"]).decode()
+        self.carrier_names = names.split("\n") if names else []
+        self.carrier_ids = {
+            name: carrier_id
+            for carrier_id, name in enumerate(self.carrier_names)}
+
+
+    def is_empty(self):
+        """
+        Check if there are no routes in this tree.
+        Return True or False based on result.
+        """
+        return self.size == 0
+
+
+    def height(self):
+        """
+        Return the height of the root node.
+        ~~~
+        best & worst case time complexity: O(n)
+        --> we must visit every node to find the height.
+        """
+        children = self.children
+        tallest = 0
+        # walk the tree with an explicit stack of (node, depth).
+        stack = [(0, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if depth > tallest:
+                tallest = depth
+            base = node * 10
+            for slot in range(base, base + 10):
+                child = children[slot]
+                if child:
+                    stack.append((child, depth + 1))
+        return tallest
+
+
+    def _carrier_id(self, carrier):
+        """
+        Return the id of a carrier name, registering it if new.
+        """
+        carrier_id = self.carrier_ids.get(carrier)
+        if carrier_id is None:
+            carrier_id = len(self.carrier_names)
+            if carrier_id >= NO_CARRIER:
+                raise ValueError("too many carriers for this tree")
+            self.carrier_names.append(carrier)
+            self.carrier_ids[carrier] = carrier_id
+        return carrier_id
+
+
+    def _find_node(self, phone):
+        """
+        Follow the digits of a phone number from the root.
+        Return the index of the node at the end of the path,
+        or None if the path is a dead-end.
+        ~~~
+        best & worst case runtime: O(L)
+        --> L is the length of the phone number.
+        """
+        check_digits(phone)
+        children = self.children
+        node = 0
+        for char in phone:
+            node = children[node * 10 + ord(char) - 48]
+            if not node:
+                return None
+        return node
+
+
+    def contains(self, phone):
+        """
+        Does the path of this phone number exist in the tree?
+        Return True or False based on result.
+        """
+        return self._find_node(phone) is not None
+
+
+    def search(self, phone):
+        """
+        Return the (carrier, price) stored exactly at phone.
+        Return None if there is no route with that prefix.
+        """
+        node = self._find_node(phone)
+        if node is None or self.carriers[node] == NO_CARRIER:
+            return None
+        return (self.carrier_names[self.carriers[node]],
+                self.prices[node])
+
+
+    def insert(self, phone, data):
+        """
+        insert a given {phone:(carrier, price)} pair.
+        the cheapest carrier is kept for every prefix.
+        ~~~
+        best & worst case runtime: O(L)
+        --> L is the length of the phone number;
+            new nodes are appended to the end of each array.
+        """
+        carrier, price = data
+        price = check_micros(price)
+        carriers = self.carriers
+        node = self._make_node(phone)
+
+        # now inject data at our node.
+        # if there is already data, keep the lower price!
+        # prices are integers, so on a tie the first one stays.
+        if carriers[node] == NO_CARRIER:
+            carriers[node] = self._carrier_id(carrier)
+            self.prices[node] = price
+            self.size += 1
+        elif price < self.prices[node]:
+            carriers[node] = self._carrier_id(carrier)
+            self.prices[node] = price
+
+
+    def _make_node(self, phone):
+        """
+        Follow the digits of a phone number from the root,
+        appending any missing nodes on the way.
+        Return the index of the node at the end of the path.
+        ~~~
+        best & worst case runtime: O(L)
+        --> L is the length of the phone number.
+        """
+        children = self.children
+        node = 0
+
+        for char in phone:
+            digit = ord(char) - 48
+            # a stray "+" or space would land in a sibling's slot.
+            if not 0 <= digit <= 9:
+                raise ValueError(f"not a digit string: {phone!r}")
+            slot = node * 10 + digit
+            next = children[slot]
+
+            # check if next node exists.
+            if not next:
+                # append an empty node and point to it.
+                next = self._new_node()
+                children[slot] = next
+            node = next
+
+        return node
+
+
+    def _new_node(self):
+        """
+        Append an empty node to the end of every node column.
+        Return the index of the new node.
+        """
+        node = len(self.carriers)
+        self.children.extend(EMPTY_BLOCK)
+        self.carriers.append(NO_CARRIER)
+        self.prices.append(0)
+        return node
+
+
+    def get_price(self, phone):
+        """
+        Find the longest matching prefix of a phone number.
+        Return its (carrier, price), or None if none match.
+        Raise ValueError if it is not a string of digits.
+        ~~~
+        best & worst case runtime: O(L)
+        --> L is the length of the phone number.
+        """
+        check_digits(phone)
+        children = self.children
+        carriers = self.carriers
+        node = 0
+        best = 0
+
+        for char in phone:
+            node = children[node * 10 + ord(char) - 48]
+            # a missing child means the path is a dead-end.
+            if not node:
+                break
+            # the deepest node with data is the best match.
+            if carriers[node] != NO_CARRIER:
+                best = node
+
+        if not best:
+            return None
+        return (self.carrier_names[carriers[best]], self.prices[best])
+
+
+    def trace(self, phone):
+        """
+        Find the longest matching prefix of a phone number like
+        get_price, & count the work it took. This is for
+        instrumentation; get_price itself counts nothing.
+        Return (data, nodes visited, match depth); the match
+        depth is the length of the matched prefix, or 0.
+        """
+        check_digits(phone)
+        children = self.children
+        carriers = self.carriers
+        node = 0
+        best = 0
+        visited = 0
+        depth = 0
+
+        for char in phone:
+            node = children[node * 10 + ord(char) - 48]
+            if not node:
+                break
+            visited += 1
+            if carriers[node] != NO_CARRIER:
+                best = node
+                depth = visited
+
+        if not best:
+            return None, visited, 0
+        data = (self.carrier_names[carriers[best]], self.prices[best])
+        return data, visited, depth
+
+
+    def price_many(self, phones):
+        """
+        Find the longest matching prefix of many phone numbers.
+        Return a list of (carrier, price) or None, in the
+        same order as the given phone numbers.
+        Raise ValueError if any is not a string of digits.
+        The numbers are walked in sorted order, so neighbours
+        share the walk down their common prefix; a number that
+        runs into the same dead-end as its neighbour is priced
+        without walking at all.
+        ~~~
+        runtime: O(n log n + S)
+        --> n numbers are sorted, & S is the number of digits
+            that are not shared with the previous number.
+        """
+        for phone in phones:
+            check_digits(phone)
+        children = self.children
+        carriers = self.carriers
+        results = [None] * len(phones)
+
+        # path_nodes[d] is the node reached after d digits of
+        # the previous number, & path_best[d] is the deepest
+        # node with data on the way there.
+        path_nodes = [0]
+        path_best = [0]
+        previous = ""
+
+        # every number starting with dead_key runs into the
+        # same dead-end as the previous one, & gets its result.
+        # "+" never starts a number, so nothing matches at first.
+        dead_key = "+"
+        result = None
+
+        for index in sorted(range(len(phones)), key=phones.__getitem__):
+            phone = phones[index]
+            if phone.startswith(dead_key):
+                results[index] = result
+                continue
+
+            # count the leading digits shared with the previous
+            # number; their part of the walk is already done.
+            shared = 0
+            limit = min(len(path_nodes) - 1, len(phone))
+            while shared < limit and phone[shared] == previous[shared]:
+                shared += 1
+            del path_nodes[shared + 1:]
+            del path_best[shared + 1:]
+            node = path_nodes[shared]
+            best = path_best[shared]
+            dead_key = "+"
+
+            # walk on from the deepest shared node.
+            for position in range(shared, len(phone)):
+                node = children[node * 10 + ord(phone[position]) - 48]
+                if not node:
+                    dead_key = phone[:position + 1]
+                    break
+                if carriers[node] != NO_CARRIER:
+                    best = node
+                path_nodes.append(node)
+                path_best.append(best)
+
+            result = None
+            if best:
+                result = (self.carrier_names[carriers[best]],
+                          self.prices[best])
+            results[index] = result
+            previous = phone
+
+        return results
@@ -0,0 +1,120 @@
+from fixedpoint import parse_micros
+from flattree import FlatDecimalTree
+import unittest
+
+
+class FlatDecimalTreeTest(unittest.TestCase):
+
+    def test_init(self):
+        tree = FlatDecimalTree()
+        assert tree.size == 0
+        assert tree.node_count() == 1
+        assert tree.is_empty() is True
+
+    def test_insert(self):
+        tree = FlatDecimalTree()
+        tree.insert('0', ("hello", 1))
+        assert tree.size == 1
+        assert tree.height() == 1
+        assert tree.search('0') == ("hello", 1)
+        # Insert a grandchild
+        tree.insert('01', ("hello", 2))
+        assert tree.search('01') == ("hello", 2)
+        assert tree.height() == 2
+        assert tree.node_count() == 3
+
+    def test_inserting_lower_price(self):
+        tree = FlatDecimalTree()
+        tree.insert('00', ("A", 1000000))
+        tree.insert('00', ("B", 300000))
+        assert tree.search('00') == ("B", 300000)
+        # Doesn't change the data since it is larger
+        tree.insert('00', ("C", 43000000))
+        assert tree.search('00') == ("B", 300000)
+        assert tree.size == 1
+
+    def test_equal_prices_tie_on_insertion_order(self):
+        tree = FlatDecimalTree()
+        tree.insert('00', ("A", parse_micros('0.30')))
+        # Prices are parsed straight from their text, so both are 300000 micro-dollars
+        tree.insert('00', ("B", parse_micros('0.3')))
+        assert tree.search('00') == ("A", 300000)
+        assert tree.prices.typecode == 'I'
+
+    def test_insert_rejects_non_digits(self):
+        tree = FlatDecimalTree()
+        with self.assertRaises(ValueError):
+            tree.insert('+1', ("A", 1))
+
+    def test_lookups_reject_non_digits(self):
+        tree = FlatDecimalTree([('1', ("A", 1))])
+        for phone in ('1-2', '1 2', '1/', '+1', '1²'):
+            with self.assertRaises(ValueError):
+                tree.get_price(phone)
+            with self.assertRaises(ValueError):
+                tree.trace(phone)
+            with self.assertRaises(ValueError):
+                tree.contains(phone)
+        with self.assertRaises(ValueError):
+            tree.price_many(['12', '1 2', '1/'])
+        assert tree.get_price('') is None
+
+    def test_contains(self):
+        tree = FlatDecimalTree([('00', ("A", 1))])
+        assert tree.contains('00') is True
+        assert tree.contains('0') is True
+        assert tree.contains('01') is False
+
+    def test_get_price(self):
+        tree = FlatDecimalTree()
+        tree.insert('1415', ("A", 20000))
+        tree.insert('1415234', ("A", 30000))
+        tree.insert('1415246', ("A", 10000))
+        tree.insert('1512', ("A", 40000))
+        # The longest matching prefix wins, even if it costs more
+        assert tree.get_price('14152345678') == ("A", 30000)
+        assert tree.get_price('15124156620') == ("A", 40000)
+        assert tree.get_price('1415') == ("A", 20000)
+        assert tree.get_price('19876543210') is None
+
+    def test_trace(self):
+        tree = FlatDecimalTree()
+        tree.insert('1415', ("A", 20000))
+        tree.insert('1415234', ("B", 30000))
+        # 7 nodes are walked, & the 7 digit route matches
+        assert tree.trace('14152345678') == (("B", 30000), 7, 7)
+        # The walk goes on past the last route, until a dead end
+        assert tree.trace('14152') == (("A", 20000), 5, 4)
+        assert tree.trace('19876543210') == (None, 1, 0)
+
+    def test_price_many(self):
+        tree = FlatDecimalTree()
+        tree.insert('1415', ("A", 20000))
+        tree.insert('1415234', ("B", 30000))
+        tree.insert('1512', ("A", 40000))
+        phones = ['19876543210', '14152345678', '1415999', '15124156620',
+                  '14152345679', '1', '']
+        # Results come back in the input order, not sorted order
+        assert tree.price_many(phones) == [tree.get_price(p) for p in phones]
+        assert tree.price_many(phones)[:2] == [None, ("B", 30000)]
+
+    def test_save_and_load(self):
+        import os
+        import tempfile
+        tree = FlatDecimalTree()
+        tree.insert('1415', ("A", 20000))
+        tree.insert('1415234', ("B", 30000))
+        handle, path = tempfile.mkstemp(suffix='.idx')
+        os.close(handle)
+        try:
+            tree.save(path)
+            for use_mmap in (True, False):
+                loaded = FlatDecimalTree.load(path, use_mmap=use_mmap)
+                assert loaded.size == 2
+                assert loaded.get_price('14152345678') == ("B", 30000)
+                assert loaded.price_many(['1415999', '2']) == [("A", 20000), None]
+            # A mapped tree is read-only
+            with self.assertRaises(TypeError):
+                FlatDecimalTree.load(path).insert('1415', ("C", 10000))
+        finally:
+            os.remove(path)
@@ -0,0 +1,176 @@
+"""
+Generate large, realistic route & phone number data files.
+
+The repo only ships route lists of up to 106K lines; this
+writes seeded synthetic ones of any size, in the same format:
+
+    route-costs-N.txt     +1415234,0.03    (one route a line)
+    phone-numbers-N.txt   +14152345678     (one number a line)
+
+Routes follow the shape of the shipped data: prefixes are
+mostly 7 to 10 digits long, a few country codes (like +1)
+hold most of the routes, & carriers overlap, so several of
+them price the same prefix. The same seed always writes the
+same file, & lines are streamed to disk a block at a time, so
+a 100M line file needs no more memory than a 100 line one.
+
+usage:
+    python generate.py routes 10000000
+    python generate.py routes 10000000 2      (carrier 2)
+    python generate.py routes 10000000 2 7    (carrier 2, seed 7)
+    python generate.py phones 10000
+"""
+
+
+# import necessary modules
+import os
+import random
+import sys
+import convert # local module
+
+
+# (country code, weight, digits in a full phone number).
+# the weights skew routes & numbers towards a few countries.
+COUNTRIES = [
+    ("1", 30, 11), ("44", 8, 12), ("49", 7, 13), ("33", 6, 11),
+    ("86", 6, 13), ("81", 5, 12), ("91", 5, 12), ("61", 4, 11),
+    ("34", 4, 11), ("39", 4, 12), ("55", 4, 13), ("52", 3, 12),
+    ("82", 3, 12), ("64", 2, 11), ("7", 2, 11), ("27", 2, 11),
+    ("31", 2, 11), ("46", 1, 11), ("353", 1, 12), ("971", 1, 12),
+    ("234", 1, 13), ("358", 1, 12),
+]
+
+# how often each prefix length (in digits) occurs in routes,
+# roughly as in route-costs-106000.
+PREFIX_LENGTHS = [(4, 4), (5, 4), (6, 6), (7, 410), (8, 330),
+                  (9, 175), (10, 70), (11, 1)]
+
+# lines are generated & written this many at a time.
+BLOCK_SIZE = 100000
+
+# the share of a carrier's routes that every carrier also has.
+OVERLAP = 0.5
+
+
+def _prefixes(rng):
+    """
+    Generate an endless stream of random (country code, route
+    prefix) pairs. Country codes are chosen by weight.
+    """
+    codes = [code for code, _, _ in COUNTRIES]
+    code_weights = [weight for _, weight, _ in COUNTRIES]
+    digits = {code: length for code, _, length in COUNTRIES}
+    lengths = [length for length, _ in PREFIX_LENGTHS]
+    length_weights = [weight for _, weight in PREFIX_LENGTHS]
+
+    while True:
+        block_codes = rng.choices(codes, code_weights, k=BLOCK_SIZE)
+        block_lengths = rng.choices(lengths, length_weights, k=BLOCK_SIZE)
+        for code, length in zip(block_codes, block_lengths):
+            # a route always has a digit after its country code,
+            # & is never longer than a full phone number.
+            length = min(max(length, len(code) + 1), digits[code])
+            rest = length - len(code)
+            yield code, code + str(rng.randrange(10 ** rest)).zfill(rest)
+
+
+def iter_routes(count, carrier=0, seed=0, overlap=OVERLAP):
+    """
+    Generate count "+prefix,price" lines of one carrier.
+    About overlap of the routes come from a stream shared by
+    every carrier with the same seed, so carriers compete on
+    the same prefixes; the rest belong to this carrier alone.
+    """
+    shared = _prefixes(random.Random(f"{seed}-shared"))
+    own = _prefixes(random.Random(f"{seed}-carrier-{carrier}"))
+    rng = random.Random(f"{seed}-prices-{carrier}")
+
+    for _ in range(count):
+        _, prefix = next(shared) if rng.random() < overlap else next(own)
+        # most prices are a few cents, with a long tail.
+        price = round(0.01 + rng.betavariate(2, 18), 2)
+        yield f"+{prefix},{price}\n"
+
+
+def iter_phones(count, seed=0, hit_rate=0.5):
+    """
+    Generate count "+number" lines.
+    About hit_rate of the numbers extend a shared route prefix,
+    so they hit routes of carriers with the same seed; the rest
+    are random numbers in a country chosen by weight.
+    """
+    shared = _prefixes(random.Random(f"{seed}-shared"))
+    codes = [code for code, _, _ in COUNTRIES]
+    weights = [weight for _, weight, _ in COUNTRIES]
+    digits = {code: length for code, _, length in COUNTRIES}
+    rng = random.Random(f"{seed}-phones")
+
+    for _ in range(count):
+        if rng.random() < hit_rate:
+            code, number = next(shared)
+        else:
+            code = number = rng.choices(codes, weights)[0]
+        rest = digits[code] - len(number)
+        if rest:
+            number += str(rng.randrange(10 ** rest)).zfill(rest)
+        yield f"+{number}\n"
+
+
+def write_lines(path, lines):
+    """
+    Stream lines to a file, one block at a time.
+    The file is written under a temporary name & then renamed,
+    so a half written file is never left behind.
+    Return the number of lines written.
+    """
+    count = 0
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        block = []
+        for line in lines:
+            block.append(line)
+            if len(block) == BLOCK_SIZE:
+                file.write("".join(block))
+                count += len(block)
+                block.clear()
+        file.write("".join(block))
+        count += len(block)
+    os.replace(temp_path, path)
+    return count
+
+
+def route_file_name(count, carrier=0):
+    """
+    Return the data name of a generated route list.
+    Carrier 0 gets the plain "route-costs-N" name.
+    """
+    if carrier:
+        return f"route-costs-{count}-{carrier}"
+    return f"route-costs-{count}"
+
+
+def main(kind, count, carrier=0, seed=0):
+    """
+    Write a route list or phone number file to the data folder.
+    Return the path of the file.
+    """
+    count, carrier, seed = int(count), int(carrier), int(seed)
+    if kind == "routes":
+        name = route_file_name(count, carrier)
+        lines = iter_routes(count, carrier, seed)
+    elif kind == "phones":
+        name = f"phone-numbers-{count}"
+        lines = iter_phones(count, seed)
+    else:
+        raise ValueError(f"unknown kind of data: {kind!r}")
+
+    path = os.path.join(convert.DATA_FOLDER, name + ".txt")
+    write_lines(path, lines)
+    return path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("routes", "phones"):
+        print(__doc__)
+        sys.exit(1)
+    print(main(*sys.argv[1:]))
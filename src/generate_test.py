@@ -0,0 +1,51 @@
+import generate
+import loader
+import os
+import tempfile
+import unittest
+
+
+class GenerateTest(unittest.TestCase):
+
+    def test_routes_are_seeded(self):
+        routes = list(generate.iter_routes(1000))
+        assert len(routes) == 1000
+        assert routes == list(generate.iter_routes(1000))
+        assert routes != list(generate.iter_routes(1000, seed=1))
+
+    def test_route_format(self):
+        lengths = set()
+        for line in generate.iter_routes(1000):
+            route, price = line.rstrip("\n").split(",")
+            assert route[0] == "+" and route[1:].isdigit()
+            assert 0.01 <= float(price) < 1.01
+            lengths.add(len(route) - 1)
+        assert {7, 8, 9, 10} <= lengths
+
+    def test_carriers_overlap(self):
+        def prefixes(carrier):
+            return {line.split(",")[0]
+                    for line in generate.iter_routes(2000, carrier)}
+        shared = prefixes(0) & prefixes(1)
+        assert 500 < len(shared) < 1500
+
+    def test_phones_hit_routes(self):
+        phones = [line.strip() for line in generate.iter_phones(1000)]
+        assert all(phone[0] == "+" and phone[1:].isdigit()
+                   for phone in phones)
+        routes = {line.split(",")[0] for line in generate.iter_routes(5000)}
+        hits = sum(phone[:length] in routes for phone in phones
+                   for length in range(5, 12))
+        assert hits > 100
+
+    def test_write_lines(self):
+        folder = tempfile.mkdtemp()
+        path = os.path.join(folder, "routes.txt")
+        try:
+            count = generate.write_lines(path, generate.iter_routes(250))
+            assert count == 250
+            assert len(list(loader.iter_routes(path))) == 250
+            assert not os.path.exists(path + ".tmp")
+        finally:
+            os.remove(path)
+            os.rmdir(folder)
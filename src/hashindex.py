@@ -0,0 +1,149 @@
+# This index finds the longest matching prefix with hash tables.
+# Scenario 2 probes one dictionary for every prefix of a number;
+# here there is one dictionary per prefix length that occurs in
+# the routes, & a number is probed from its longest possible
+# prefix down, stopping at the first hit.
+#
+# Most lengths never occur under a given leading digit, so each
+# digit keeps a bitmap of the lengths that do; a length whose
+# bit is clear is skipped without hashing anything.
+# The public api (insert, search, get_price...) is the same as
+# the DecimalSearchTree.
+
+from decimaltree import DIGITS
+
+
+class PrefixHashIndex(object):
+    def __init__(self, items=None):
+        """
+        Initialize hash index with given items.
+        items is an iterable of (phone, (carrier, price)).
+        """
+        # tables[length] is {route prefix: (carrier, price)}.
+        self.tables = {}
+
+        # bit k of masks[digit] is set when some route that
+        # starts with digit has k digits.
+        self.masks = [0] * 10
+
+        # probes[digit] is the same bitmap as a list of lengths,
+        # longest first; it is what a lookup iterates over.
+        self.probes = [[] for _ in range(10)]
+
+        # like DecimalSearchTree, size counts the routes.
+        self.size = 0
+
+        # insert items
+        if items is not None:
+            for phone, data in items:
+                self.insert(phone, data)
+
+
+    def __repr__(self):
+        """
+        Visually represent this index using a string.
+        Return the formatted string.
+        """
+        return f"PrefixHashIndex({self.size} routes)"
+
+
+    def is_empty(self):
+        """
+        Check if there are no routes in this index.
+        Return True or False based on result.
+        """
+        return self.size == 0
+
+
+    def height(self):
+        """
+        Return the length of the longest route prefix, which is
+        the height of the DecimalSearchTree with the same routes.
+        """
+        return max(self.tables, default=0)
+
+
+    def insert(self, phone, data):
+        """
+        insert a given {phone:(carrier, price)} pair.
+        the cheapest carrier is kept for every prefix.
+        ~~~
+        runtime: O(L)
+        --> L is the length of the phone number, to hash it.
+        """
+        if not phone.isdigit() or not phone.isascii():
+            raise ValueError(f"not a digit string: {phone!r}")
+
+        length = len(phone)
+        table = self.tables.get(length)
+        if table is None:
+            table = self.tables[length] = {}
+
+        # if there is already data, keep the lower price!
+        old_data = table.get(phone)
+        if old_data is None:
+            table[phone] = data
+            self.size += 1
+        elif data[1] < old_data[1]:
+            table[phone] = data
+        else:
+            return
+
+        digit = DIGITS[phone[0]]
+        mask = self.masks[digit]
+        if not mask >> length & 1:
+            mask |= 1 << length
+            self.masks[digit] = mask
+            self.probes[digit] = [
+                bit for bit in range(mask.bit_length() - 1, 0, -1)
+                if mask >> bit & 1]
+
+
+    def search(self, phone):
+        """
+        Return the (carrier, price) stored exactly at phone.
+        Return None if there is no route with that prefix.
+        """
+        table = self.tables.get(len(phone))
+        return table.get(phone) if table is not None else None
+
+
+    def contains(self, phone):
+        """
+        Is there a route with exactly this prefix?
+        Return True or False based on result.
+        """
+        return self.search(phone) is not None
+
+
+    def get_price(self, phone):
+        """
+        Find the longest matching prefix of a phone number.
+        Return its (carrier, price), or None if none match.
+        ~~~
+        runtime: O(k * L)
+        --> k is the number of lengths that start with the
+            leading digit, & each probe hashes a prefix.
+        """
+        if not phone:
+            return None
+        tables = self.tables
+        end = len(phone)
+        for length in self.probes[DIGITS[phone[0]]]:
+            if length <= end:
+                data = tables[length].get(phone[:length])
+                if data is not None:
+                    return data
+        return None
+
+
+    def price_many(self, phones):
+        """
+        Find the longest matching prefix of many phone numbers.
+        Return a list of (carrier, price) or None, in the same
+        order as the given phone numbers.
+        ~~~
+        runtime: O(n * k * L)
+        """
+        get_price = self.get_price
+        return [get_price(phone) for phone in phones]
@@ -0,0 +1,56 @@
+from decimaltree import DecimalSearchTree
+from hashindex import PrefixHashIndex
+import random
+import unittest
+
+
+class PrefixHashIndexTest(unittest.TestCase):
+
+    def test_insert(self):
+        index = PrefixHashIndex()
+        assert index.is_empty() is True
+        index.insert('00', ("A", 1000000))
+        index.insert('00', ("B", 300000))
+        index.insert('00', ("C", 43000000))
+        assert index.search('00') == ("B", 300000)
+        assert index.search('0') is None
+        assert index.size == 1
+        assert index.height() == 2
+        with self.assertRaises(ValueError):
+            index.insert('+1', ("A", 1))
+
+    def test_probes_only_lengths_under_leading_digit(self):
+        index = PrefixHashIndex()
+        index.insert('1415', ("A", 20000))
+        index.insert('1415234', ("A", 30000))
+        index.insert('44', ("B", 10000))
+        assert index.probes[1] == [7, 4]
+        assert index.probes[4] == [2]
+        assert index.probes[9] == []
+        assert index.masks[1] == (1 << 7) | (1 << 4)
+
+    def test_get_price(self):
+        index = PrefixHashIndex()
+        index.insert('1415', ("A", 20000))
+        index.insert('1415234', ("A", 30000))
+        index.insert('1415246', ("A", 10000))
+        index.insert('1512', ("A", 40000))
+        # The longest matching prefix wins, even if it costs more
+        assert index.get_price('14152345678') == ("A", 30000)
+        assert index.get_price('15124156620') == ("A", 40000)
+        assert index.get_price('1415') == ("A", 20000)
+        assert index.get_price('141') is None
+        assert index.get_price('19876543210') is None
+        assert index.get_price('') is None
+
+    def test_matches_decimal_search_tree(self):
+        rng = random.Random(0)
+        routes = [(str(rng.randint(1, 10 ** rng.randint(1, 8))),
+                   ("A", rng.random())) for _ in range(2000)]
+        phones = [str(rng.randint(10 ** 10, 10 ** 11 - 1))
+                  for _ in range(2000)]
+        index = PrefixHashIndex(routes)
+        tree = DecimalSearchTree(routes)
+        assert index.size == tree.size
+        assert index.height() == tree.height()
+        assert index.price_many(phones) == tree.price_many(phones)
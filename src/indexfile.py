@@ -0,0 +1,200 @@
+"""
+A versioned binary file format for parsed route data.
+
+An index file is a header, a table of columns, & then the
+raw bytes of every column. Each column is a typed array
+(like array.array), so reading one back is a single copy,
+with no parsing at all.
+
+    header   magic, version, column count, & the size, mtime
+             & digest of the text file it was built from.
+    columns  name, array typecode, item count & byte offset.
+    data     the column bytes, each starting 8 byte aligned.
+
+The source fields let a reader refuse an index that is older
+than its text file, so a stale index is never used silently.
+An index built from several text files keeps one combined key.
+
+An index can also be memory mapped read-only. Its columns are
+then memoryviews straight into the page cache, so every process
+mapping the same file shares one physical copy of it.
+"""
+
+
+# import necessary modules
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+
+
+MAGIC = b"CRIX"
+# version 2 stores tree prices as uint32 micro-dollars, &
+# version 3 the prices of every other index too.
+VERSION = 3
+
+# magic, version, column count, source size, source mtime,
+# & a 16 byte blake2b digest of the source file.
+HEADER = struct.Struct("<4sHHQq16s")
+
+# column name, array typecode, item count & byte offset.
+COLUMN = struct.Struct("<16sc7xQQ")
+
+
+def source_key(source, verify=True):
+    """
+    Return the (size, mtime, digest) of a source file.
+    source may also be a list of files; their sizes are added
+    up, the newest mtime is kept, & the digests are combined.
+    The digest is left blank unless verify is True.
+    """
+    paths = [source] if isinstance(source, str) else list(source)
+    size, mtime = 0, 0
+    hasher = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        stat = os.stat(path)
+        size += stat.st_size
+        mtime = max(mtime, stat.st_mtime_ns)
+        if verify:
+            with open(path, "rb") as file:
+                for block in iter(lambda: file.read(1 << 20), b""):
+                    hasher.update(block)
+    digest = hasher.digest() if verify else bytes(16)
+    return size, mtime, digest
+
+
+def write_index(path, columns, source=None):
+    """
+    Write a dictionary of {column name: array} to an index file.
+    If a source file is given, its key is saved in the header.
+    The file is written aside & then renamed into place, so a
+    reader never sees a half written index.
+    """
+    size, mtime, digest = 0, 0, bytes(16)
+    if source is not None:
+        size, mtime, digest = source_key(source)
+
+    # lay the columns out one after the other, 8 byte aligned.
+    offset = HEADER.size + COLUMN.size * len(columns)
+    table = []
+    for name, column in columns.items():
+        offset += -offset % 8
+        table.append((name, column, offset))
+        offset += column.itemsize * len(column)
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(HEADER.pack(
+            MAGIC, VERSION, len(columns), size, mtime, digest))
+        for name, column, offset in table:
+            file.write(COLUMN.pack(
+                name.encode(), column.typecode.encode(),
+                len(column), offset))
+        for name, column, offset in table:
+            file.write(bytes(offset - file.tell()))
+            column.tofile(file)
+    os.replace(temp_path, path)
+
+
+def read_header(buffer):
+    """
+    Read the header & column table at the start of a buffer.
+    Return the source key & a list of (name, typecode, count,
+    offset), or None if this is not a current index file.
+    """
+    if len(buffer) < HEADER.size:
+        return None
+    magic, version, count, size, mtime, digest = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        return None
+
+    table = []
+    for number in range(count):
+        name, typecode, items, offset = COLUMN.unpack_from(
+            buffer, HEADER.size + COLUMN.size * number)
+        table.append((name.rstrip(b"\0").decode(), typecode.decode(),
+                      items, offset))
+    return (size, mtime, digest), table
+
+
+def is_current(key, source, verify=False):
+    """
+    Check that a saved source key still matches its source.
+    The size & mtime are always checked; the digest is only
+    checked if verify is True, as that reads the whole source.
+    """
+    if source is None:
+        return True
+    paths = [source] if isinstance(source, str) else source
+    if not all(os.path.exists(path) for path in paths):
+        return False
+    size, mtime, digest = key
+    if verify:
+        return (size, mtime, digest) == source_key(source)
+    return (size, mtime) == source_key(source, verify=False)[:2]
+
+
+def read_index(path, source=None, verify=False):
+    """
+    Read an index file back into a dictionary of arrays.
+    Return None if the file is missing, is not a current
+    index file, or is stale compared to its source file.
+    """
+    try:
+        with open(path, "rb") as file:
+            buffer = file.read()
+    except FileNotFoundError:
+        return None
+
+    header = read_header(buffer)
+    if header is None:
+        return None
+    key, table = header
+    if not is_current(key, source, verify):
+        return None
+
+    columns = {}
+    view = memoryview(buffer)
+    for name, typecode, items, offset in table:
+        column = array(typecode)
+        column.frombytes(view[offset:offset + items * column.itemsize])
+        columns[name] = column
+    return columns
+
+
+def map_index(path, source=None, verify=False):
+    """
+    Memory map an index file read-only.
+    Return a dictionary of {column name: memoryview}, which
+    read straight from the mapped file without any copying.
+    Return None if the file is missing, is not a current
+    index file, or is stale compared to its source file.
+    """
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+
+    with file:
+        if os.fstat(file.fileno()).st_size < HEADER.size:
+            return None
+        # the mapping stays valid after the file is closed.
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header = read_header(mapping)
+    if header is None:
+        mapping.close()
+        return None
+    key, table = header
+    if not is_current(key, source, verify):
+        mapping.close()
+        return None
+
+    # the views keep the mapping alive for as long as needed.
+    columns = {}
+    view = memoryview(mapping)
+    for name, typecode, items, offset in table:
+        itemsize = array(typecode).itemsize
+        columns[name] = view[offset:offset + items * itemsize].cast(typecode)
+    return columns
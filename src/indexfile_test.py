@@ -0,0 +1,56 @@
+from array import array
+import indexfile
+import os
+import tempfile
+import unittest
+
+
+class IndexFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'routes.txt')
+        self.path = os.path.join(self.folder, 'routes.idx')
+        with open(self.source, 'w') as file:
+            file.write('+1415,0.02\n')
+
+    def tearDown(self):
+        for name in os.listdir(self.folder):
+            os.remove(os.path.join(self.folder, name))
+        os.rmdir(self.folder)
+
+    def test_round_trip(self):
+        columns = {
+            'prefixes': array('B', b'+1415\n+44'),
+            'carriers': array('H', [0, 3]),
+            'prices': array('d', [0.02, 0.5]),
+        }
+        indexfile.write_index(self.path, columns, self.source)
+        assert indexfile.read_index(self.path, self.source) == columns
+        assert indexfile.read_index(self.path, self.source, verify=True) == columns
+
+    def test_missing_index(self):
+        assert indexfile.read_index(self.path, self.source) is None
+
+    def test_stale_index(self):
+        indexfile.write_index(self.path, {'prices': array('d', [1.0])}, self.source)
+        # Rewrite the source with a different size and mtime
+        with open(self.source, 'w') as file:
+            file.write('+1415,0.03\n+44,0.5\n')
+        assert indexfile.read_index(self.path, self.source) is None
+
+    def test_not_an_index(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'dictionary = {}\n' * 4)
+        assert indexfile.read_index(self.path) is None
+
+    def test_map_index(self):
+        columns = {
+            'children': array('I', [0, 1, 2]),
+            'empty': array('d'),
+        }
+        indexfile.write_index(self.path, columns, [self.source])
+        mapped = indexfile.map_index(self.path, [self.source])
+        assert mapped['children'].tolist() == [0, 1, 2]
+        assert len(mapped['empty']) == 0
+        assert mapped['children'].readonly
@@ -0,0 +1,335 @@
+"""
+Opt-in instrumentation & profiling hooks.
+
+Nothing here runs unless it is asked for: the engines & the
+loader count nothing by themselves. A Metrics registry holds
+counters & histograms; it is filled by
+
+    loader.load_routes(..., metrics=metrics)
+        "build.read", "build.parse" & "build.insert" seconds,
+        timed once per block, not once per line.
+    InstrumentedEngine(engine, metrics)
+        "lookup.seconds", "lookup.nodes_visited" & "lookup.depth"
+        of every get_price, & "batch.seconds" & "batch.size" of
+        every price_many. Engines with a trace method (the
+        decimal & flat trees) report nodes visited & depth;
+        for a batch, only every trace_every-th number is traced,
+        after the batch is timed.
+
+Lookups of a blocking engine are run in threads (see
+service.py), so a registry is filled under a lock.
+
+Any other component with a stats() method (like a PriceCache,
+for its hits) can be added as a source of the snapshot.
+
+A Profiler runs cProfile between start & stop, & traces the
+largest allocations with tracemalloc between start_memory &
+stop_memory; neither slows anything down outside that window.
+"""
+
+
+# import necessary modules
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+# histogram bucket upper bounds: seconds from 1 us to about 8 s,
+# & batch sizes up to about 1M, doubling each bucket; & whole
+# counts (like digits) from 0 to 16.
+SECONDS_BOUNDS = [1e-6 * (1 << power) for power in range(24)]
+SIZE_BOUNDS = [1 << power for power in range(21)]
+COUNT_BOUNDS = list(range(17))
+
+
+class Histogram(object):
+    def __init__(self, bounds=SECONDS_BOUNDS):
+        """
+        Initialize an empty histogram. bounds are the sorted
+        upper bounds of its buckets; larger values are counted
+        in one last bucket of their own.
+        """
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+
+    def __repr__(self):
+        """
+        Visually represent this histogram using a string.
+        Return the formatted string.
+        """
+        return f"Histogram({self.count} values, mean {self.mean():g})"
+
+
+    def observe(self, value):
+        """
+        Count one value in its bucket.
+        ~~~
+        runtime: O(log b)
+        --> b is the number of buckets.
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+
+    def mean(self):
+        """
+        Return the mean of every value, or 0 if there are none.
+        """
+        return self.total / self.count if self.count else 0
+
+
+    def percentile(self, fraction):
+        """
+        Return the upper bound of the bucket below which that
+        fraction of the values fall; the largest value itself
+        if that is the last bucket.
+        """
+        if not self.count:
+            return 0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+    def summary(self):
+        """
+        Return a dictionary of the count, mean, extremes &
+        approximate percentiles of the values.
+        """
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(0.50),
+            "p99": self.percentile(0.99),
+        }
+
+
+class Metrics(object):
+    def __init__(self):
+        """
+        Initialize an empty registry of counters & histograms.
+        """
+        self.counters = {}
+        self.histograms = {}
+
+        # {name: function returning a stats dictionary}
+        self.sources = {}
+
+        # guards the counters & histograms.
+        self.lock = threading.Lock()
+
+
+    def __repr__(self):
+        """
+        Visually represent this registry using a string.
+        Return the formatted string.
+        """
+        return (f"Metrics({len(self.counters)} counters, "
+                f"{len(self.histograms)} histograms)")
+
+
+    def count(self, name, amount=1):
+        """
+        Add amount to a counter.
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+
+    def observe(self, name, value, bounds=SECONDS_BOUNDS):
+        """
+        Count a value in a histogram, creating it with bounds if
+        it is new.
+        """
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(bounds)
+            histogram.observe(value)
+
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Time the body of a with statement into a histogram of
+        seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+
+    def add_source(self, name, stats):
+        """
+        Include stats(), a dictionary, in every snapshot.
+        """
+        self.sources[name] = stats
+
+
+    def snapshot(self):
+        """
+        Return a dictionary of every counter, histogram summary
+        & source, ready to be written as JSON.
+        """
+        with self.lock:
+            snapshot = {
+                "counters": dict(self.counters),
+                "histograms": {name: histogram.summary()
+                               for name, histogram in self.histograms.items()},
+            }
+        for name, stats in self.sources.items():
+            snapshot[name] = stats()
+        return snapshot
+
+
+    def reset(self):
+        """
+        Drop every counter & histogram; the sources are kept.
+        """
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+class InstrumentedEngine(object):
+    def __init__(self, engine, metrics, trace_every=0):
+        """
+        Initialize an instrumented lookup engine that records
+        every lookup of engine into metrics. A batch walks its
+        numbers together, so with trace_every, every that many
+        numbers of a batch are traced again one by one, to
+        record their nodes visited & match depth.
+        """
+        self.engine = engine
+        self.metrics = metrics
+        self.trace_every = trace_every
+
+
+    def __repr__(self):
+        """
+        Visually represent this engine using a string.
+        Return the formatted string.
+        """
+        return f"InstrumentedEngine({self.engine!r})"
+
+
+    def get_price(self, phone):
+        """
+        Find the longest matching prefix of a phone number, &
+        record its latency, nodes visited & match depth.
+        Return its (carrier, price), or None if none match.
+        """
+        metrics = self.metrics
+        trace = getattr(self.engine, "trace", None)
+        start = time.perf_counter()
+        if trace is None:
+            data = self.engine.get_price(phone)
+        else:
+            data, visited, depth = trace(phone)
+        metrics.observe("lookup.seconds", time.perf_counter() - start)
+        if trace is not None:
+            metrics.observe("lookup.nodes_visited", visited, COUNT_BOUNDS)
+            metrics.observe("lookup.depth", depth, COUNT_BOUNDS)
+        metrics.count("lookup.matched" if data is not None else "lookup.unmatched")
+        return data
+
+
+    def price_many(self, phones):
+        """
+        Price many phone numbers, & record the latency & size of
+        the batch.
+        Return a list of (carrier, price) or None, in the same
+        order as the given phone numbers.
+        """
+        metrics = self.metrics
+        start = time.perf_counter()
+        results = self.engine.price_many(phones)
+        metrics.observe("batch.seconds", time.perf_counter() - start)
+        metrics.observe("batch.size", len(phones), SIZE_BOUNDS)
+
+        trace = getattr(self.engine, "trace", None)
+        if trace is not None and self.trace_every:
+            for phone in phones[::self.trace_every]:
+                _, visited, depth = trace(phone)
+                metrics.observe("lookup.nodes_visited", visited, COUNT_BOUNDS)
+                metrics.observe("lookup.depth", depth, COUNT_BOUNDS)
+        return results
+
+
+class Profiler(object):
+    def __init__(self):
+        """
+        Initialize a profiler; nothing is profiled until start().
+        """
+        self.profile = None
+
+
+    def start(self):
+        """
+        Start profiling every function call with cProfile.
+        Raise ValueError if a profile is already running.
+        """
+        if self.profile is not None:
+            raise ValueError("a profile is already running")
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+
+    def stop(self, top=20):
+        """
+        Stop profiling. Return the report of the top functions
+        by cumulative time, as text.
+        """
+        if self.profile is None:
+            raise ValueError("no profile is running")
+        profile, self.profile = self.profile, None
+        profile.disable()
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(top)
+        return text.getvalue()
+
+
+    def start_memory(self):
+        """
+        Start tracing memory allocations with tracemalloc.
+        Raise ValueError if memory is already being traced.
+        """
+        if tracemalloc.is_tracing():
+            raise ValueError("memory is already being traced")
+        tracemalloc.start()
+
+
+    def stop_memory(self, top=10):
+        """
+        Stop tracing memory, since tracing slows every allocation.
+        Return the top lines of code by memory allocated while it
+        was traced, & still held, as a list of strings.
+        """
+        if not tracemalloc.is_tracing():
+            raise ValueError("memory is not being traced")
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        return [str(stat) for stat in snapshot.statistics("lineno")[:top]]
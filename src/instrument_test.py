@@ -0,0 +1,98 @@
+from flattree import FlatDecimalTree
+from instrument import COUNT_BOUNDS, Histogram, InstrumentedEngine, Metrics, Profiler
+from pricecache import PriceCache
+import loader
+import os
+import tracemalloc
+import tempfile
+import unittest
+
+
+def make_tree():
+    tree = FlatDecimalTree()
+    tree.insert('1415', ('A', 20000))
+    tree.insert('1415234', ('B', 30000))
+    return tree
+
+
+class InstrumentTest(unittest.TestCase):
+
+    def test_histogram(self):
+        histogram = Histogram(COUNT_BOUNDS)
+        for value in (1, 2, 2, 3, 40):
+            histogram.observe(value)
+        summary = histogram.summary()
+        assert (summary['count'], summary['min'], summary['max']) == (5, 1, 40)
+        assert summary['mean'] == 48 / 5
+        assert summary['p50'] == 2
+        # Values past the last bound land in a bucket of their own
+        assert summary['p99'] == 40
+        assert Histogram().summary()['p99'] == 0
+
+    def test_instrumented_lookups(self):
+        metrics = Metrics()
+        engine = InstrumentedEngine(make_tree(), metrics, trace_every=1)
+        assert engine.get_price('14152345678') == ('B', 30000)
+        assert engine.get_price('19876543210') is None
+        assert engine.price_many(['14155550000', '1']) == [('A', 20000), None]
+
+        snapshot = metrics.snapshot()
+        assert snapshot['counters'] == {'lookup.matched': 1, 'lookup.unmatched': 1}
+        histograms = snapshot['histograms']
+        assert histograms['lookup.seconds']['count'] == 2
+        assert histograms['batch.size']['max'] == 2
+        # Two single lookups & both numbers of the batch were traced
+        assert histograms['lookup.depth']['count'] == 4
+        assert histograms['lookup.depth']['max'] == 7
+        assert histograms['lookup.nodes_visited']['min'] == 1
+
+    def test_sources(self):
+        metrics = Metrics()
+        cache = PriceCache(make_tree())
+        metrics.add_source('cache', cache.stats)
+        engine = InstrumentedEngine(cache, metrics)
+        engine.get_price('1415')
+        engine.get_price('1415')
+        assert metrics.snapshot()['cache']['hits'] == 1
+        metrics.reset()
+        assert metrics.snapshot()['counters'] == {}
+        assert 'cache' in metrics.snapshot()
+
+    def test_build_phases(self):
+        folder = tempfile.mkdtemp()
+        path = os.path.join(folder, 'routes.txt')
+        with open(path, 'w') as file:
+            file.write('+1415,0.02\n+44,0.1\n')
+        metrics = Metrics()
+        loader.load_routes(FlatDecimalTree(), 'A', path, report_every=0, metrics=metrics)
+        os.remove(path)
+        os.rmdir(folder)
+        histograms = metrics.snapshot()['histograms']
+        assert {'build.read', 'build.parse', 'build.insert'} <= set(histograms)
+        assert metrics.counters['build.lines'] == 2
+
+    def test_profiler(self):
+        profiler = Profiler()
+        profiler.start()
+        with self.assertRaises(ValueError):
+            profiler.start()
+        make_tree().get_price('14152345678')
+        assert 'get_price' in profiler.stop(top=50)
+        with self.assertRaises(ValueError):
+            profiler.stop()
+
+    def test_memory_window(self):
+        profiler = Profiler()
+        profiler.start_memory()
+        with self.assertRaises(ValueError):
+            profiler.start_memory()
+        trees = [make_tree() for _ in range(10)]
+        assert profiler.stop_memory(top=5)
+        # Tracing stops with the snapshot
+        assert not tracemalloc.is_tracing()
+        with self.assertRaises(ValueError):
+            profiler.stop_memory()
+
+
+if __name__ == '__main__':
+    unittest.main()
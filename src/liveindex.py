@@ -0,0 +1,210 @@
+"""
+A route index that can be rebuilt & swapped while in use.
+
+Lookups always go through LiveIndex.current, a reference to
+one finished engine. A new version is built off to the side
+in a background thread, & is only swapped in once it is done;
+so no lookup ever sees a half-built tree. A lookup that is
+already running keeps its own reference to the old version,
+& finishes on it.
+
+Only one rebuild runs at a time, so at most two versions are
+ever resident: the one serving lookups, & the one being built.
+
+A carrier's changes can also be applied in place, without a
+rebuild, with apply_delta; but only to an engine that keeps
+every carrier's price, i.e. a CarrierPriceTree. The flat,
+ranked & other trees only keep the cheapest carrier, so they
+must be rebuilt, & apply_delta turns them away with a
+ValueError.
+"""
+
+
+# import necessary modules
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import loader # local module
+
+
+class LiveIndex(object):
+    def __init__(self, engine):
+        """
+        Initialize the live index with a finished engine.
+        """
+        self.current = engine
+        self.version = 1
+
+        # a single worker thread queues up the rebuilds,
+        # which keeps peak memory at two versions.
+        self._builder = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="rebuild")
+        self._swap_lock = threading.Lock()
+
+        # functions called with (old engine, new engine) after
+        # every swap; caches use these to drop stale results.
+        self.listeners = []
+
+        # a dictionary describing the most recent swap.
+        self.last_swap = None
+
+
+    def __repr__(self):
+        """
+        Visually represent this index using a string.
+        Return the formatted string.
+        """
+        return f"LiveIndex(version {self.version}, {self.current!r})"
+
+
+    def get_price(self, phone):
+        """
+        Find the longest matching prefix of a phone number,
+        using whichever version is current right now.
+        """
+        return self.current.get_price(phone)
+
+
+    def price_many(self, phones):
+        """
+        Price many phone numbers, all on the same version.
+        """
+        return self.current.price_many(phones)
+
+
+    def swap(self, engine):
+        """
+        Make a finished engine the current version.
+        Return the engine it replaced.
+        ~~~
+        runtime: O(1)
+        --> a single reference is replaced.
+        """
+        with self._swap_lock:
+            old_engine = self.current
+            self.current = engine
+            self.version += 1
+        for listener in self.listeners:
+            listener(old_engine, engine)
+        return old_engine
+
+
+    def rebuild(self, build):
+        """
+        Call build() in the background to make a new engine,
+        then swap it in. Rebuilds run one at a time, in order.
+        Return a Future of the swap report dictionary.
+        """
+        return self._builder.submit(self._rebuild, build)
+
+
+    def _rebuild(self, build):
+        """
+        Build a new engine, swap it in, & report on it.
+        This runs on the builder thread.
+        """
+        start = time.perf_counter()
+        engine = build()
+        build_time = time.perf_counter() - start
+
+        # the new version is built & the old one still serves,
+        # so this is the memory of this swap, with both resident.
+        # The peak rss of the process only ever grows, so it would
+        # only show the first rebuild; & the rss before the build
+        # is no baseline either, as memory freed by an older
+        # version is reused by the next build.
+        memory_both = loader.current_memory()
+
+        old_engine = self.swap(engine)
+        # drop our reference, so the old version is freed as
+        # soon as the last lookup running on it is finished.
+        del old_engine
+
+        self.last_swap = {
+            "version": self.version,
+            "build_seconds": build_time,
+            "swap_memory_mb": memory_both,
+        }
+        return self.last_swap
+
+
+    def apply_delta(self, carrier, delta):
+        """
+        Apply a carrier's RouteDelta to the current version in
+        place, rather than rebuilding it. The engine must have
+        an apply_delta method, like a CarrierPriceTree does.
+        Each prefix changes over on its own, so a lookup that is
+        running meanwhile sees a prefix either before or after
+        its change, but never half-changed.
+        This runs on the builder thread, so it never races with
+        a rebuild. Return a Future of the prefixes touched.
+        Raise ValueError if the current engine cannot apply it.
+        """
+        check_delta_engine(self.current)
+        return self._builder.submit(self._apply_delta, carrier, delta)
+
+
+    def _apply_delta(self, carrier, delta):
+        """
+        Apply a delta to the current engine, & report it.
+        This runs on the builder thread.
+        """
+        engine = self.current
+        # a rebuild queued ahead of the delta may have swapped
+        # in an engine that cannot apply it.
+        check_delta_engine(engine)
+        count = engine.apply_delta(carrier, delta)
+        with self._swap_lock:
+            self.version += 1
+        for listener in self.listeners:
+            listener(engine, engine)
+        return count
+
+
+    def close(self):
+        """
+        Wait for any queued rebuilds, then stop the builder.
+        """
+        self._builder.shutdown(wait=True)
+
+
+def check_delta_engine(engine):
+    """
+    Raise ValueError unless engine can apply a RouteDelta in
+    place, like a CarrierPriceTree.
+    """
+    if not hasattr(engine, "apply_delta"):
+        raise ValueError(f"{engine!r} cannot apply a route delta in place; "
+                         f"use a CarrierPriceTree, or rebuild it")
+
+
+async def watch(live_index, interval, key, build, log=sys.stderr):
+    """
+    Every interval seconds, call key(); whenever its value has
+    changed, rebuild live_index with build() & swap it in.
+    A rebuild that fails (like on a route file that is still
+    being written, or missing) is logged, & the current version
+    is kept; watching goes on, & the next change is built as
+    usual. This runs until it is cancelled.
+    """
+    last_key = key()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            new_key = key()
+            if new_key == last_key:
+                continue
+            last_key = new_key
+            report = await asyncio.wrap_future(live_index.rebuild(build))
+        except Exception as error:
+            print(f"rebuild failed, still serving version "
+                  f"{live_index.version}: {error!r}", file=log)
+            continue
+        memory = ""
+        if report["swap_memory_mb"] is not None:
+            memory = f", {report['swap_memory_mb']:.2f} mb with both versions"
+        print(f"swapped in version {report['version']}: "
+              f"built in {report['build_seconds']:.2f} sec{memory}",
+              file=log)
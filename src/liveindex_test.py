@@ -0,0 +1,109 @@
+from carriertree import CarrierPriceTree
+from decimaltree import DecimalSearchTree
+from liveindex import LiveIndex, watch
+from routediff import RouteDelta
+import asyncio
+import io
+import threading
+import unittest
+
+
+def make_tree(price):
+    tree = DecimalSearchTree()
+    tree.insert('1415', ('A', price))
+    return tree
+
+
+class LiveIndexTest(unittest.TestCase):
+
+    def test_swap(self):
+        live = LiveIndex(make_tree(20000))
+        assert live.get_price('14152345678') == ('A', 20000)
+        old = live.swap(make_tree(10000))
+        assert old.search('1415') == ('A', 20000)
+        assert live.get_price('14152345678') == ('A', 10000)
+        assert live.version == 2
+        live.close()
+
+    def test_rebuild_keeps_old_version_until_done(self):
+        live = LiveIndex(make_tree(20000))
+        started = threading.Event()
+        release = threading.Event()
+
+        def build():
+            started.set()
+            release.wait()
+            return make_tree(10000)
+
+        future = live.rebuild(build)
+        started.wait()
+        # Lookups still see the old version while the new one is built
+        assert live.price_many(['1415']) == [('A', 20000)]
+        release.set()
+        report = future.result()
+        assert report['version'] == 2
+        assert report['swap_memory_mb'] > 0
+        assert live.price_many(['1415']) == [('A', 10000)]
+        live.close()
+
+    def test_failed_rebuild_keeps_current(self):
+        live = LiveIndex(make_tree(20000))
+
+        def build():
+            raise OSError('route file went missing')
+
+        with self.assertRaises(OSError):
+            live.rebuild(build).result()
+        assert live.version == 1
+        assert live.get_price('1415') == ('A', 20000)
+        live.close()
+
+    def test_watch_survives_failed_rebuild(self):
+        live = LiveIndex(make_tree(20000))
+        keys = iter([1, 2, 3])
+        prices = iter([None, 10000])
+        log = io.StringIO()
+
+        def build():
+            price = next(prices)
+            if price is None:
+                raise OSError('route file is half written')
+            return make_tree(price)
+
+        async def run():
+            task = asyncio.create_task(watch(live, 0, lambda: next(keys, 3), build, log))
+            for _ in range(100):
+                if live.version == 2:
+                    break
+                await asyncio.sleep(0.01)
+            task.cancel()
+
+        asyncio.run(run())
+        # The first rebuild failed & was logged; the next change was built
+        assert 'rebuild failed, still serving version 1' in log.getvalue()
+        assert live.version == 2
+        assert live.get_price('1415') == ('A', 10000)
+        live.close()
+
+    def test_apply_delta(self):
+        tree = CarrierPriceTree()
+        tree.insert('1415', ('A', 20000))
+        live = LiveIndex(tree)
+        delta = RouteDelta({}, {'1415': 10000}, set())
+        assert live.apply_delta('A', delta).result() == 1
+        assert live.get_price('1415') == ('A', 10000)
+        assert live.version == 2
+        # Trees that only keep the cheapest carrier are turned away up front
+        live.swap(make_tree(20000))
+        with self.assertRaises(ValueError):
+            live.apply_delta('A', delta)
+        live.close()
+
+    def test_listeners(self):
+        live = LiveIndex(make_tree(20000))
+        swaps = []
+        live.listeners.append(lambda old, new: swaps.append((old, new)))
+        new_tree = make_tree(10000)
+        live.swap(new_tree)
+        assert swaps[0][1] is new_tree
+        live.close()
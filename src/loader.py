@@ -0,0 +1,288 @@
+"""
+Stream carrier route files straight into a lookup engine.
+
+Route files are read in blocks of BLOCK_SIZE (16 mb), each
+finished to the end of its last line, & every route of a
+block is inserted before the next block is read; so memory
+stays bounded by the size of the engine plus one block, not by
+the size of the file.
+
+Lines are not parsed one at a time: each block is split into a
+column of prefixes & a column of prices in micro-dollars with a
+few bulk string operations (see parse_routes).
+
+For many large files, load_parallel parses them in a pool of
+processes instead. Each worker returns the cheapest price of
+every prefix in its chunk, & the chunks are merged at the end.
+"""
+
+
+# import necessary modules
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from array import array
+from fixedpoint import parse_micros
+
+
+# route files are read & parsed this many bytes at a time.
+BLOCK_SIZE = 1 << 24
+
+# every byte but the comma & newline, which separate the fields.
+NOT_SEPARATORS = bytes(byte for byte in range(256) if byte not in b",\n")
+
+
+def current_memory():
+    """
+    Return the resident memory of this process right now in mb,
+    from /proc/self/statm. Unlike peak_memory, this goes back
+    down once memory is freed, so it can measure one step of a
+    long running process on its own.
+    Return None where there is no /proc (like on macOS).
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+    except OSError:
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / float(1 << 20)
+
+
+def peak_memory():
+    """
+    Return the peak resident memory of this process in mb,
+    over its whole life so far.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # linux returns kilobytes and macOS returns bytes.
+    if platform.system() == "Darwin":
+        return usage / float(1 << 20)
+    return usage / float(1 << 10)
+
+
+def parse_routes(text, strip_plus=True):
+    """
+    Parse a block of "+prefix,price" lines in bulk.
+    Return two columns: a list of prefixes, & an array of
+    prices in micro-dollars (see fixedpoint). Blank lines are
+    skipped; with strip_plus, the "+" is removed from each
+    prefix. Raise ValueError on a malformed line or price.
+    ~~~
+    runtime: O(n), but with no python code run per line.
+    --> the block is split with a few string methods, & each
+        distinct price string is only converted once.
+    """
+    if "\r" in text:
+        text = text.replace("\r", "")
+    while "\n\n" in text:
+        text = text.replace("\n\n", "\n")
+    text = text.strip("\n")
+    if not text:
+        return [], array("I")
+
+    # every line needs exactly one comma, or the columns would
+    # silently slide out of line with each other. Comparing the
+    # totals of the block would let a line with 2 commas cancel
+    # out a line with none; so rather, with every other byte
+    # deleted, the commas & newlines must strictly alternate.
+    separators = text.encode().translate(None, NOT_SEPARATORS)
+    if separators != b",\n" * text.count("\n") + b",":
+        raise ValueError("every route line needs one comma")
+    if strip_plus:
+        text = text.replace("+", "")
+
+    # commas & newlines both separate fields, so one split
+    # gives prefix, price, prefix, price...
+    fields = text.replace("\n", ",").split(",")
+    prefixes = fields[0::2]
+    price_texts = fields[1::2]
+
+    # prices repeat a lot; convert each distinct one once,
+    # straight from its text, without going through a float.
+    table = {price: parse_micros(price) for price in set(price_texts)}
+    return prefixes, array("I", map(table.__getitem__, price_texts))
+
+
+def iter_route_blocks(path, block_size=BLOCK_SIZE, metrics=None):
+    """
+    Generate the (prefixes, prices) columns of a route file,
+    one block of about block_size bytes at a time.
+    With metrics (an instrument.Metrics), the reading &
+    parsing of every block is timed as "build.read" &
+    "build.parse".
+    ~~~
+    memory: O(block size)
+    """
+    with open(path, "rb") as file:
+        while True:
+            start = time.perf_counter()
+            block = file.read(block_size)
+            if not block:
+                return
+            # finish the last line of the block.
+            block += file.readline()
+            if metrics is None:
+                yield parse_routes(block.decode())
+                continue
+
+            parsed = time.perf_counter()
+            metrics.observe("build.read", parsed - start)
+            columns = parse_routes(block.decode())
+            metrics.observe("build.parse", time.perf_counter() - parsed)
+            yield columns
+
+
+def iter_routes(path):
+    """
+    Generate the (prefix, price) routes of a route file.
+    The "+" is removed from each prefix; blank lines are skipped.
+    ~~~
+    runtime: O(n), memory: O(block size)
+    """
+    for prefixes, prices in iter_route_blocks(path):
+        yield from zip(prefixes, prices)
+
+
+def load_routes(engine, carrier, path, report_every=1000000,
+                report_file=sys.stderr, metrics=None):
+    """
+    Insert every route of a carrier's route file into engine.
+    Every report_every lines (checked after each block), print
+    how many lines were loaded, the lines per second, & the peak
+    memory so far.
+    A report_every of 0 turns the reports off.
+    With metrics (an instrument.Metrics), the read, parse &
+    insert phases are timed once per block, & the lines counted.
+    Return the number of lines loaded.
+    ~~~
+    runtime: O(n * L), memory: O(block size) on top of the engine.
+    --> n routes of length L are inserted one at a time.
+    """
+    start = time.perf_counter()
+    insert = engine.insert
+    lines = 0
+    for prefixes, prices in iter_route_blocks(path, metrics=metrics):
+        inserted = time.perf_counter()
+        for prefix, price in zip(prefixes, prices):
+            insert(prefix, (carrier, price))
+        if metrics is not None:
+            metrics.observe("build.insert", time.perf_counter() - inserted)
+            metrics.count("build.lines", len(prefixes))
+        # report once a block crosses another report_every lines.
+        if report_every and (
+                (lines + len(prefixes)) // report_every > lines // report_every):
+            report(carrier, lines + len(prefixes), start, report_file)
+        lines += len(prefixes)
+
+    if report_every:
+        report(carrier, lines, start, report_file)
+    return lines
+
+
+def report(carrier, lines, start, report_file=sys.stderr):
+    """
+    Print the progress of a route file that is being loaded.
+    """
+    elapsed = time.perf_counter() - start
+    rate = lines / elapsed if elapsed else 0
+    print(f"{carrier}: {lines} lines, {rate:.0f} lines/sec, "
+          f"peak memory {peak_memory():.2f} mb", file=report_file)
+
+
+def chunk_ranges(path, chunks):
+    """
+    Split a file into about chunks byte ranges of equal size.
+    Every range ends right after a newline, so no line is cut.
+    Return a list of (start, end) byte offsets.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as file:
+        for number in range(1, chunks):
+            file.seek(max(size * number // chunks, bounds[-1]))
+            # skip ahead to the start of the next line.
+            file.readline()
+            bounds.append(min(file.tell(), size))
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:])
+            if start < end]
+
+
+def min_price_table(carrier, path, start=0, end=None):
+    """
+    Parse the lines of a route file between two byte offsets.
+    Return (carrier, {prefix: lowest price}) for that chunk.
+    This runs inside a worker process of load_parallel.
+    """
+    table = {}
+    with open(path, "rb") as file:
+        file.seek(start)
+        block = file.read(-1 if end is None else end - start)
+
+    prefixes, prices = parse_routes(block.decode())
+    for route, price in zip(prefixes, prices):
+        # keep the lower price, like DecimalSearchTree.insert.
+        old_price = table.get(route)
+        if old_price is None or price < old_price:
+            table[route] = price
+    return carrier, table
+
+
+def _min_price_task(task):
+    """
+    Unpack a (carrier, path, start, end) task for a worker.
+    """
+    return min_price_table(*task)
+
+
+def merge_tables(partials):
+    """
+    Merge (carrier, {prefix: price}) tables into one table of
+    {prefix: (carrier, price)}, keeping the cheapest carrier.
+    On a tie the earlier table wins, just like inserting the
+    carrier files one after another.
+    """
+    merged = {}
+    for carrier, table in partials:
+        for prefix, price in table.items():
+            best = merged.get(prefix)
+            if best is None or price < best[1]:
+                merged[prefix] = (carrier, price)
+    return merged
+
+
+def load_parallel(engine, carriers, workers=None, chunk_size=1 << 24):
+    """
+    Parse every carrier's route file in a pool of processes,
+    then insert the cheapest carrier of each prefix into engine.
+    carriers is a dictionary of {carrier name: file path}.
+    Large files are cut into chunks of about chunk_size bytes,
+    so even a single carrier file is parsed in parallel.
+    Return the number of prefixes inserted.
+    ~~~
+    runtime: O(n / w + p)
+    --> n lines are parsed by w workers, & the p distinct
+        prefixes are merged & inserted by this process.
+    """
+    tasks = []
+    for carrier, path in carriers.items():
+        chunks = max(1, -(-os.path.getsize(path) // chunk_size))
+        for start, end in chunk_ranges(path, chunks):
+            tasks.append((carrier, path, start, end))
+
+    if workers == 1:
+        merged = merge_tables(map(_min_price_task, tasks))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            # imap keeps the task order, so ties break the same
+            # way as a sequential load; & each chunk's table is
+            # merged (then dropped) as soon as it comes back.
+            merged = merge_tables(pool.imap(_min_price_task, tasks))
+
+    for prefix, data in merged.items():
+        engine.insert(prefix, data)
+    return len(merged)
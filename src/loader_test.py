@@ -0,0 +1,76 @@
+from array import array
+from decimaltree import DecimalSearchTree
+import io
+import loader
+import os
+import tempfile
+import unittest
+
+
+class LoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(handle, 'w') as file:
+            file.write('+1415,0.02\n+1415234,0.03\n\n+1415,0.01\n')
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_iter_routes(self):
+        routes = list(loader.iter_routes(self.path))
+        assert routes == [('1415', 20000), ('1415234', 30000), ('1415', 10000)]
+
+    def test_parse_routes(self):
+        prefixes, prices = loader.parse_routes('+1415,0.02\r\n\n\n+44,0.5')
+        assert prefixes == ['1415', '44']
+        assert prices.typecode == 'I'
+        assert prices.tolist() == [20000, 500000]
+        prefixes, _ = loader.parse_routes('+1415,0.02\n', strip_plus=False)
+        assert prefixes == ['+1415']
+        assert loader.parse_routes('\n') == ([], array('d'))
+        with self.assertRaises(ValueError):
+            loader.parse_routes('+1415,0.02\n+44\n')
+        # A line with 2 commas does not make up for a line with none
+        with self.assertRaises(ValueError):
+            loader.parse_routes('+1415,0.02,0.03\n+44\n')
+
+    def test_iter_route_blocks(self):
+        # Tiny blocks still end on whole lines
+        blocks = list(loader.iter_route_blocks(self.path, block_size=4))
+        prefixes = [prefix for block, _ in blocks for prefix in block]
+        assert prefixes == ['1415', '1415234', '1415']
+
+    def test_load_routes(self):
+        tree = DecimalSearchTree()
+        report = io.StringIO()
+        lines = loader.load_routes(tree, 'A', self.path, 2, report)
+        assert lines == 3
+        assert tree.search('1415') == ('A', 10000)
+        assert tree.search('1415234') == ('A', 30000)
+        # One report after 2 lines, and one at the end
+        assert report.getvalue().count('lines/sec') == 2
+
+    def test_chunk_ranges(self):
+        size = os.path.getsize(self.path)
+        ranges = loader.chunk_ranges(self.path, 3)
+        # The ranges cover the whole file, and only split at newlines
+        assert ranges[0][0] == 0 and ranges[-1][1] == size
+        with open(self.path, 'rb') as file:
+            data = file.read()
+        for start, end in ranges:
+            assert data[end - 1:end] == b'\n'
+
+    def test_load_parallel(self):
+        handle, other = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(handle, 'w') as file:
+            file.write('+1415,0.005\n+44,0.5\n')
+        try:
+            tree = DecimalSearchTree()
+            carriers = {'A': self.path, 'B': other}
+            assert loader.load_parallel(tree, carriers, 1, chunk_size=8) == 3
+            assert tree.search('1415') == ('B', 5000)
+            assert tree.search('1415234') == ('A', 30000)
+            assert tree.search('44') == ('B', 500000)
+        finally:
+            os.remove(other)
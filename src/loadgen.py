@@ -0,0 +1,142 @@
+"""
+A local load generator for the pricing service.
+
+It opens a number of keep-alive connections, & sends priced
+lookups for numbers from a phone number file over each of
+them as fast as the service answers. Then it reports the
+throughput & the p50 / p99 latency of the requests.
+
+With a number of clients, each request says which client sent
+it in an X-Client-Id header, so a service's per client rate
+limits can be exercised from one machine.
+
+usage:
+    python loadgen.py [requests] [connections] [host:port] [phone data] [clients]
+    python loadgen.py 20000 8 127.0.0.1:8080 phone-numbers-10000
+    python loadgen.py 20000 64 127.0.0.1:8080 phone-numbers-10000 4
+"""
+
+
+# import necessary modules
+import asyncio
+import itertools
+import os
+import sys
+import time
+import convert # local module
+
+
+def percentile(latencies, fraction):
+    """
+    Return the latency below which a fraction of them fall.
+    latencies must already be sorted.
+    """
+    if not latencies:
+        return 0.0
+    index = min(len(latencies) - 1, int(fraction * len(latencies)))
+    return latencies[index]
+
+
+async def send(reader, writer, request):
+    """
+    Send one request & read its response.
+    Return the response status code.
+    """
+    writer.write(request)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return int(head.split(b" ", 2)[1])
+
+
+async def client(host, port, requests, latencies, statuses):
+    """
+    Send every request over one keep-alive connection, one
+    after another, & record how long each one took.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for request in requests:
+            start = time.perf_counter()
+            status = await send(reader, writer, request)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def make_requests(phones, count, clients=0):
+    """
+    Build count GET requests, cycling through the phone numbers.
+    With clients, the requests are sent by that many clients
+    in turn: "client-0", "client-1", ...
+    """
+    requests = []
+    for index, phone in enumerate(
+            itertools.islice(itertools.cycle(phones), count)):
+        number = phone.replace("+", "%2B")
+        client = f"X-Client-Id: client-{index % clients}\r\n" if clients else ""
+        requests.append(
+            f"GET /price?number={number} HTTP/1.1\r\n"
+            f"Host: localhost\r\n{client}\r\n".encode())
+    return requests
+
+
+async def run(host, port, requests, connections):
+    """
+    Spread the requests over many concurrent connections.
+    Return a summary dictionary of the run.
+    """
+    latencies = []
+    statuses = {}
+    shares = [requests[number::connections]
+              for number in range(connections)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, share, latencies, statuses)
+        for share in shares))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "per_minute": len(latencies) / elapsed * 60,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "statuses": statuses,
+    }
+
+
+def report(summary):
+    """
+    Print a summary of a load generator run.
+    """
+    print(f"    requests: {summary['requests']} "
+          f"in {summary['seconds']:.2f} sec")
+    print(f"  throughput: {summary['per_minute']:.0f} requests/minute")
+    print(f"         p50: {summary['p50_ms']:.2f} ms")
+    print(f"         p99: {summary['p99_ms']:.2f} ms")
+    print(f"    statuses: {summary['statuses']}")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    address = sys.argv[3] if len(sys.argv) > 3 else "127.0.0.1:8080"
+    phone_data = sys.argv[4] if len(sys.argv) > 4 else "phone-numbers-10000"
+    clients = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+
+    host, _, port = address.rpartition(":")
+    path = os.path.join(convert.DATA_FOLDER, phone_data + ".txt")
+    with open(path) as file:
+        phones = [line.strip() for line in file if line.strip()]
+
+    requests = make_requests(phones, count, clients)
+    report(asyncio.run(run(host, int(port), requests, connections)))
@@ -0,0 +1,156 @@
+"""
+Micro-batching of concurrent single number lookups.
+
+Under spike traffic, many single number requests arrive within
+a few milliseconds of each other. Rather than walking the index
+once per request, a MicroBatcher holds each lookup for at most
+max_delay seconds, & then prices every waiting number with one
+price_many call; each result is then handed back to the request
+that asked for it. Requests for the same number in one window
+are coalesced into a single lookup.
+
+A batch is priced as soon as it holds max_batch_size numbers,
+so a burst never waits for the full delay.
+
+An engine that blocks on I/O (like a ShardRouter, which waits on
+its workers) is priced in a thread of the event loop's executor,
+so lookups keep being gathered while a batch is in flight.
+"""
+
+
+# import necessary modules
+import asyncio
+
+
+class MicroBatcher(object):
+    def __init__(self, engine, max_delay=0.002, max_batch_size=256,
+                 blocking=False):
+        """
+        Initialize a batcher in front of a lookup engine.
+        The engine needs a price_many method. max_delay is the
+        longest time, in seconds, a lookup waits for others.
+        With blocking, price_many is called off the event loop.
+        """
+        if max_delay < 0:
+            raise ValueError("max_delay must not be negative")
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.engine = engine
+        self.max_delay = max_delay
+        self.max_batch_size = max_batch_size
+        self.blocking = blocking
+
+        # {phone: [futures of the requests waiting for it]}
+        self.pending = {}
+        self._timer = None
+
+        self.requests = 0
+        self.coalesced = 0
+        self.batches = 0
+
+
+    def __repr__(self):
+        """
+        Visually represent this batcher using a string.
+        Return the formatted string.
+        """
+        return (f"MicroBatcher({self.max_delay * 1000:g} ms, "
+                f"{self.max_batch_size} numbers, {self.engine!r})")
+
+
+    def stats(self):
+        """
+        Return a dictionary of the batcher's counters.
+        """
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "mean_batch_size": ((self.requests - self.coalesced) / self.batches
+                                if self.batches else 0.0),
+        }
+
+
+    async def get_price(self, phone):
+        """
+        Find the longest matching prefix of a phone number, in
+        the next batch. This must run on the event loop.
+        Return its (carrier, price), or None if none match.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.requests += 1
+        waiters = self.pending.get(phone)
+        if waiters is None:
+            self.pending[phone] = [future]
+        else:
+            waiters.append(future)
+            self.coalesced += 1
+
+        if len(self.pending) >= self.max_batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self.flush)
+        return await future
+
+
+    def flush(self):
+        """
+        Price every waiting number with one price_many call, &
+        hand each result to the requests waiting for it.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return
+
+        phones = list(pending)
+        if self.blocking:
+            loop = asyncio.get_running_loop()
+            batch = loop.run_in_executor(None, self.engine.price_many, phones)
+            batch.add_done_callback(
+                lambda batch: self._deliver(pending, phones, batch))
+            return
+        try:
+            results = self.engine.price_many(phones)
+        except Exception as error:
+            self._fail(pending, error)
+            return
+        self._answer(pending, phones, results)
+
+
+    def _deliver(self, pending, phones, batch):
+        """
+        Hand the results of a batch priced off the event loop to
+        the requests waiting for them.
+        """
+        try:
+            results = batch.result()
+        except (Exception, asyncio.CancelledError) as error:
+            self._fail(pending, error)
+            return
+        self._answer(pending, phones, results)
+
+
+    def _fail(self, pending, error):
+        """
+        Hand the error of a batch to every request waiting for it.
+        """
+        for waiters in pending.values():
+            for future in waiters:
+                if not future.done():
+                    future.set_exception(error)
+
+
+    def _answer(self, pending, phones, results):
+        """
+        Hand each result of a batch to the requests waiting for it.
+        """
+        self.batches += 1
+        for phone, result in zip(phones, results):
+            for future in pending[phone]:
+                # a client that hung up may have cancelled its lookup.
+                if not future.done():
+                    future.set_result(result)
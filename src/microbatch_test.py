@@ -0,0 +1,92 @@
+from flattree import FlatDecimalTree
+from microbatch import MicroBatcher
+import asyncio
+import threading
+import unittest
+
+
+class CountingEngine(object):
+
+    def __init__(self):
+        self.tree = FlatDecimalTree()
+        self.tree.insert('1415', ('A', 20000))
+        self.tree.insert('44', ('B', 100000))
+        self.batches = []
+
+    def price_many(self, phones):
+        self.batches.append(list(phones))
+        self.thread = threading.get_ident()
+        return self.tree.price_many(phones)
+
+
+class BrokenEngine(object):
+
+    def price_many(self, phones):
+        raise RuntimeError('index went away')
+
+
+class MicroBatcherTest(unittest.TestCase):
+
+    def test_one_batch_per_window(self):
+        engine = CountingEngine()
+        batcher = MicroBatcher(engine, max_delay=0.01)
+
+        async def lookups():
+            return await asyncio.gather(*(
+                batcher.get_price(phone)
+                for phone in ('14152345678', '4420', '33', '14152345678')))
+
+        results = asyncio.run(lookups())
+        assert results == [('A', 20000), ('B', 100000), None, ('A', 20000)]
+        # The repeated number was coalesced into the same lookup
+        assert engine.batches == [['14152345678', '4420', '33']]
+        assert batcher.stats()['coalesced'] == 1
+
+    def test_max_batch_size(self):
+        engine = CountingEngine()
+        # The delay is far longer than the test; full batches go at once
+        batcher = MicroBatcher(engine, max_delay=60, max_batch_size=2)
+
+        async def lookups():
+            return await asyncio.gather(*(
+                batcher.get_price(phone) for phone in ('1', '2', '3', '4')))
+
+        asyncio.run(lookups())
+        assert engine.batches == [['1', '2'], ['3', '4']]
+        assert batcher.stats()['mean_batch_size'] == 2
+
+    def test_errors_reach_every_caller(self):
+        batcher = MicroBatcher(BrokenEngine(), max_delay=0)
+
+        async def lookups():
+            return await asyncio.gather(
+                batcher.get_price('1'), batcher.get_price('2'),
+                return_exceptions=True)
+
+        errors = asyncio.run(lookups())
+        assert all(isinstance(error, RuntimeError) for error in errors)
+
+    def test_blocking_engine(self):
+        engine = CountingEngine()
+        batcher = MicroBatcher(engine, max_delay=0, blocking=True)
+
+        async def lookups():
+            return await asyncio.gather(
+                batcher.get_price('14152345678'), batcher.get_price('33'))
+
+        assert asyncio.run(lookups()) == [('A', 20000), None]
+        # The batch was priced in a thread, off the event loop
+        assert engine.thread != threading.get_ident()
+        # Errors from the thread still reach the caller
+        with self.assertRaises(RuntimeError):
+            asyncio.run(MicroBatcher(BrokenEngine(), 0, blocking=True).get_price('1'))
+
+    def test_bad_settings(self):
+        with self.assertRaises(ValueError):
+            MicroBatcher(CountingEngine(), max_delay=-1)
+        with self.assertRaises(ValueError):
+            MicroBatcher(CountingEngine(), max_batch_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
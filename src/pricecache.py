@@ -0,0 +1,178 @@
+"""
+A bounded result cache in front of a price lookup engine.
+
+Real traffic asks for the same numbers over & over, so the last
+results are kept in a dictionary keyed by phone number. The
+cache has a maximum size, an optional time to live, & either
+"lru" (least recently used) or "fifo" (oldest first) eviction.
+
+A cache in front of a LiveIndex must never serve a result of a
+version that has been swapped out, so attach() registers it as
+a listener of the index; every swap or delta clears it.
+"""
+
+
+# import necessary modules
+import threading
+import time
+from collections import OrderedDict
+
+
+POLICIES = ("lru", "fifo")
+
+
+class PriceCache(object):
+    def __init__(self, engine, max_size=100000, ttl=None, policy="lru",
+                 clock=time.monotonic):
+        """
+        Initialize an empty cache in front of a lookup engine.
+        The engine needs get_price & price_many methods.
+        ttl is in seconds; None keeps results until evicted.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.engine = engine
+        self.max_size = max_size
+        self.ttl = ttl
+        self.policy = policy
+        self.clock = clock
+
+        # {phone: (result, expiry time)}, oldest first.
+        self.entries = OrderedDict()
+
+        # swaps come from the builder thread, & lookups from
+        # any other; the lock keeps the dictionary consistent.
+        self._lock = threading.Lock()
+
+        # bumped on every invalidation, so a lookup that was
+        # running on the old version does not store its result.
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def __repr__(self):
+        """
+        Visually represent this cache using a string.
+        Return the formatted string.
+        """
+        return (f"PriceCache({len(self.entries)}/{self.max_size} "
+                f"{self.policy}, {self.engine!r})")
+
+
+    def stats(self):
+        """
+        Return a dictionary of the cache size & its counters.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+    def attach(self, live_index):
+        """
+        Clear this cache whenever live_index swaps in a new
+        version, or applies a delta to the current one.
+        """
+        live_index.listeners.append(self.invalidate)
+
+
+    def invalidate(self, old_engine=None, new_engine=None):
+        """
+        Drop every cached result. This has the signature of a
+        LiveIndex listener, but ignores which engines changed.
+        """
+        with self._lock:
+            self.entries.clear()
+            self.generation += 1
+
+
+    def _get(self, phone):
+        """
+        Return the cached (found, result) of a phone number.
+        found is False on a miss. The lock must be held.
+        """
+        entry = self.entries.get(phone)
+        if entry is not None:
+            result, expires = entry
+            if expires is None or self.clock() < expires:
+                if self.policy == "lru":
+                    self.entries.move_to_end(phone)
+                self.hits += 1
+                return True, result
+            del self.entries[phone]
+        self.misses += 1
+        return False, None
+
+
+    def _put(self, phone, result, generation):
+        """
+        Cache a result, evicting the oldest entries if full.
+        Results of an older generation are dropped, as they may
+        come from an engine that was swapped out meanwhile.
+        The lock must be held.
+        """
+        if generation != self.generation:
+            return
+        expires = None if self.ttl is None else self.clock() + self.ttl
+        self.entries[phone] = (result, expires)
+        self.entries.move_to_end(phone)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+
+    def get_price(self, phone):
+        """
+        Find the longest matching prefix of a phone number,
+        using a cached result if there is one.
+        Return its (carrier, price), or None if none match.
+        """
+        with self._lock:
+            found, result = self._get(phone)
+            generation = self.generation
+        if found:
+            return result
+
+        result = self.engine.get_price(phone)
+        with self._lock:
+            self._put(phone, result, generation)
+        return result
+
+
+    def price_many(self, phones):
+        """
+        Price many phone numbers; only the ones that are not
+        cached are passed on to the engine, in one batch.
+        Return a list of (carrier, price) or None, in the same
+        order as the given phone numbers.
+        """
+        results = [None] * len(phones)
+        missing = []
+        with self._lock:
+            for index, phone in enumerate(phones):
+                found, result = self._get(phone)
+                if found:
+                    results[index] = result
+                else:
+                    missing.append(index)
+            generation = self.generation
+        if not missing:
+            return results
+
+        prices = self.engine.price_many([phones[index] for index in missing])
+        with self._lock:
+            for index, result in zip(missing, prices):
+                results[index] = result
+                self._put(phones[index], result, generation)
+        return results
@@ -0,0 +1,113 @@
+from carriertree import CarrierPriceTree
+from decimaltree import DecimalSearchTree
+from liveindex import LiveIndex
+from pricecache import PriceCache
+from routediff import RouteDelta
+import unittest
+
+
+def make_tree(price):
+    tree = DecimalSearchTree()
+    tree.insert('1415', ('A', price))
+    return tree
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class PriceCacheTest(unittest.TestCase):
+
+    def test_hits_and_misses(self):
+        cache = PriceCache(make_tree(20000))
+        assert cache.get_price('14152345678') == ('A', 20000)
+        assert cache.get_price('14152345678') == ('A', 20000)
+        # A number without a route is cached as None too
+        assert cache.get_price('19876543210') is None
+        assert cache.get_price('19876543210') is None
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['size']) == (2, 2, 2)
+
+    def test_lru_eviction(self):
+        cache = PriceCache(make_tree(20000), max_size=2)
+        cache.get_price('1')
+        cache.get_price('2')
+        cache.get_price('1')
+        cache.get_price('3')
+        # 2 was the least recently used
+        assert list(cache.entries) == ['1', '3']
+        assert cache.evictions == 1
+
+    def test_fifo_eviction(self):
+        cache = PriceCache(make_tree(20000), max_size=2, policy='fifo')
+        cache.get_price('1')
+        cache.get_price('2')
+        cache.get_price('1')
+        cache.get_price('3')
+        # 1 was cached first, even though it was used since
+        assert list(cache.entries) == ['2', '3']
+        with self.assertRaises(ValueError):
+            PriceCache(make_tree(20000), policy='random')
+
+    def test_ttl(self):
+        clock = FakeClock()
+        cache = PriceCache(make_tree(20000), ttl=10, clock=clock)
+        cache.get_price('1415')
+        clock.now = 5
+        cache.get_price('1415')
+        assert cache.hits == 1
+        clock.now = 11
+        cache.get_price('1415')
+        assert cache.misses == 2
+
+    def test_price_many_only_asks_for_misses(self):
+        tree = make_tree(20000)
+        cache = PriceCache(tree)
+        cache.get_price('14150')
+        asked = []
+        price_many = tree.price_many
+        tree.price_many = lambda phones: asked.append(phones) or price_many(phones)
+        assert cache.price_many(['14150', '14151', '2']) == [
+            ('A', 20000), ('A', 20000), None]
+        assert asked == [['14151', '2']]
+
+    def test_invalidated_by_live_index_swap(self):
+        live = LiveIndex(make_tree(20000))
+        cache = PriceCache(live)
+        cache.attach(live)
+        assert cache.get_price('1415') == ('A', 20000)
+        live.swap(make_tree(10000))
+        assert cache.get_price('1415') == ('A', 10000)
+        live.close()
+
+    def test_invalidated_by_delta(self):
+        tree = CarrierPriceTree()
+        tree.insert('1415', ('A', 20000))
+        live = LiveIndex(tree)
+        cache = PriceCache(live)
+        cache.attach(live)
+        assert cache.get_price('1415') == ('A', 20000)
+        live.apply_delta('A', RouteDelta({}, {'1415': 50000}, set())).result()
+        assert cache.get_price('1415') == ('A', 50000)
+        live.close()
+
+    def test_result_of_old_version_is_not_stored(self):
+        live = LiveIndex(make_tree(20000))
+        cache = PriceCache(live)
+        cache.attach(live)
+
+        class SwapDuringLookup(object):
+            def get_price(self, phone):
+                result = live.get_price(phone)
+                live.swap(make_tree(10000))
+                return result
+
+        cache.engine = SwapDuringLookup()
+        assert cache.get_price('1415') == ('A', 20000)
+        assert len(cache.entries) == 0
+        live.close()
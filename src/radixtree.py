@@ -0,0 +1,228 @@
+# This tree is a path-compressed twin of the DecimalSearchTree.
+# Route prefixes share long chains of nodes with just one child,
+# & only the last node of a chain holds data. Here a chain like
+# that is a single node, whose edge is labelled with all of its
+# digits; so there are fewer nodes, & fewer hops down a chain.
+# Near the top of the tree nearly every node branches, so most
+# lookups take about as many hops as in the DecimalSearchTree.
+# The public api (insert, search, get_price...) is the same.
+#
+# So it is a memory win, not a latency win. "benchmark.py radix"
+# on the generated route-costs-1000000 (3 runs, best of 5 each):
+#   nodes 1,996,043 -> 1,240,290, memory 499.6 -> 371.7 MB,
+#   get_price 0.60-0.72 us -> 0.73-1.46 us.
+
+from decimaltree import DIGITS, DecimalTreeNode, DecimalSearchTree
+
+
+class RadixTreeNode(DecimalTreeNode):
+    def __init__(self, data=None, label=""):
+        """
+        Initialize a radix tree node with the given data.
+        """
+        super().__init__(data)
+        # the digits on the edge from the parent to this node.
+        # its first digit is this node's index in parent.next.
+        self.label = label
+
+
+    def __repr__(self):
+        """
+        Visually represent this node using a string.
+        Return the string.
+        """
+        return f"RadixTreeNode({self.label!r}, {self.data!r})"
+
+
+class RadixSearchTree(DecimalSearchTree):
+    # the class of every node this tree generates.
+    node_class = RadixTreeNode
+
+    def __repr__(self):
+        """
+        Visually represent this tree using a string.
+        Return the formatted string.
+        """
+        return f"RadixSearchTree({self.size} nodes)"
+
+
+    def node_count(self):
+        """
+        Return the number of nodes, including the root.
+        ~~~
+        best & worst case time complexity: O(n)
+        """
+        count = 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(child for child in node.next if child)
+        return count
+
+
+    def height(self):
+        """
+        Return the height of the root node, counted in digits;
+        so it matches the DecimalSearchTree with the same routes.
+        ~~~
+        best & worst case time complexity: O(n)
+        --> we must visit every node to find the height.
+        """
+        tallest = 0
+        # walk the tree with an explicit stack of (node, depth).
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            depth += len(node.label)
+            if depth > tallest:
+                tallest = depth
+            for child in node.next:
+                if child:
+                    stack.append((child, depth))
+        return tallest
+
+
+    def contains(self, number):
+        """
+        Does the path of this phone number exist in the tree?
+        The path may end halfway along an edge.
+        Return True or False based on result.
+        """
+        node = self.root
+        position = 0
+        try:
+            while position < len(number):
+                node = node.next[DIGITS[number[position]]]
+                if node is None:
+                    return False
+                label = node.label
+                rest = number[position:position + len(label)]
+                if not label.startswith(rest):
+                    return False
+                position += len(label)
+        except KeyError:
+            raise ValueError(f"not a digit string: {number!r}") from None
+        return True
+
+
+    def _make_path(self, phone):
+        """
+        find the node at the end of a phone number's path,
+        generating or splitting nodes on the way, & return it.
+        ~~~
+        best & worst case runtime: O(L)
+        --> L is the length of the phone number.
+        """
+        node = self.root
+        position = 0
+
+        try:
+            while position < len(phone):
+                digit = DIGITS[phone[position]]
+                next = node.next[digit]
+
+                # no edge starts with this digit: the rest of the
+                # phone number becomes a single new edge.
+                if next is None:
+                    next = self.node_class(label=phone[position:])
+                    node.next[digit] = next
+                    return next
+
+                label = next.label
+                if phone.startswith(label, position):
+                    # the whole edge matches, so follow it.
+                    node = next
+                    position += len(label)
+                    continue
+
+                # the phone number leaves this edge halfway along:
+                # split the edge in two at the first differing digit.
+                shared = 1
+                while (position + shared < len(phone)
+                       and label[shared] == phone[position + shared]):
+                    shared += 1
+                middle = self.node_class(label=label[:shared])
+                next.label = label[shared:]
+                middle.next[DIGITS[next.label[0]]] = next
+                node.next[digit] = middle
+                node = middle
+                position += shared
+        except KeyError:
+            raise ValueError(f"not a digit string: {phone!r}") from None
+
+        return node
+
+
+    def _find_path(self, phone):
+        """
+        find the node whose path is exactly a phone number.
+        return None if the path is a dead-end, or if it ends
+        halfway along an edge, where there is no node.
+        ~~~
+        best & worst case runtime: O(L)
+        --> L is the length of the phone number.
+        """
+        node = self.root
+        position = 0
+
+        try:
+            while position < len(phone):
+                node = node.next[DIGITS[phone[position]]]
+                if node is None or not phone.startswith(node.label, position):
+                    return None
+                position += len(node.label)
+        except KeyError:
+            raise ValueError(f"not a digit string: {phone!r}") from None
+
+        return node
+
+
+    def get_price(self, phone):
+        """
+        Find the longest matching prefix of a phone number.
+        Return its data (carrier, price), or None if no
+        route matches the phone number at all.
+        ~~~
+        best & worst case runtime: O(L)
+        --> L is the length of the phone number,
+            but only one hop is taken per edge, not per digit.
+        """
+        node = self.root
+        best_data = None
+        position = 0
+        end = len(phone)
+
+        try:
+            while position < end:
+                node = node.next[DIGITS[phone[position]]]
+                # a missing child means the path is a dead-end.
+                if node is None:
+                    break
+                label = node.label
+                # the first digit of the edge is already matched, so
+                # only longer edges have to be compared.
+                if len(label) == 1:
+                    position += 1
+                elif phone.startswith(label, position):
+                    position += len(label)
+                else:
+                    break
+                if node.data is not None:
+                    best_data = node.data
+        except KeyError:
+            raise ValueError(f"not a digit string: {phone!r}") from None
+
+        return best_data
+
+
+    def price_many(self, phones):
+        """
+        Find the longest matching prefix of many phone numbers.
+        Return a list of data (carrier, price) or None, in the
+        same order as the given phone numbers.
+        ~~~
+        runtime: O(n * L)
+        """
+        get_price = self.get_price
+        return [get_price(phone) for phone in phones]
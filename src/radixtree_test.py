@@ -0,0 +1,70 @@
+from decimaltree import DecimalSearchTree
+from radixtree import RadixSearchTree
+import random
+import unittest
+
+
+class RadixSearchTreeTest(unittest.TestCase):
+
+    def test_single_chain_is_one_node(self):
+        tree = RadixSearchTree()
+        tree.insert('449275049', ("A", 10000))
+        assert tree.node_count() == 2
+        assert tree.height() == 9
+        assert tree.search('449275049') == ("A", 10000)
+        assert tree.search('4492') is None
+        assert tree.contains('4492') is True
+        assert tree.contains('4493') is False
+
+    def test_insert_splits_edges(self):
+        tree = RadixSearchTree()
+        tree.insert('1415234', ("A", 30000))
+        tree.insert('1415246', ("A", 10000))
+        # Splitting at '14152' adds a middle node & a new leaf
+        assert tree.node_count() == 4
+        tree.insert('1415', ("B", 20000))
+        assert tree.node_count() == 5
+        assert tree.size == 3
+        assert tree.search('1415') == ("B", 20000)
+        assert tree.search('14152') is None
+        # A duplicate keeps the lower price
+        tree.insert('1415', ("C", 50000))
+        assert tree.search('1415') == ("B", 20000)
+        assert tree.size == 3
+
+    def test_get_price(self):
+        tree = RadixSearchTree()
+        tree.insert('1415', ("A", 20000))
+        tree.insert('1415234', ("A", 30000))
+        tree.insert('1415246', ("A", 10000))
+        tree.insert('1512', ("A", 40000))
+        assert tree.get_price('14152345678') == ("A", 30000)
+        assert tree.get_price('14152399999') == ("A", 20000)
+        assert tree.get_price('15124156620') == ("A", 40000)
+        assert tree.get_price('1415') == ("A", 20000)
+        assert tree.get_price('141') is None
+        assert tree.get_price('19876543210') is None
+
+    def test_rejects_non_digits(self):
+        tree = RadixSearchTree()
+        tree.insert('1415234', ("A", 30000))
+        for call in (tree.get_price, tree.contains, tree.search, tree.price_many):
+            with self.assertRaises(ValueError):
+                call(['+1415'] if call == tree.price_many else '+1415')
+        with self.assertRaises(ValueError):
+            tree.insert('1415x', ("A", 10000))
+
+    def test_matches_decimal_search_tree(self):
+        rng = random.Random(0)
+        routes = [(str(rng.randint(1, 10 ** rng.randint(1, 8))),
+                   ("A", rng.random())) for _ in range(2000)]
+        phones = [str(rng.randint(10 ** 10, 10 ** 11 - 1))
+                  for _ in range(2000)]
+        phones += [route for route, _ in routes[:200]]
+        radix = RadixSearchTree(routes)
+        decimal = DecimalSearchTree(routes)
+        assert radix.size == decimal.size
+        assert radix.height() == decimal.height()
+        assert radix.price_many(phones) == decimal.price_many(phones)
+        for route, _ in routes:
+            assert radix.search(route) == decimal.search(route)
@@ -0,0 +1,270 @@
+# This index turns every route into a range of numbers.
+# A route prefix like 1415 covers every 15 digit number
+# from 141500000000000 up to (but not including) 141600000000000.
+# Routes nest (1415234 sits inside 1415), so we flatten them
+# into disjoint segments, each owned by its most specific route.
+# Pricing a number is then one binary search over the segments,
+# & numpy can do that for a whole array of numbers at once.
+
+import numpy as np
+
+
+# E.164 numbers have at most 15 digits.
+MAX_DIGITS = 15
+
+# POWERS[k] scales a k digit number up to 15 digits.
+POWERS = np.array(
+    [10 ** (MAX_DIGITS - k) for k in range(MAX_DIGITS + 1)],
+    dtype=np.int64)
+
+# segments & lookups with no matching route use this route id.
+NO_ROUTE = -1
+
+
+def parse_numbers(phones):
+    """
+    Turn many digit strings into integers all at once.
+    Return two arrays: the values, & how many digits each has.
+    Only the first 18 digits of a number are kept, as more
+    would overflow an int64.
+    ~~~
+    runtime: O(n * w)
+    --> n numbers of up to w digits, in vectorized steps.
+    """
+    phones = np.asarray(phones, dtype=str)
+    if phones.size == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    # a unicode array is a grid of 4 byte code points, one row
+    # per number; short numbers are padded with zeros.
+    if phones.dtype.itemsize > 18 * 4:
+        phones = phones.astype("U18")
+    width = phones.dtype.itemsize // 4
+    codes = phones.view(np.uint32).reshape(len(phones), width)
+    lengths = np.count_nonzero(codes, axis=1)
+
+    # the padding wraps around to a huge unsigned "digit",
+    # so it has to be cleared before checking the rest.
+    digits = codes - 48
+    digits[codes == 0] = 0
+    if (digits > 9).any():
+        raise ValueError("phone numbers must only hold digits")
+
+    # read every row as if it were a full width number, then
+    # divide away the padding at the end of the short ones.
+    weights = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    values = digits.astype(np.int64) @ weights
+    values //= 10 ** (width - lengths)
+    return values, lengths
+
+
+class PrefixRangeIndex(object):
+    def __init__(self, items=None):
+        """
+        Initialize range index with given items.
+        items is an iterable of (phone, (carrier, price)).
+        """
+        # routes are collected here until the first lookup.
+        # {route prefix: (carrier, price)}
+        self.routes = {}
+
+        # carrier names are stored once, & referenced by id.
+        self.carrier_names = []
+        self.carrier_ids = {}
+
+        # like DecimalSearchTree, size counts the routes.
+        self.size = 0
+
+        # the flattened segments, built by _build().
+        self.starts = None
+        self.owners = None
+
+        # insert items
+        if items is not None:
+            for phone, data in items:
+                self.insert(phone, data)
+
+
+    def __repr__(self):
+        """
+        Visually represent this index using a string.
+        Return the formatted string.
+        """
+        return f"PrefixRangeIndex({len(self.routes)} routes)"
+
+
+    def insert(self, phone, data):
+        """
+        insert a given {phone:(carrier, price)} pair.
+        the cheapest carrier is kept for every prefix.
+        the segments are rebuilt on the next lookup.
+        ~~~
+        runtime: O(1)
+        """
+        if not phone.isdigit() or len(phone) > MAX_DIGITS:
+            raise ValueError(f"not an E.164 route prefix: {phone!r}")
+
+        # if there is already data, keep the lower price!
+        old_data = self.routes.get(phone)
+        if old_data is None:
+            self.size += 1
+        if old_data is None or data[1] < old_data[1]:
+            self.routes[phone] = data
+            self.starts = None
+
+
+    def _build(self):
+        """
+        Flatten the nested route ranges into disjoint segments.
+        starts[i] is where segment i begins, & owners[i] is the
+        id of the most specific route covering it (or NO_ROUTE).
+        ~~~
+        runtime: O(n log n)
+        --> n routes are sorted, then swept once.
+        """
+        prefixes = list(self.routes)
+        count = len(prefixes)
+
+        # every route gets columns aligned with its route id.
+        lengths = np.fromiter(map(len, prefixes), np.int64, count)
+        values = np.fromiter(map(int, prefixes), np.int64, count)
+        self.route_lows = values * POWERS[lengths]
+        self.route_highs = (values + 1) * POWERS[lengths]
+        self.route_lengths = lengths
+        self.route_prices = np.fromiter(
+            (self.routes[prefix][1] for prefix in prefixes),
+            np.uint32, count)
+        self.route_carriers = np.fromiter(
+            (self._carrier_id(self.routes[prefix][0])
+             for prefix in prefixes),
+            np.int32, count)
+
+        # outer routes come before the routes nested inside them.
+        order = np.lexsort((lengths, self.route_lows))
+        lows = self.route_lows.tolist()
+        highs = self.route_highs.tolist()
+
+        # parents[r] is the route directly enclosing route r.
+        parents = [NO_ROUTE] * count
+        starts = [0]
+        owners = [NO_ROUTE]
+
+        def start_segment(position, owner):
+            # a later segment at the same spot replaces the last.
+            if starts[-1] == position:
+                owners[-1] = owner
+            else:
+                starts.append(position)
+                owners.append(owner)
+
+        # sweep from left to right, keeping the open routes.
+        stack = []
+        for route in order.tolist():
+            # close every route that ends before this one starts.
+            while stack and highs[stack[-1]] <= lows[route]:
+                end = highs[stack.pop()]
+                start_segment(end, stack[-1] if stack else NO_ROUTE)
+            if stack:
+                parents[route] = stack[-1]
+            start_segment(lows[route], route)
+            stack.append(route)
+        while stack:
+            end = highs[stack.pop()]
+            start_segment(end, stack[-1] if stack else NO_ROUTE)
+
+        self.route_parents = np.array(parents, dtype=np.int64)
+        self.starts = np.array(starts, dtype=np.int64)
+        self.owners = np.array(owners, dtype=np.int64)
+
+
+    def _carrier_id(self, carrier):
+        """
+        Return the id of a carrier name, registering it if new.
+        """
+        carrier_id = self.carrier_ids.get(carrier)
+        if carrier_id is None:
+            carrier_id = len(self.carrier_names)
+            self.carrier_names.append(carrier)
+            self.carrier_ids[carrier] = carrier_id
+        return carrier_id
+
+
+    def find_routes(self, values, lengths):
+        """
+        Find the longest matching route of many numbers.
+        values holds each number as an integer, & lengths holds
+        how many digits it has. Return an array of route ids,
+        with NO_ROUTE where nothing matches.
+        ~~~
+        runtime: O(n log s)
+        --> n numbers are binary searched over s segments.
+        """
+        if self.starts is None:
+            self._build()
+
+        # long numbers only need their first 15 digits.
+        values = np.asarray(values, dtype=np.int64)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        extra = np.maximum(lengths - MAX_DIGITS, 0)
+        values = values // (10 ** extra)
+        lengths = lengths - extra
+
+        # scale every number up to 15 digits, then find the
+        # segment each one falls in.
+        scaled = values * POWERS[lengths]
+        segments = np.searchsorted(self.starts, scaled, side="right") - 1
+        routes = self.owners[segments]
+
+        # a short number like 1415 lands inside the range of a
+        # longer route like 14150, but must not match it.
+        # step out to the enclosing route until it fits.
+        too_long = routes != NO_ROUTE
+        too_long[too_long] = (
+            self.route_lengths[routes[too_long]] > lengths[too_long])
+        while too_long.any():
+            routes[too_long] = self.route_parents[routes[too_long]]
+            too_long[too_long] = routes[too_long] != NO_ROUTE
+            too_long[too_long] = (
+                self.route_lengths[routes[too_long]] > lengths[too_long])
+
+        return routes
+
+
+    def lookup(self, phones):
+        """
+        Find the longest matching route of many phone numbers.
+        Return two arrays: carrier ids & prices (in uint32
+        micro-dollars, see fixedpoint). A number with
+        no matching route gets carrier NO_ROUTE & a price of 0.
+        """
+        values, lengths = parse_numbers(phones)
+        routes = self.find_routes(values, lengths)
+
+        found = routes != NO_ROUTE
+        carriers = np.full(routes.shape, NO_ROUTE, dtype=np.int32)
+        prices = np.zeros(routes.shape, dtype=np.uint32)
+        carriers[found] = self.route_carriers[routes[found]]
+        prices[found] = self.route_prices[routes[found]]
+        return carriers, prices
+
+
+    def price_many(self, phones):
+        """
+        Find the longest matching prefix of many phone numbers.
+        Return a list of (carrier, price) or None, in the same
+        order as the given phone numbers.
+        """
+        carriers, prices = self.lookup(phones)
+        names = self.carrier_names
+        return [
+            (names[carrier], price) if carrier != NO_ROUTE else None
+            for carrier, price in zip(carriers.tolist(), prices.tolist())]
+
+
+    def get_price(self, phone):
+        """
+        Find the longest matching prefix of a phone number.
+        Return its (carrier, price), or None if none match.
+        """
+        return self.price_many([phone])[0]
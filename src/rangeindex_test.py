@@ -0,0 +1,45 @@
+from rangeindex import PrefixRangeIndex, NO_ROUTE, parse_numbers
+import unittest
+
+
+class PrefixRangeIndexTest(unittest.TestCase):
+
+    def test_parse_numbers(self):
+        values, lengths = parse_numbers(['1415', '0012', '9', ''])
+        assert values.tolist() == [1415, 12, 9, 0]
+        assert lengths.tolist() == [4, 4, 1, 0]
+        with self.assertRaises(ValueError):
+            parse_numbers(['+1415'])
+
+    def test_insert_keeps_lower_price(self):
+        index = PrefixRangeIndex()
+        index.insert('00', ("A", 1000000))
+        index.insert('00', ("B", 300000))
+        index.insert('00', ("C", 43000000))
+        assert index.get_price('001') == ("B", 300000)
+
+    def test_nested_routes(self):
+        index = PrefixRangeIndex()
+        index.insert('1415', ("A", 20000))
+        index.insert('1415234', ("B", 30000))
+        index.insert('1415246', ("A", 10000))
+        index.insert('1512', ("A", 40000))
+        # The most specific route wins, even if it costs more
+        assert index.get_price('14152345678') == ("B", 30000)
+        assert index.get_price('14152355678') == ("A", 20000)
+        assert index.get_price('15124156620') == ("A", 40000)
+        assert index.get_price('19876543210') is None
+
+    def test_short_number_skips_longer_route(self):
+        index = PrefixRangeIndex()
+        index.insert('14', ("A", 20000))
+        index.insert('14150', ("B", 30000))
+        # 1415 sits inside the range of 14150, but must not match it
+        assert index.get_price('1415') == ("A", 20000)
+        assert index.get_price('141509') == ("B", 30000)
+
+    def test_lookup(self):
+        index = PrefixRangeIndex([('1', ("A", 500000)), ('44', ("B", 250000))])
+        carriers, prices = index.lookup(['15551234', '4420', '81'])
+        assert carriers.tolist() == [0, 1, NO_ROUTE]
+        assert prices.tolist() == [500000, 250000, 0]
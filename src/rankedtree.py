@@ -0,0 +1,211 @@
+# This tree keeps every carrier's price for every prefix, so
+# routing can fall back to the next cheapest carrier when the
+# cheapest one fails. It is a FlatDecimalTree underneath: the
+# winner columns are kept in sync, so get_price, price_many &
+# save all work exactly as before.
+#
+# Each node points to a linked list of entries, sorted by price.
+# An entry is a carrier id (2 bytes), a price in micro-dollars
+# (4 bytes) & the index of the next entry (4 bytes); 10 bytes
+# per route, in three packed arrays, rather than a python tuple
+# per route.
+
+from array import array
+from fixedpoint import check_micros
+from flattree import FlatDecimalTree, NO_CARRIER
+
+
+# entry 0 is never used, so 0 marks the end of a list.
+NO_ENTRY = 0
+
+
+class RankedFlatTree(FlatDecimalTree):
+    def __init__(self, items=None):
+        """
+        Initialize ranked search tree with given items.
+        items is an iterable of (phone, (carrier, price)).
+        """
+        # heads[node] is the cheapest entry of a node.
+        self.heads = array("I", [NO_ENTRY])
+
+        # one item per entry, aligned with the entry index.
+        self.entry_carriers = array("H", [NO_CARRIER])
+        self.entry_prices = array("I", [0])
+        self.entry_next = array("I", [NO_ENTRY])
+
+        super().__init__(items)
+
+
+    def __repr__(self):
+        """
+        Visually represent this tree using a string.
+        Return the formatted string.
+        """
+        return (f"RankedFlatTree({self.size} nodes, "
+                f"{self.entry_count()} entries)")
+
+
+    def entry_count(self):
+        """
+        Return the number of (prefix, carrier) price entries.
+        """
+        return len(self.entry_carriers) - 1
+
+
+    def nbytes(self):
+        """
+        Return the number of bytes held by the typed arrays.
+        """
+        return super().nbytes() + sum(
+            column.itemsize * len(column)
+            for column in (self.heads, self.entry_carriers,
+                           self.entry_prices, self.entry_next))
+
+
+    def _columns(self):
+        """
+        Return the {name: typed array} columns of this tree.
+        """
+        columns = super()._columns()
+        columns["heads"] = self.heads
+        columns["entry_carriers"] = self.entry_carriers
+        columns["entry_prices"] = self.entry_prices
+        columns["entry_next"] = self.entry_next
+        return columns
+
+
+    def _use_columns(self, columns):
+        """
+        Point this tree at columns read back from an index file.
+        """
+        super()._use_columns(columns)
+        self.heads = columns["heads"]
+        self.entry_carriers = columns["entry_carriers"]
+        self.entry_prices = columns["entry_prices"]
+        self.entry_next = columns["entry_next"]
+
+
+    def _new_node(self):
+        """
+        Append an empty node to the end of every node column.
+        Return the index of the new node.
+        """
+        node = super()._new_node()
+        self.heads.append(NO_ENTRY)
+        return node
+
+
+    def insert(self, phone, data):
+        """
+        insert a given {phone:(carrier, price)} pair.
+        every carrier is kept; if the carrier already has a
+        price for this prefix, the lower of the two is kept.
+        ~~~
+        runtime: O(L + c)
+        --> L is the length of the phone number,
+            & c is the number of carriers with this prefix.
+        """
+        carrier, price = data
+        price = check_micros(price)
+        carrier_id = self._carrier_id(carrier)
+        node = self._make_node(phone)
+        entry_carriers = self.entry_carriers
+        entry_prices = self.entry_prices
+        entry_next = self.entry_next
+
+        # unlink this carrier's old entry, unless it is cheaper.
+        previous = NO_ENTRY
+        entry = self.heads[node]
+        while entry and entry_carriers[entry] != carrier_id:
+            previous = entry
+            entry = entry_next[entry]
+        if entry:
+            if price >= entry_prices[entry]:
+                return
+            if previous:
+                entry_next[previous] = entry_next[entry]
+            else:
+                self.heads[node] = entry_next[entry]
+            entry_prices[entry] = price
+        else:
+            entry = len(entry_carriers)
+            entry_carriers.append(carrier_id)
+            entry_prices.append(price)
+            entry_next.append(NO_ENTRY)
+
+        # link it in after every entry that is no more expensive,
+        # so on a tie the carrier that was added first stays first.
+        previous = NO_ENTRY
+        next = self.heads[node]
+        while next and entry_prices[next] <= price:
+            previous = next
+            next = entry_next[next]
+        entry_next[entry] = next
+        if previous:
+            entry_next[previous] = entry
+        else:
+            self.heads[node] = entry
+
+        # keep the winner columns in sync, like FlatDecimalTree.
+        carriers = self.carriers
+        if carriers[node] == NO_CARRIER:
+            carriers[node] = carrier_id
+            self.prices[node] = price
+            self.size += 1
+        elif price < self.prices[node]:
+            carriers[node] = carrier_id
+            self.prices[node] = price
+
+
+    def ranked(self, phone):
+        """
+        Return every (carrier, price) stored exactly at phone,
+        cheapest first.
+        """
+        node = self._find_node(phone)
+        if node is None:
+            return []
+        results = []
+        entry = self.heads[node]
+        while entry:
+            results.append((self.carrier_names[self.entry_carriers[entry]],
+                            self.entry_prices[entry]))
+            entry = self.entry_next[entry]
+        return results
+
+
+    def top_k(self, phone, k=3):
+        """
+        Find the k cheapest carriers that can route a phone number.
+        Each carrier is priced by its own longest matching prefix,
+        so a carrier's short prefix is overridden by a longer one.
+        Return a list of up to k (carrier, price), cheapest first.
+        The first carrier is the cheapest one of all, which may
+        not be the winner of get_price: that is the cheapest
+        carrier of the longest prefix, whatever the others cost.
+        ~~~
+        runtime: O(L * c + c log c)
+        --> L is the length of the phone number,
+            & c is the number of carriers on its path.
+        """
+        children = self.children
+        heads = self.heads
+        entry_carriers = self.entry_carriers
+        entry_prices = self.entry_prices
+        entry_next = self.entry_next
+
+        # {carrier id: price} at the deepest node seen so far.
+        best = {}
+        node = 0
+        for char in phone:
+            node = children[node * 10 + ord(char) - 48]
+            if not node:
+                break
+            entry = heads[node]
+            while entry:
+                best[entry_carriers[entry]] = entry_prices[entry]
+                entry = entry_next[entry]
+
+        ranking = sorted(best.items(), key=lambda item: item[1])[:k]
+        return [(self.carrier_names[carrier_id], price)
+                for carrier_id, price in ranking]
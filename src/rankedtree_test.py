@@ -0,0 +1,66 @@
+from rankedtree import RankedFlatTree
+import unittest
+
+
+class RankedFlatTreeTest(unittest.TestCase):
+
+    def make_tree(self):
+        tree = RankedFlatTree()
+        tree.insert('1415', ('A', 20000))
+        tree.insert('1415', ('B', 30000))
+        tree.insert('1415', ('C', 10000))
+        tree.insert('1415234', ('B', 50000))
+        return tree
+
+    def test_insert_keeps_every_carrier(self):
+        tree = self.make_tree()
+        assert tree.size == 2
+        assert tree.entry_count() == 4
+        assert tree.search('1415') == ('C', 10000)
+        assert tree.ranked('1415') == [('C', 10000), ('A', 20000), ('B', 30000)]
+        assert tree.ranked('141') == []
+        assert tree.ranked('9') == []
+
+    def test_duplicate_carrier_keeps_lower_price(self):
+        tree = self.make_tree()
+        tree.insert('1415', ('B', 40000))
+        assert tree.ranked('1415') == [('C', 10000), ('A', 20000), ('B', 30000)]
+        # A lower price moves the carrier up the list
+        tree.insert('1415', ('B', 5000))
+        assert tree.ranked('1415') == [('B', 5000), ('C', 10000), ('A', 20000)]
+        assert tree.search('1415') == ('B', 5000)
+        assert tree.entry_count() == 4
+
+    def test_ties_keep_insertion_order(self):
+        tree = RankedFlatTree()
+        tree.insert('1', ('A', 20000))
+        tree.insert('1', ('B', 20000))
+        assert tree.ranked('1') == [('A', 20000), ('B', 20000)]
+        assert tree.search('1') == ('A', 20000)
+
+    def test_top_k(self):
+        tree = self.make_tree()
+        # B's longer route overrides its shorter one
+        assert tree.top_k('14152345678') == [
+            ('C', 10000), ('A', 20000), ('B', 50000)]
+        assert tree.top_k('14152345678', k=2) == [('C', 10000), ('A', 20000)]
+        assert tree.top_k('14159999999') == [
+            ('C', 10000), ('A', 20000), ('B', 30000)]
+        assert tree.top_k('19876543210') == []
+        # get_price still picks the cheapest of the longest prefix
+        assert tree.get_price('14152345678') == ('B', 50000)
+
+    def test_save_and_load(self):
+        import os
+        import tempfile
+        tree = self.make_tree()
+        handle, path = tempfile.mkstemp(suffix='.idx')
+        os.close(handle)
+        try:
+            tree.save(path)
+            for use_mmap in (True, False):
+                loaded = RankedFlatTree.load(path, use_mmap=use_mmap)
+                assert loaded.top_k('14152345678') == tree.top_k('14152345678')
+                assert loaded.get_price('1415999') == ('C', 10000)
+        finally:
+            os.remove(path)
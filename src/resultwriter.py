@@ -0,0 +1,131 @@
+"""
+Write route cost results for any number of phone numbers.
+
+Each result is one "+number,price" line, in the order of the
+phone numbers; a number without a route costs 0. Numbers are
+read like the pricing service reads them (see service.py), & a
+malformed one gets a "number,malformed number" error line, so
+the output still has one line per input line. Numbers are
+priced a chunk at a time with one price_many call, & every
+chunk is written with one large write; so memory stays bounded
+by the chunk size, not by the size of the input.
+
+usage:
+    python resultwriter.py route-costs-106000 phone-numbers-10000 results.txt
+    python resultwriter.py route-costs-106000 phone-numbers-10000 - | head
+"""
+
+
+# import necessary modules
+import os
+import sys
+from itertools import islice
+import convert # local module
+import loader # local module
+import service # local module
+from fixedpoint import format_micros
+from flattree import FlatDecimalTree
+
+
+# phone numbers priced & written per chunk.
+CHUNK_SIZE = 100000
+
+# bytes buffered by an output file before each write.
+BUFFER_SIZE = 1 << 20
+
+# the result of a number that could not be read.
+MALFORMED = "malformed number"
+
+
+def iter_numbers(path):
+    """
+    Generate the phone numbers of a file, one line at a time.
+    Blank lines are skipped.
+    """
+    with open(path) as file:
+        for line in file:
+            number = line.strip()
+            if number:
+                yield number
+
+
+def format_results(numbers, results):
+    """
+    Return the "+number,price" lines of priced numbers as one
+    string. results holds (carrier, price), None, or MALFORMED;
+    prices are whole micro-dollars, written as decimal text.
+    """
+    return "".join([
+        f"{number},{MALFORMED}\n" if data is MALFORMED else
+        f"{number},{format_micros(data[1]) if data is not None else 0}\n"
+        for number, data in zip(numbers, results)])
+
+
+def write_results(engine, numbers, file=sys.stdout, chunk_size=CHUNK_SIZE):
+    """
+    Price phone numbers a chunk at a time, & write a result
+    line for each one to file. numbers may be any iterable of
+    "+number" strings, like iter_numbers or a pipe.
+    Return the number of results written.
+    ~~~
+    runtime: O(n * L), memory: O(chunk size)
+    """
+    numbers = iter(numbers)
+    count = 0
+    while True:
+        chunk = list(islice(numbers, chunk_size))
+        if not chunk:
+            return count
+        digits = [service.normalize(number) for number in chunk]
+        prices = iter(engine.price_many(
+            [number for number in digits if number is not None]))
+        results = [next(prices) if number is not None else MALFORMED
+                   for number in digits]
+        file.write(format_results(chunk, results))
+        count += len(chunk)
+
+
+def write_result_file(engine, phone_path, output_path,
+                      chunk_size=CHUNK_SIZE):
+    """
+    Write the results of every number in a phone number file.
+    The file is written under a temporary name & then renamed,
+    so a half written result file is never left behind.
+    Return the number of results written.
+    """
+    temp_path = output_path + ".tmp"
+    with open(temp_path, "w", buffering=BUFFER_SIZE) as file:
+        count = write_results(
+            engine, iter_numbers(phone_path), file, chunk_size)
+    os.replace(temp_path, output_path)
+    return count
+
+
+def main(route_data, phone_data, output="-"):
+    """
+    Load a route list, then write the results of a phone list
+    to output; "-" writes them to stdout instead.
+    Return the number of results written.
+    """
+    engine = FlatDecimalTree()
+    loader.load_routes(
+        engine, "Carrier A",
+        os.path.join(convert.DATA_FOLDER, route_data + ".txt"), report_every=0)
+    phone_path = os.path.join(convert.DATA_FOLDER, phone_data + ".txt")
+
+    if output != "-":
+        return write_result_file(engine, phone_path, output)
+    try:
+        return write_results(engine, iter_numbers(phone_path), sys.stdout)
+    except BrokenPipeError:
+        # the reader went away (like "| head"); that is fine.
+        # stdout is pointed at devnull so python can exit quietly.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print(__doc__)
+        sys.exit(1)
+    main(*sys.argv[1:])
@@ -0,0 +1,56 @@
+from flattree import FlatDecimalTree
+import io
+import os
+import resultwriter
+import tempfile
+import unittest
+
+
+def make_tree():
+    tree = FlatDecimalTree()
+    tree.insert('1415', ('A', 20000))
+    tree.insert('1415234', ('B', 30000))
+    return tree
+
+
+class ResultWriterTest(unittest.TestCase):
+
+    def test_write_results_in_chunks(self):
+        tree = make_tree()
+        calls = []
+        price_many = tree.price_many
+        tree.price_many = lambda phones: calls.append(len(phones)) or price_many(phones)
+        numbers = ['+14152345678', '+14159999999', '+19876543210']
+        output = io.StringIO()
+        count = resultwriter.write_results(tree, iter(numbers), output,
+                                           chunk_size=2)
+        assert count == 3
+        assert calls == [2, 1]
+        assert output.getvalue() == (
+            '+14152345678,0.03\n+14159999999,0.02\n+19876543210,0\n')
+
+    def test_malformed_numbers(self):
+        numbers = ['+1-415', '+14152345678', '1415 234', '+', '14159999999']
+        output = io.StringIO()
+        assert resultwriter.write_results(make_tree(), numbers, output) == 5
+        assert output.getvalue() == (
+            '+1-415,malformed number\n+14152345678,0.03\n'
+            '1415 234,malformed number\n+,malformed number\n14159999999,0.02\n')
+
+    def test_write_result_file(self):
+        folder = tempfile.mkdtemp()
+        phone_path = os.path.join(folder, 'phones.txt')
+        output_path = os.path.join(folder, 'results.txt')
+        with open(phone_path, 'w') as file:
+            file.write('+14152345678\n\n+1512\n')
+        try:
+            count = resultwriter.write_result_file(
+                make_tree(), phone_path, output_path)
+            assert count == 2
+            with open(output_path) as file:
+                assert file.read() == '+14152345678,0.03\n+1512,0\n'
+            assert not os.path.exists(output_path + '.tmp')
+        finally:
+            for name in os.listdir(folder):
+                os.remove(os.path.join(folder, name))
+            os.rmdir(folder)
@@ -0,0 +1,104 @@
+"""
+Compute the difference between two versions of a route file.
+
+A carrier usually changes a few thousand routes, not all of
+them; so rather than rebuilding the whole index, the delta
+between the old & the new file can be applied to it instead.
+
+A delta file has one change per line:
+
+    + +1415,0.02     a prefix that was added
+    ~ +1415234,0.03  a prefix with a changed price
+    - +1512          a prefix that was removed
+
+usage:
+    python routediff.py old-route-file new-route-file > delta.txt
+"""
+
+
+# import necessary modules
+import sys
+from collections import namedtuple
+import loader # local module
+from fixedpoint import format_micros, parse_micros
+
+
+# added & changed are {prefix: price in micro-dollars}; removed
+# is a set. prefixes are stored without their leading "+".
+RouteDelta = namedtuple("RouteDelta", ["added", "changed", "removed"])
+
+
+def read_route_table(path):
+    """
+    Return the {prefix: lowest price} table of a route file.
+    """
+    table = {}
+    for prefix, price in loader.iter_routes(path):
+        if prefix not in table or price < table[prefix]:
+            table[prefix] = price
+    return table
+
+
+def diff_tables(old_table, new_table):
+    """
+    Return the RouteDelta that turns old_table into new_table.
+    ~~~
+    runtime: O(n)
+    --> n is the number of prefixes in both tables.
+    """
+    added = {}
+    changed = {}
+    for prefix, price in new_table.items():
+        old_price = old_table.get(prefix)
+        if old_price is None:
+            added[prefix] = price
+        elif old_price != price:
+            changed[prefix] = price
+    removed = old_table.keys() - new_table.keys()
+    return RouteDelta(added, changed, removed)
+
+
+def diff_files(old_path, new_path):
+    """
+    Return the RouteDelta between two versions of a route file.
+    """
+    return diff_tables(read_route_table(old_path), read_route_table(new_path))
+
+
+def write_delta(delta, file=sys.stdout):
+    """
+    Write a RouteDelta in the delta file format.
+    """
+    lines = []
+    for prefix, price in delta.added.items():
+        lines.append(f"+ +{prefix},{format_micros(price)}\n")
+    for prefix, price in delta.changed.items():
+        lines.append(f"~ +{prefix},{format_micros(price)}\n")
+    for prefix in sorted(delta.removed):
+        lines.append(f"- +{prefix}\n")
+    file.write("".join(lines))
+
+
+def read_delta(path):
+    """
+    Read a delta file back into a RouteDelta.
+    """
+    delta = RouteDelta({}, {}, set())
+    with open(path) as file:
+        for line in file:
+            kind, _, route = line.strip().partition(" ")
+            prefix, _, price = route.lstrip("+").partition(",")
+            if kind == "+":
+                delta.added[prefix] = parse_micros(price)
+            elif kind == "~":
+                delta.changed[prefix] = parse_micros(price)
+            elif kind == "-":
+                delta.removed.add(prefix)
+    return delta
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    write_delta(diff_files(sys.argv[1], sys.argv[2]))
@@ -0,0 +1,30 @@
+import io
+import os
+import routediff
+import tempfile
+import unittest
+
+
+class RouteDiffTest(unittest.TestCase):
+
+    def write(self, text):
+        handle, path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(handle, 'w') as file:
+            file.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_diff_files(self):
+        old = self.write('+1415,0.02\n+1512,0.04\n+44,0.5\n+44,0.4\n')
+        new = self.write('+1415,0.03\n+44,0.4\n+81,0.6\n')
+        delta = routediff.diff_files(old, new)
+        assert delta.added == {'81': 600000}
+        assert delta.changed == {'1415': 30000}
+        assert delta.removed == {'1512'}
+
+    def test_delta_round_trip(self):
+        delta = routediff.RouteDelta({'81': 600000}, {'1415': 30000}, {'1512'})
+        text = io.StringIO()
+        routediff.write_delta(delta, text)
+        assert text.getvalue() == '+ +81,0.6\n~ +1415,0.03\n- +1512\n'
+        assert routediff.read_delta(self.write(text.getvalue())) == delta
@@ -9,31 +9,27 @@ How can you operationalize the route cost lookup problem?
 
 # import necessary modules
 import time
-import platform
-import resource
 import convert # local module
+import loader # local module
+from fixedpoint import format_micros
 
 
 class CallRouting:
     def __init__(self, phone_numbers, route_costs):
-        # run convert to generate files
-        convert.main(phone_numbers, route_costs)
+        # read data dictionaries from given text file inputs.
+        # convert keeps a binary index of each text file,
+        # so only the first run has to parse the text.
 
-        # import data dictionaries
-        # from given text file inputs.
-        phone_dict = __import__(phone_numbers)
-        route_dict = __import__(route_costs)
-
-        # dictionary of string:double...
-        # {route number:lowest price}
-        self.route_dict = route_dict.dictionary
+        # dictionary of string:int...
+        # {route number:lowest price in micro-dollars}
+        self.route_dict = convert.read_route_data(route_costs)
 
         # dictionary of phone string...
         # {phone number:NONE }
-        self.phone_dict = phone_dict.dictionary
+        self.phone_dict = convert.read_phone_data(phone_numbers)
 
-        # dictionary of string:double...
-        # {phone number:lowest price}
+        # dictionary of string:int...
+        # {phone number:lowest price in micro-dollars}
         self.price_dict = {}
 
         # our goal is to take the first two dictionaries, &
@@ -46,13 +42,17 @@ class CallRouting:
         String representation of a dictionary.
         Lines up things pretty nicely!
         """
-        pretty_dict = ""
+        # collect the entries, then join them once at the end;
+        # adding strings one at a time copies the whole output
+        # again for every entry.
+        entries = []
         for key in self.price_dict:
             price = self.price_dict[key]
+            # prices are whole micro-dollars, & 0 means no route.
+            price = format_micros(price) if price else 0
             # prettify entry before adding to output.
-            entry = f"{' '*(14-len(key))}{key}: ${price}\n"
-            pretty_dict += entry
-        return pretty_dict
+            entries.append(f"{' '*(14-len(key))}{key}: ${price}\n")
+        return "".join(entries)
 
 
     def get_prices(self):
@@ -97,18 +97,8 @@ class CallRouting:
 
 
 def benchmark_memory():
-    # get memory usage
-    usage = resource.getrusage(
-        resource.RUSAGE_SELF).ru_maxrss
-
-    # linux returns kilobytes and macOS returns bytes.
-    # here we convert both to megabytes.
-    if platform.system() == "linux":
-        # convert kb to mb and round to 2 digits.
-        usage = round(usage / float(1 << 10), 2)
-    else:
-        # convert bytes to mb and round to 2 digits.
-        usage = round(usage / float(1 << 20), 2)
+    # peak memory usage in mb, rounded to 2 digits.
+    usage = round(loader.peak_memory(), 2)
 
     # return memory usage string.
     return(f"Memory Usage: {usage} mb")
@@ -141,8 +131,8 @@ if __name__ == "__main__":
         print("""
         The first time this file runs, it is slow.
         It will be faster on your next run.
-        __pycache__ will store some data; our app will
-        also generates some dictionaries for future use.\n
+        our app will save a binary index of each data file;
+        later runs read the index instead of the text.\n
         """)
 
     # print benchmarks.
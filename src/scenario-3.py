@@ -5,37 +5,62 @@
 # to handle this larger dataset?
 
 from decimaltree import DecimalSearchTree
+from flattree import FlatDecimalTree
+from instrument import InstrumentedEngine, Metrics, Profiler
+from liveindex import LiveIndex
+import loader
 import os
-import resource
-import platform
+import resultwriter
+import shardindex
+import sys
 import time
 
 THIS_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', "data"))
 
 
 class CallRouting:
-    def __init__(self, phone_number_files, carriers):
+    def __init__(self, phone_number_files, carriers, index_path=None, shard_folder=None, max_shards=None,
+                 instrument=False):
         self.carriers = self._format_carriers(carriers)  # A dictionary of {'carrier name', file path}
 
+        # When index_path is given, the built tree is saved there as a flat index file, and
+        # later runs (or worker processes) memory map it read-only instead of rebuilding it.
+        self.index_path = index_path
+
+        # When shard_folder is given, the routes are instead split there into one index file
+        # per leading 2 digits, and each shard is only mapped the first time a number in it is
+        # priced; max_shards caps how many stay loaded at once.
+        self.shard_folder = shard_folder
+        self.max_shards = max_shards
+
+        # With instrument, build phases and lookups are recorded in self.metrics (see instrument.py).
+        # The profiler is always there, but only runs between start_profile and stop_profile
+        # (or start_memory and stop_memory).
+        self.metrics = Metrics() if instrument else None
+        self.profiler = Profiler()
+
         self.phone_numbers_paths = []
-        self.decimal_search_tree = DecimalSearchTree()
+        # Lookups go through the live index, so a rebuilt tree can be swapped in at any time
+        self.live_index = LiveIndex(DecimalSearchTree())
+        if shard_folder is not None:
+            # Each reload builds a new version of the shards; the old version is fully loaded
+            # before its files are deleted, so lookups still running on it never miss a shard.
+            self.live_index.listeners.append(shardindex.retire_on_swap)
         for file in phone_number_files:
             self.phone_numbers_paths.append(os.path.join(THIS_FOLDER, file + '.txt'))  # A path string of to the phone number file
 
-        self.dict_of_routes = {}  # dictionary of string : double  {carrier : [(route number, price)]}
         self.list_of_numbers = []  # list of strings  [phone numbers]
 
     def run(self):
-        start_creating_dict = time.time()
-        self._get_routes_from_carriers()
+        start_reading_numbers = time.time()
         self._get_phone_numbers()
         end = time.time()
-        print("Runtime to create dictionary of carriers and routes, and phone number: " + str(end - start_creating_dict))
+        print("Runtime to read phone numbers: " + str(end - start_reading_numbers))
 
         start_creating_tree = time.time()
         self.popuplate_tree()
         end_tree = time.time()
-        print('Runtime for creating tree: ' + str(end_tree - start_creating_tree))
+        print('Runtime for streaming routes into the tree: ' + str(end_tree - start_creating_tree))
 
         start_searching = time.time()
         self.check_prices()
@@ -57,33 +82,85 @@ class CallRouting:
 
         return new_dict
 
-    def _get_routes_from_carriers(self):
-        """Must be call after self._format_carriers is done."""
-        for key in self.carriers.keys():
-            with open(self.carriers[key]) as f:
-                file = f.read().splitlines()
-                for line in file:
-                    route_number, price = line.split(',')
-                    tup = (route_number, float(price))
-                    if key in self.dict_of_routes:
-                        self.dict_of_routes[key].append(tup)
-                    else:
-                        self.dict_of_routes[key] = [tup]
-
-    def popuplate_tree(self):
-        """Convert the dictionary of routes prices into a tree"""
-        for key in self.dict_of_routes.keys():
-            list_of_route_prices = self.dict_of_routes[key]
-            for item in list_of_route_prices:
-                number = item[0][1:]
-                data = (key, item[1])
-                self.decimal_search_tree.insert(number, data)
+    @property
+    def decimal_search_tree(self):
+        """The tree that is serving lookups right now."""
+        return self.live_index.current
+
+    def popuplate_tree(self, report_every=1000000, workers=None):
+        """
+        Stream every carrier's route file straight into the tree, one line at a time.
+        With workers, the files are parsed in a pool of that many processes instead.
+        Must be called after self._format_carriers is done.
+        """
+        self.live_index.swap(self._build_tree(self.carriers, report_every, workers))
+
+    def reload(self, carriers=None, report_every=0, workers=None):
+        """
+        Rebuild the tree in the background from the carrier route files (or a new list of
+        carriers), then swap it in. Lookups keep running on the old tree until the swap.
+        Return a Future of the swap report, which includes the peak memory.
+        """
+        new_carriers = self.carriers if carriers is None else self._format_carriers(carriers)
+
+        def build():
+            tree = self._build_tree(new_carriers, report_every, workers)
+            self.carriers = new_carriers
+            return tree
+
+        return self.live_index.rebuild(build)
+
+    def _build_tree(self, carriers, report_every=1000000, workers=None):
+        """Build and return a new tree from a dictionary of {carrier name: file path}."""
+        if self.shard_folder is not None:
+            # Opening current shards only reads their manifest, so startup is nearly free
+            return shardindex.load_sharded(self.shard_folder, carriers, 2, self.max_shards)
+
+        if self.index_path is not None:
+            # Map the saved index if it is still current with every carrier's route file
+            sources = list(carriers.values())
+            tree = FlatDecimalTree.load(self.index_path, sources)
+            if tree is not None:
+                return tree
+            tree = FlatDecimalTree()
+        else:
+            tree = DecimalSearchTree()
+
+        if workers and self.metrics is not None:
+            with self.metrics.timer('build.load_parallel'):
+                loader.load_parallel(tree, carriers, workers)
+        elif workers:
+            loader.load_parallel(tree, carriers, workers)
+        else:
+            for key in carriers.keys():
+                loader.load_routes(tree, key, carriers[key], report_every, metrics=self.metrics)
+
+        if self.index_path is not None:
+            tree.save(self.index_path, sources)
+        return tree
 
     def check_prices(self):
         """Check the price of the phone numbers in the tree"""
+        return self.price_many(self.list_of_numbers)
+
+    def write_prices(self, file=sys.stdout, chunk_size=resultwriter.CHUNK_SIZE):
+        """
+        Write a "+number,price" line for every phone number to file, a chunk at a time.
+        Return the number of results written.
+        """
+        return resultwriter.write_results(self.live_index, self.list_of_numbers, file, chunk_size)
+
+    def price_many(self, numbers):
+        """
+        Price a batch of phone numbers with one shared walk of the tree.
+        Return [(phone number, (carrier name, price))] in the input order.
+        """
+        engine = self.decimal_search_tree
+        if self.metrics is not None:
+            engine = InstrumentedEngine(engine, self.metrics, trace_every=1)
+        search_results = engine.price_many([number[1:] for number in numbers])
         result_prices = []  # [(phone number, (carrier name, price))]
-        for number in self.list_of_numbers:
-            search_result = self.decimal_search_tree.get_price(number[1:])
+        for number, search_result in zip(numbers, search_results):
             if search_result is None:  # signalling that there is no matching prefix for the current number
                 result_prices.append((number, ('None', 0)))  # Appending this way to keep everything consistent
             else:
@@ -91,6 +168,26 @@ class CallRouting:
 
         return result_prices
 
+    def metrics_snapshot(self):
+        """Return the recorded counters and histograms, or None if instrumentation is off."""
+        return None if self.metrics is None else self.metrics.snapshot()
+
+    def start_profile(self):
+        """Start profiling every function call with cProfile, until stop_profile is called."""
+        self.profiler.start()
+
+    def stop_profile(self, top=20):
+        """Stop profiling, and return the report of the top functions by cumulative time."""
+        return self.profiler.stop(top)
+
+    def start_memory(self):
+        """Start tracing memory allocations with tracemalloc, until stop_memory is called."""
+        self.profiler.start_memory()
+
+    def stop_memory(self, top=10):
+        """Stop tracing memory, and return the top lines of code by memory allocated meanwhile."""
+        return self.profiler.stop_memory(top)
+
 
 phone_data_files = [
     "phone-numbers-3",
@@ -100,6 +197,7 @@ phone_data_files = [
     "phone-numbers-10000",
 ]
 
+# route-costs-1000000 is written by "python generate.py routes 1000000".
 route_carriers = [('Carrier A', "route-costs-10"),
                   ('Carrier B', "route-costs-100"),
                   ('Carrier C', "route-costs-600"),
@@ -107,24 +205,17 @@ route_carriers = [('Carrier A', "route-costs-10"),
                   ('Carrier E', "route-costs-106000"),
                   ('Carrier F', "route-costs-1000000")]
 
-route = CallRouting(phone_data_files, route_carriers)
 
-start = time.time()
-route.run()
-end = time.time()
-print('\nOver allRuntime: ' + str(end - start))
+if __name__ == "__main__":
+    route = CallRouting(phone_data_files, route_carriers)
 
-# get memory usage
-usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    route.run()
+    end = time.time()
+    print('\nOver allRuntime: ' + str(end - start))
 
-# linux returns kb and macOS returns bytes,
-# here we convert both to mb
-if platform.system() == 'linux':
-    # convert kb to mb and round to 2 digits
-    usage = round(usage / float(1 << 10), 2)
-else:
-    # convert bytes to mb and round to 2 digits
-    usage = round(usage / float(1 << 20), 2)
+    # get peak memory usage in mb, rounded to 2 digits
+    usage = round(loader.peak_memory(), 2)
 
-# print memory usage
-print("Memory Usage: {} mb.".format(usage))
+    # print memory usage
+    print("Memory Usage: {} mb.".format(usage))
@@ -0,0 +1,83 @@
+"""
+Scenario 4: High-throughput pricing API.
+
+You have 5 carrier route lists, each with 10,000,000 (10M) entries &
+you want to create a web-service API to allow clients to price a call
+before it is initiated. How can you create an efficient route cost
+lookup solution that can handle high spikes of traffic (up to 10,000
+requests per minute) without overloading your API servers?
+
+A cache size puts a PriceCache of that many numbers in front of the
+index, since real traffic prices the same numbers over & over.
+
+A batch delay (in milliseconds, or "-" for none) prices
+concurrent lookups that arrive within that window together, in
+micro-batches of up to 256 numbers.
+
+To keep a spike from overloading the server, requests past 1000
+in flight, or past a mean latency of 0.5 sec, are shed with a 503.
+A rate limit (in requests per second, off by default) also gives
+every client (an X-Client-Id header, or else its address) a
+token bucket of that rate, with bursts of twice that; requests
+past it get a 429. Many clients can share one address behind a
+proxy, so a limit that is too low throttles all of them at once.
+
+With --metrics, every lookup & request is recorded, & the
+/debug/metrics, /debug/profile & /debug/memory endpoints are
+served to clients on this machine (see service.py).
+
+usage:
+    python scenario-4.py [port] [cache size] [batch delay ms] [rate limit] [--metrics]
+    python loadgen.py 20000 8 127.0.0.1:8080
+    python scenario-4.py 8080 0 - 100
+    python loadgen.py 20000 8 127.0.0.1:8080 phone-numbers-10000 8
+"""
+
+
+# import necessary modules
+import asyncio
+import os
+import sys
+import convert # local module
+import service # local module
+from admission import AdmissionController
+from instrument import Metrics
+from pricecache import PriceCache
+
+
+# the route index is saved here after the first build, &
+# memory mapped by every later start of the service.
+INDEX_PATH = os.path.join(convert.DATA_FOLDER, "scenario-4.idx")
+
+route_carriers = [
+    ("Carrier A", "route-costs-10"),
+    ("Carrier B", "route-costs-100"),
+    ("Carrier C", "route-costs-600"),
+    ("Carrier D", "route-costs-35000"),
+    ("Carrier E", "route-costs-106000"),
+]
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--metrics"]
+    metrics = Metrics() if "--metrics" in sys.argv else None
+    port = int(args[0]) if len(args) > 0 else 8080
+    cache_size = int(args[1]) if len(args) > 1 else 0
+    batch_delay = None
+    if len(args) > 2 and args[2] != "-":
+        batch_delay = float(args[2]) / 1000
+    rate = float(args[3]) if len(args) > 3 else 0
+
+    # load the route index once, before taking any requests.
+    engine = service.load_engine(route_carriers, INDEX_PATH)
+    if cache_size:
+        engine = PriceCache(engine, cache_size)
+    admission = AdmissionController(
+        rate=rate or None, burst=max(1, 2 * rate), max_in_flight=1000, max_latency=0.5)
+    pricing = service.PricingService(engine, batch_delay, admission=admission,
+                                     metrics=metrics)
+
+    try:
+        asyncio.run(service.serve(pricing, port=port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,93 @@
+"""
+Scenario 5: Changing carrier route lists.
+
+Consider the challenges imposed by carriers changing their route lists
+occasionally. How would you change a subset of the route cost data while
+the pricing API remains operational?
+
+This runs the Scenario 4 pricing service on a live index. Every few
+seconds the carrier route files are checked, & when one has changed a
+new index is built in the background & swapped in; requests keep being
+answered by the old index until the swap.
+
+With a cache size, a PriceCache sits in front of the live index, &
+is cleared on every swap so it never answers from an old version.
+
+With --metrics, every lookup & request is recorded, & the
+/debug endpoints are served, as in Scenario 4.
+
+usage:
+    python scenario-5.py [port] [seconds between checks] [cache size] [--metrics]
+"""
+
+
+# import necessary modules
+import asyncio
+import os
+import sys
+import convert # local module
+import indexfile # local module
+import service # local module
+from instrument import Metrics
+from liveindex import LiveIndex, watch
+from pricecache import PriceCache
+
+
+# the route index is saved here after every build.
+INDEX_PATH = os.path.join(convert.DATA_FOLDER, "scenario-5.idx")
+
+route_carriers = [
+    ("Carrier A", "route-costs-10"),
+    ("Carrier B", "route-costs-100"),
+    ("Carrier C", "route-costs-600"),
+    ("Carrier D", "route-costs-35000"),
+    ("Carrier E", "route-costs-106000"),
+]
+
+
+def route_files_key():
+    """
+    Return the combined size & mtime of every route file.
+    """
+    paths = [os.path.join(convert.DATA_FOLDER, name + ".txt")
+             for _, name in route_carriers]
+    return indexfile.source_key(paths, verify=False)
+
+
+async def watch_route_files(live_index, interval):
+    """
+    Rebuild & swap the index whenever a route file changes.
+    A failed rebuild is logged, & the current index is kept.
+    """
+    # the build runs on the live index's builder thread.
+    await watch(
+        live_index, interval, route_files_key,
+        lambda: service.load_engine(route_carriers, INDEX_PATH))
+
+
+async def main(port, interval, cache_size=0, metrics=None):
+    live_index = LiveIndex(service.load_engine(route_carriers, INDEX_PATH))
+    engine = live_index
+    if cache_size:
+        engine = PriceCache(live_index, cache_size)
+        engine.attach(live_index)
+    watcher = asyncio.create_task(watch_route_files(live_index, interval))
+    try:
+        await service.serve(service.PricingService(engine, metrics=metrics),
+                            port=port)
+    finally:
+        watcher.cancel()
+        live_index.close()
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--metrics"]
+    metrics = Metrics() if "--metrics" in sys.argv else None
+    port = int(args[0]) if len(args) > 0 else 8080
+    interval = float(args[1]) if len(args) > 1 else 5.0
+    cache_size = int(args[2]) if len(args) > 2 else 0
+
+    try:
+        asyncio.run(main(port, interval, cache_size, metrics))
+    except KeyboardInterrupt:
+        pass
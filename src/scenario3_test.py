@@ -0,0 +1,92 @@
+import importlib.util
+import io
+import os
+import shardindex
+import shutil
+import tempfile
+import unittest
+
+
+# The file name has a dash, so it can not be imported by name
+spec = importlib.util.spec_from_file_location(
+    'scenario3', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenario-3.py'))
+scenario3 = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(scenario3)
+
+ROUTES_A = '+1,0.5\n+1415,0.02\n+44,0.1\n'
+ROUTES_B = '+1415,0.01\n+4420,0.07\n'
+PHONES = '+14155550000\n+442071234567\n+33123456789\n'
+
+
+class CallRoutingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for name, text in (('A', ROUTES_A), ('B', ROUTES_B), ('phones', PHONES)):
+            with open(os.path.join(self.folder, name + '.txt'), 'w') as file:
+                file.write(text)
+        # CallRouting adds ".txt" to each name, & joins it to the data
+        # folder; joining an absolute path gives the path itself
+        self.carriers = [('Carrier A', os.path.join(self.folder, 'A')),
+                         ('Carrier B', os.path.join(self.folder, 'B'))]
+        self.phones = [os.path.join(self.folder, 'phones')]
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def route(self, **options):
+        route = scenario3.CallRouting(self.phones, self.carriers, **options)
+        route._get_phone_numbers()
+        route.popuplate_tree()
+        return route
+
+    def rows(self, route):
+        file = io.StringIO()
+        route.write_prices(file)
+        return file.getvalue().splitlines()
+
+    def assert_prices(self, route):
+        assert route.check_prices() == [
+            ('+14155550000', ('Carrier B', 10000)),
+            ('+442071234567', ('Carrier B', 70000)),
+            ('+33123456789', ('None', 0)),
+        ]
+        assert self.rows(route) == [
+            '+14155550000,0.01', '+442071234567,0.07', '+33123456789,0']
+
+    def test_plain(self):
+        self.assert_prices(self.route())
+
+    def test_index_path(self):
+        index_path = os.path.join(self.folder, 'routes.idx')
+        self.assert_prices(self.route(index_path=index_path))
+        saved = os.stat(index_path).st_mtime_ns
+        # A second run maps the saved index instead of rebuilding it
+        self.assert_prices(self.route(index_path=index_path))
+        assert os.stat(index_path).st_mtime_ns == saved
+
+    def test_shard_folder_reload(self):
+        shard_folder = os.path.join(self.folder, 'shards')
+        route = self.route(shard_folder=shard_folder, max_shards=1)
+        self.assert_prices(route)
+        with open(os.path.join(self.folder, 'B.txt'), 'a') as file:
+            file.write('+33,0.03\n')
+        route.reload().result()
+        assert route.decimal_search_tree.folder == shardindex.version_path(shard_folder, 2)
+        assert self.rows(route)[2] == '+33123456789,0.03'
+        # The old version was retired once the new one was swapped in
+        assert shardindex.versions(shard_folder) == [2]
+        route.live_index.close()
+
+    def test_instrument(self):
+        route = self.route(instrument=True)
+        self.assert_prices(route)
+        snapshot = route.metrics_snapshot()
+        assert 'build.insert' in snapshot['histograms']
+        # Every number of a batch is traced
+        assert snapshot['histograms']['lookup.depth']['count'] == 3
+        assert self.route().metrics_snapshot() is None
+
+
+if __name__ == '__main__':
+    unittest.main()
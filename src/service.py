@@ -0,0 +1,461 @@
+"""
+An asyncio HTTP pricing service for Scenario 4.
+
+The route index is loaded once, & then every request is a
+plain lookup. Only the standard library is used: a small
+HTTP/1.1 parser with keep-alive sits on asyncio streams.
+
+    GET  /price?number=+14152345678
+         {"number": "+14152345678", "carrier": "A", "price": "0.03"}
+
+    POST /price   {"numbers": ["+14152345678", "+19876543210"]}
+         {"results": [{...}, {...}]}
+
+A number without a route gets a null carrier & a price of "0".
+Prices are exact decimal text, formatted from the whole
+micro-dollars the engines store (see fixedpoint), rather than
+JSON numbers, which most clients read as floats.
+Malformed numbers are rejected before they touch the index.
+
+An engine that blocks on I/O says so with a true blocking
+attribute (like a ShardRouter, which waits on its workers); its
+lookups then run in the event loop's thread pool, so one slow
+round trip does not stall every other client.
+
+With a batch delay, concurrent GET lookups are priced together
+in micro-batches (see microbatch.py), rather than one at a time.
+With admission control (see admission.py), requests past a
+client's rate get a 429, & requests that would overload the
+service get a 503, before they are priced. A client is known by
+its X-Client-Id header (like an API key), or else its address.
+
+With metrics (see instrument.py), every lookup & request is
+recorded, & debug endpoints are served. They have no
+authentication, so they are only served to clients on the same
+machine (a loopback address); to them, they skip admission
+control, so they still answer during a spike. Anyone else gets
+a 404, like for any other unknown path.
+
+    GET  /debug/metrics                  counters & histograms
+    GET  /debug/profile?seconds=5&top=20 a cProfile of that long
+    GET  /debug/memory?seconds=5&top=10  the top allocations made
+                                         in that long
+"""
+
+
+# import necessary modules
+import asyncio
+import ipaddress
+import json
+import math
+import os
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+import convert # local module
+import loader # local module
+from fixedpoint import format_micros
+from flattree import FlatDecimalTree
+from instrument import InstrumentedEngine, Profiler
+from microbatch import MicroBatcher
+
+
+# E.164 numbers have at most 15 digits.
+MAX_DIGITS = 15
+
+# requests larger than these are refused without reading them.
+MAX_HEADER_BYTES = 8 << 10
+MAX_BODY_BYTES = 1 << 20
+MAX_BATCH = 10000
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    503: "Service Unavailable",
+}
+
+# rejected clients are asked to wait this many seconds.
+RETRY_AFTER = 1
+
+# the longest profile a debug request can ask for, in seconds.
+MAX_PROFILE_SECONDS = 60
+
+
+def normalize(number):
+    """
+    Turn a "+14152345678" number into the digits "14152345678".
+    A "+" in a query string decodes to a space, so that is
+    accepted too. Return None if the number is malformed.
+    ~~~
+    runtime: O(L)
+    """
+    if not isinstance(number, str):
+        return None
+    digits = number.strip().lstrip("+")
+    if not digits.isdigit() or not digits.isascii():
+        return None
+    if len(digits) > MAX_DIGITS:
+        return None
+    return digits
+
+
+def get_number(url):
+    """
+    Read the number of a GET /price url. Return (digits, None),
+    or (None, (status, payload)) if it is missing or malformed.
+    """
+    numbers = parse_qs(url.query).get("number")
+    if not numbers:
+        return None, (400, {"error": "missing number"})
+    digits = normalize(numbers[0])
+    if digits is None:
+        return None, (400, {"error": "malformed number"})
+    return digits, None
+
+
+class PricingService(object):
+    def __init__(self, engine, batch_delay=None, max_batch_size=256,
+                 admission=None, metrics=None):
+        """
+        Initialize the service around a loaded lookup engine.
+        The engine needs get_price & price_many methods.
+        With batch_delay (in seconds), single lookups wait up to
+        that long to be priced in a micro-batch of up to
+        max_batch_size numbers. admission is an optional
+        AdmissionController, consulted before every request.
+        metrics is an optional instrument.Metrics to record into.
+        """
+        self.blocking = getattr(engine, "blocking", False)
+        self.metrics = metrics
+        self.profiler = None
+        if metrics is not None:
+            if hasattr(engine, "stats"):
+                metrics.add_source("engine", engine.stats)
+            engine = InstrumentedEngine(engine, metrics)
+            self.profiler = Profiler()
+        self.engine = engine
+
+        self.admission = admission
+        self.batcher = None
+        if batch_delay is not None:
+            self.batcher = MicroBatcher(
+                engine, batch_delay, max_batch_size, self.blocking)
+        if metrics is not None:
+            for name in ("admission", "batcher"):
+                if getattr(self, name) is not None:
+                    metrics.add_source(name, getattr(self, name).stats)
+
+
+    def price(self, number):
+        """
+        Price one number. Return its result dictionary, or
+        None if the number is malformed.
+        """
+        digits = normalize(number)
+        if digits is None:
+            return None
+        return self._result(digits, self.engine.get_price(digits))
+
+
+    def price_batch(self, numbers):
+        """
+        Price many numbers with one shared walk of the index.
+        Malformed numbers get an error entry of their own.
+        """
+        digits = [normalize(number) for number in numbers]
+        valid = [number for number in digits if number is not None]
+        prices = iter(self.engine.price_many(valid))
+
+        results = []
+        for number, number_digits in zip(numbers, digits):
+            if number_digits is None:
+                results.append({"number": number,
+                                "error": "malformed number"})
+            else:
+                results.append(self._result(number_digits, next(prices)))
+        return results
+
+
+    def _result(self, digits, data):
+        """
+        Format a (carrier, price) lookup result for a number.
+        """
+        number = "+" + digits
+        if data is None:
+            return {"number": number, "carrier": None, "price": "0"}
+        return {"number": number, "carrier": data[0],
+                "price": format_micros(data[1])}
+
+
+    def handle(self, method, target, body):
+        """
+        Answer one request. Return (status, payload dictionary).
+        """
+        url = urlsplit(target)
+        if url.path != "/price":
+            return 404, {"error": "not found"}
+
+        if method == "GET":
+            digits, error = get_number(url)
+            if error is not None:
+                return error
+            return 200, self._result(digits, self.engine.get_price(digits))
+
+        if method == "POST":
+            try:
+                numbers = json.loads(body)["numbers"]
+            except (ValueError, KeyError, TypeError):
+                return 400, {"error": "expected {\"numbers\": [...]}"}
+            if not isinstance(numbers, list):
+                return 400, {"error": "expected {\"numbers\": [...]}"}
+            if len(numbers) > MAX_BATCH:
+                return 413, {"error": f"at most {MAX_BATCH} numbers"}
+            return 200, {"results": self.price_batch(numbers)}
+
+        return 405, {"error": "method not allowed"}
+
+
+    async def handle_async(self, method, target, body):
+        """
+        Answer one request like handle; but with a batcher, a
+        GET lookup waits to be priced in the next micro-batch.
+        A blocking engine is called off the event loop.
+        Return (status, payload dictionary).
+        """
+        if self.batcher is None or method != "GET":
+            if self.blocking:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    None, self.handle, method, target, body)
+            return self.handle(method, target, body)
+        url = urlsplit(target)
+        if url.path != "/price":
+            return 404, {"error": "not found"}
+        digits, error = get_number(url)
+        if error is not None:
+            return error
+        return 200, self._result(digits, await self.batcher.get_price(digits))
+
+
+    async def debug(self, method, target):
+        """
+        Answer one request for a debug endpoint.
+        Return (status, payload dictionary).
+        """
+        if method != "GET":
+            return 405, {"error": "method not allowed"}
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        try:
+            seconds = float(query.get("seconds", ["5"])[0])
+            top = int(query.get("top", ["20"])[0])
+        except ValueError:
+            return 400, {"error": "seconds & top must be numbers"}
+        # float() parses "nan", which slips through min & max.
+        if not math.isfinite(seconds):
+            return 400, {"error": "seconds must be a finite number"}
+        seconds = min(max(seconds, 0), MAX_PROFILE_SECONDS)
+
+        if url.path == "/debug/metrics":
+            return 200, self.metrics.snapshot()
+        if url.path == "/debug/profile":
+            try:
+                self.profiler.start()
+            except ValueError as error:
+                return 400, {"error": str(error)}
+            # requests keep being served while the profile runs.
+            await asyncio.sleep(seconds)
+            return 200, {"profile": self.profiler.stop(top)}
+        if url.path == "/debug/memory":
+            try:
+                self.profiler.start_memory()
+            except ValueError as error:
+                return 400, {"error": str(error)}
+            await asyncio.sleep(seconds)
+            return 200, {"memory": self.profiler.stop_memory(top)}
+        return 404, {"error": "not found"}
+
+
+    async def admit(self, client, method, target, body):
+        """
+        Answer one request of a client, unless the admission
+        controller turns it away first.
+        Return (status, payload dictionary).
+        """
+        admission = self.admission
+        if admission is None:
+            return await self.handle_async(method, target, body)
+
+        rejection = admission.admit(client)
+        if rejection is not None:
+            return rejection
+
+        start = time.perf_counter()
+        try:
+            # a lookup never waits on its own, so without this,
+            # each request would be read & answered in one go, &
+            # the backlog would build up unseen in the sockets.
+            # Yielding once lets every request that is ready be
+            # read & admitted first; so in_flight is the queue of
+            # requests read but not yet answered, & the latency
+            # includes the time spent waiting in it.
+            await asyncio.sleep(0)
+            return await self.handle_async(method, target, body)
+        finally:
+            admission.release(time.perf_counter() - start)
+
+
+    async def serve_client(self, reader, writer):
+        """
+        Serve every request sent over one client connection.
+        Connections are kept alive until the client closes
+        them, or asks for "Connection: close".
+        """
+        address = (writer.get_extra_info("peername") or ("",))[0]
+        local = is_loopback(address)
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                if method is None:
+                    # the request could not be read; say why & hang up.
+                    await write_response(writer, target, {"error": body},
+                                         keep_alive=False)
+                    break
+
+                client = headers.get("x-client-id", address)
+                if self.metrics is None:
+                    status, payload = await self.admit(
+                        client, method, target, body)
+                elif local and target.startswith("/debug/"):
+                    status, payload = await self.debug(method, target)
+                else:
+                    start = time.perf_counter()
+                    status, payload = await self.admit(
+                        client, method, target, body)
+                    self.metrics.observe(
+                        "request.seconds", time.perf_counter() - start)
+                    self.metrics.count(f"request.{status}")
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+    async def start(self, host="127.0.0.1", port=8080):
+        """
+        Start listening for clients. Return the asyncio server.
+        """
+        return await asyncio.start_server(
+            self.serve_client, host, port, limit=MAX_HEADER_BYTES)
+
+
+def is_loopback(address):
+    """
+    Return True if a client address is a loopback address, i.e.
+    the client runs on the same machine as the service.
+    """
+    try:
+        return ipaddress.ip_address(address).is_loopback
+    except ValueError:
+        return False
+
+
+async def read_request(reader):
+    """
+    Read one HTTP/1.1 request from a stream.
+    Return (method, target, headers, body), None if the client
+    hung up, or (None, status, None, error) if it was bad.
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        return None, 413, None, "headers too large"
+
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split(" ")
+    if len(parts) != 3:
+        return None, 400, None, "bad request line"
+    method, target, _ = parts
+
+    headers = {}
+    for line in lines[1:]:
+        name, colon, value = line.partition(":")
+        if colon:
+            headers[name.strip().lower()] = value.strip()
+
+    body = b""
+    length = headers.get("content-length", "0")
+    # isdigit alone accepts digits like "²", that int() does not.
+    if not length.isascii() or not length.isdigit():
+        return None, 400, None, "bad content-length"
+    length = int(length)
+    if length > MAX_BODY_BYTES:
+        return None, 413, None, "body too large"
+    if length:
+        body = await reader.readexactly(length)
+    return method, target, headers, body
+
+
+async def write_response(writer, status, payload, keep_alive=True):
+    """
+    Write one JSON response to a stream.
+    """
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+    if status in (429, 503):
+        head += f"Retry-After: {RETRY_AFTER}\r\n"
+    head += "\r\n"
+    writer.write(head.encode() + body)
+    await writer.drain()
+
+
+def load_engine(carriers, index_path=None):
+    """
+    Load the route index of many carriers.
+    carriers is a list of (carrier name, route data name).
+    With index_path, a saved index is memory mapped if it is
+    still current, or else built & saved there for next time.
+    """
+    paths = {
+        carrier: os.path.join(convert.DATA_FOLDER, name + ".txt")
+        for carrier, name in carriers}
+
+    if index_path is not None:
+        engine = FlatDecimalTree.load(index_path, list(paths.values()))
+        if engine is not None:
+            return engine
+
+    engine = FlatDecimalTree()
+    for carrier, path in paths.items():
+        loader.load_routes(engine, carrier, path)
+    if index_path is not None:
+        engine.save(index_path, list(paths.values()))
+    return engine
+
+
+async def serve(service, host="127.0.0.1", port=8080):
+    """
+    Run a pricing service until the process is stopped.
+    """
+    server = await service.start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"pricing service on http://{address[0]}:{address[1]}/price",
+          file=sys.stderr)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,206 @@
+from admission import AdmissionController
+from flattree import FlatDecimalTree
+from instrument import Metrics
+import asyncio
+import json
+import service
+import threading
+import time
+import tracemalloc
+import unittest
+
+
+def make_service(**options):
+    engine = FlatDecimalTree()
+    engine.insert('1415', ('A', 20000))
+    engine.insert('1415234', ('B', 30000))
+    return service.PricingService(engine, **options)
+
+
+class SlowEngine(object):
+    # Like a ShardRouter, every lookup waits on a round trip
+    blocking = True
+
+    def __init__(self):
+        self.tree = make_service().engine
+        self.threads = set()
+
+    def get_price(self, phone):
+        self.threads.add(threading.get_ident())
+        time.sleep(0.05)
+        return self.tree.get_price(phone)
+
+    def price_many(self, phones):
+        self.threads.add(threading.get_ident())
+        time.sleep(0.05)
+        return self.tree.price_many(phones)
+
+
+class PricingServiceTest(unittest.TestCase):
+
+    def test_normalize(self):
+        assert service.normalize('+14152345678') == '14152345678'
+        # A "+" in a query string decodes to a space
+        assert service.normalize(' 14152345678') == '14152345678'
+        assert service.normalize('+1415abc') is None
+        assert service.normalize('+') is None
+        assert service.normalize('+1234567890123456') is None
+        assert service.normalize(14152345678) is None
+
+    def test_get_price(self):
+        pricing = make_service()
+        status, payload = pricing.handle('GET', '/price?number=%2B14152345678', b'')
+        assert status == 200
+        assert payload == {'number': '+14152345678', 'carrier': 'B', 'price': '0.03'}
+        status, payload = pricing.handle('GET', '/price?number=+19876543210', b'')
+        assert payload == {'number': '+19876543210', 'carrier': None, 'price': '0'}
+
+    def test_rejects_bad_requests(self):
+        pricing = make_service()
+        assert pricing.handle('GET', '/price?number=abc', b'')[0] == 400
+        assert pricing.handle('GET', '/price', b'')[0] == 400
+        assert pricing.handle('GET', '/nope', b'')[0] == 404
+        assert pricing.handle('DELETE', '/price', b'')[0] == 405
+        assert pricing.handle('POST', '/price', b'[1, 2]')[0] == 400
+
+    def test_post_batch(self):
+        pricing = make_service()
+        body = json.dumps({'numbers': ['+14155550000', 'x', '+14152340000']})
+        status, payload = pricing.handle('POST', '/price', body.encode())
+        assert status == 200
+        assert payload['results'] == [
+            {'number': '+14155550000', 'carrier': 'A', 'price': '0.02'},
+            {'number': 'x', 'error': 'malformed number'},
+            {'number': '+14152340000', 'carrier': 'B', 'price': '0.03'},
+        ]
+
+    def test_keep_alive_connection(self):
+        async def talk():
+            server = await make_service().start('127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            statuses = []
+            for number in ('%2B14152345678', 'oops'):
+                writer.write(f'GET /price?number={number} HTTP/1.1\r\n\r\n'.encode())
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+                await reader.readexactly(length)
+                statuses.append(int(head.split(b' ')[1]))
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return statuses
+
+        assert asyncio.run(talk()) == [200, 400]
+
+    def test_read_request(self):
+        async def read(data):
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            return await service.read_request(reader)
+
+        head = b'POST /price HTTP/1.1\r\nContent-Length: '
+        assert asyncio.run(read(head + b'2\r\n\r\n{}')) == (
+            'POST', '/price', {'content-length': '2'}, b'{}')
+        # "\xb2" is a superscript 2 in latin-1: a digit, but not a length
+        for length in (b'\xb2', b'-1', b'2x'):
+            assert asyncio.run(read(head + length + b'\r\n\r\n'))[1] == 400
+        assert asyncio.run(read(head + b'9999999\r\n\r\n'))[1] == 413
+
+    def test_micro_batched_lookups(self):
+        pricing = make_service(batch_delay=0.01)
+
+        async def lookups():
+            return await asyncio.gather(
+                pricing.handle_async('GET', '/price?number=%2B14152345678', b''),
+                pricing.handle_async('GET', '/price?number=%2B14155550000', b''),
+                pricing.handle_async('GET', '/price?number=oops', b''),
+                pricing.handle_async('GET', '/nope', b''))
+
+        responses = asyncio.run(lookups())
+        assert responses[0] == (200, {'number': '+14152345678', 'carrier': 'B', 'price': '0.03'})
+        assert responses[1] == (200, {'number': '+14155550000', 'carrier': 'A', 'price': '0.02'})
+        assert [status for status, _ in responses[2:]] == [400, 404]
+        # Both valid numbers were priced in one batch
+        assert pricing.batcher.stats()['batches'] == 1
+
+    def test_blocking_engine_runs_off_the_loop(self):
+        for batch_delay in (None, 0):
+            engine = SlowEngine()
+            pricing = service.PricingService(engine, batch_delay=batch_delay)
+
+            async def lookups():
+                ticks = []
+
+                async def tick():
+                    for _ in range(5):
+                        ticks.append(time.perf_counter())
+                        await asyncio.sleep(0.01)
+
+                _, *responses = await asyncio.gather(
+                    tick(),
+                    pricing.handle_async('GET', '/price?number=%2B14152345678', b''),
+                    pricing.handle_async('POST', '/price', b'{"numbers": ["+14155550000"]}'))
+                return responses, ticks
+
+            responses, ticks = asyncio.run(lookups())
+            assert responses[0] == (200, {'number': '+14152345678', 'carrier': 'B', 'price': '0.03'})
+            assert responses[1][1]['results'][0]['carrier'] == 'A'
+            assert threading.get_ident() not in engine.threads
+            # The loop kept ticking while the lookups were in flight
+            assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.04
+
+    def test_admission_control(self):
+        pricing = make_service(admission=AdmissionController(rate=1, burst=1))
+
+        async def requests():
+            return [await pricing.admit(client, 'GET', '/price?number=%2B14152345678', b'')
+                    for client in ('a', 'a', 'b')]
+
+        statuses = [status for status, _ in asyncio.run(requests())]
+        assert statuses == [200, 429, 200]
+        assert pricing.admission.in_flight == 0
+
+    def test_requests_queue_until_answered(self):
+        pricing = make_service(admission=AdmissionController(
+            rate=None, max_in_flight=2, max_latency=None))
+
+        async def requests():
+            return await asyncio.gather(*(
+                pricing.admit('a', 'GET', '/price?number=%2B14152345678', b'')
+                for _ in range(3)))
+
+        # Every request is read before any is answered, so the third one is shed
+        statuses = [status for status, _ in asyncio.run(requests())]
+        assert statuses == [200, 200, 503]
+        assert pricing.admission.in_flight == 0
+
+    def test_debug_endpoints(self):
+        pricing = make_service(metrics=Metrics())
+        assert pricing.handle('GET', '/price?number=%2B14152345678', b'')[0] == 200
+
+        async def requests():
+            metrics = await pricing.debug('GET', '/debug/metrics')
+            profile = await pricing.debug('GET', '/debug/profile?seconds=0')
+            memory = await pricing.debug('GET', '/debug/memory?seconds=0')
+            bad = [await pricing.debug('GET', f'/debug/{path}?seconds={seconds}')
+                   for path in ('profile', 'memory')
+                   for seconds in ('soon', 'nan', 'inf', '-inf')]
+            return metrics, profile, memory, bad
+
+        metrics, profile, memory, bad = asyncio.run(requests())
+        assert metrics[1]['histograms']['lookup.depth']['max'] == 7
+        assert profile[0] == 200 and 'profile' in profile[1]
+        assert memory[0] == 200 and 'memory' in memory[1]
+        # Memory is only traced for the length of the request
+        assert not tracemalloc.is_tracing()
+        assert [status for status, _ in bad] == [400] * 8
+        # Without metrics there are no debug endpoints at all
+        assert make_service().handle('GET', '/debug/metrics', b'')[0] == 404
+
+    def test_debug_only_for_loopback(self):
+        assert service.is_loopback('127.0.0.1')
+        assert service.is_loopback('::1')
+        assert not service.is_loopback('10.0.0.8')
+        assert not service.is_loopback('')
@@ -0,0 +1,353 @@
+"""
+A route index split on disk into shards by leading digits.
+
+Most lookups hit a handful of country codes, so rather than
+loading one big index, the routes are split by the first 1 or 2
+digits of their prefix, & each shard is saved as its own flat
+index file. A shard is only loaded (memory mapped, by default)
+the first time a number in its range is priced; so opening the
+index is nearly free, & a deployment that serves a few regions
+only ever loads those.
+
+With max_shards, at most that many shards stay loaded; the
+least recently used one is dropped to make room for another.
+
+Every build is written to a new version folder, so a rebuild
+never touches the files an open index is still loading from.
+A version is complete once its manifest is written; opening a
+folder opens its latest complete version.
+
+    folder/v3/manifest.idx  shard keys, digits & route count,
+                            keyed to the carrier route files.
+    folder/v3/shard-44.idx  a FlatDecimalTree of routes "44..."
+
+Once a new version is swapped into a LiveIndex, the old one is
+retired with retire_on_swap: it loads every shard it has not
+loaded yet, & only then deletes its version folder. Once a new
+manifest is written, every older complete version that no
+index open in this process still holds is deleted too; so a
+fresh process that rebuilds does not leave the versions of the
+last one behind.
+"""
+
+
+# import necessary modules
+import os
+import shutil
+import threading
+import weakref
+from array import array
+from collections import OrderedDict
+import indexfile # local module
+import loader # local module
+from flattree import FlatDecimalTree
+
+
+MANIFEST = "manifest.idx"
+
+# lines buffered per shard before they are written out.
+FLUSH_LINES = 10000
+
+# every ShardedIndex open in this process; the version folders
+# they load shards from are never removed from under them.
+_open_indexes = weakref.WeakSet()
+
+
+def versions(folder):
+    """
+    Return the version numbers of the builds in folder, oldest
+    first; complete or not.
+    """
+    if not os.path.isdir(folder):
+        return []
+    return sorted(int(name[1:]) for name in os.listdir(folder)
+                  if name[:1] == "v" and name[1:].isdigit())
+
+
+def version_path(folder, version):
+    """
+    Return the path of the folder of one version of the shards.
+    """
+    return os.path.join(folder, f"v{version}")
+
+
+def shard_path(folder, key):
+    """
+    Return the path of the index file of a shard.
+    """
+    return os.path.join(folder, f"shard-{key}.idx")
+
+
+def shard_keys(prefix, digits):
+    """
+    Return the keys of every shard a route prefix belongs to.
+    A prefix shorter than the shard key covers several shards,
+    so it is copied into each of them: with 2 digits, the route
+    "4" belongs to shards "40" up to "49".
+    """
+    if len(prefix) >= digits:
+        return [prefix[:digits]]
+    keys = [prefix]
+    while len(keys[0]) < digits:
+        keys = [key + digit for key in keys for digit in "0123456789"]
+    return keys
+
+
+def phone_key(phone, digits):
+    """
+    Return the key of the shard that prices a phone number.
+    A number shorter than the key is found in the first shard
+    it could be in, as every route it can match was copied there.
+    """
+    return phone[:digits].ljust(digits, "0")
+
+
+def remove_old_versions(folder):
+    """
+    Delete every complete version of the shards in folder older
+    than the latest one, unless an index open in this process
+    still holds it. Newer builds without a manifest are left.
+    Return the list of version numbers deleted.
+    """
+    complete = [version for version in versions(folder)
+                if os.path.exists(os.path.join(version_path(folder, version),
+                                               MANIFEST))]
+    held = {os.path.abspath(index.folder) for index in list(_open_indexes)}
+    removed = []
+    for version in complete[:-1]:
+        path = version_path(folder, version)
+        if os.path.abspath(path) not in held:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(version)
+    return removed
+
+
+def build_shards(folder, carriers, digits=1):
+    """
+    Split the route files of many carriers into shards, & save
+    each shard as an index file in a new version folder of
+    folder. carriers is a dict of {carrier name: route file path}.
+    The routes are first streamed into one text file per shard,
+    & then each shard is built & saved on its own; so memory is
+    bounded by the largest shard, not by all of them.
+    Older versions are then deleted (see remove_old_versions).
+    Return the path of the new version folder.
+    """
+    # a version without a manifest is a build that stopped
+    # halfway; no index can be reading it, so it is removed.
+    for version in versions(folder):
+        path = version_path(folder, version)
+        if not os.path.exists(os.path.join(path, MANIFEST)):
+            shutil.rmtree(path, ignore_errors=True)
+    latest = versions(folder)
+    root, folder = folder, version_path(folder, latest[-1] + 1 if latest else 1)
+    os.makedirs(folder)
+
+    # pass 1: stream every route into its shard's text file,
+    # as "carrier number,prefix,price in micro-dollars";
+    # carriers are split in order, so ties still go to the
+    # earlier carrier.
+    names = list(carriers)
+    buffers = {}
+    routes = 0
+
+    def flush(key):
+        with open(shard_path(folder, key) + ".txt", "a") as file:
+            file.write("".join(buffers[key]))
+        buffers[key].clear()
+
+    for number, path in enumerate(carriers.values()):
+        for prefixes, prices in loader.iter_route_blocks(path):
+            for prefix, price in zip(prefixes, prices):
+                for key in shard_keys(prefix, digits):
+                    buffer = buffers.setdefault(key, [])
+                    buffer.append(f"{number},{prefix},{price}\n")
+                    if len(buffer) >= FLUSH_LINES:
+                        flush(key)
+            routes += len(prefixes)
+    for key in buffers:
+        flush(key)
+
+    # pass 2: build & save one shard at a time.
+    for key in sorted(buffers):
+        text_path = shard_path(folder, key) + ".txt"
+        tree = FlatDecimalTree()
+        with open(text_path) as file:
+            for line in file:
+                number, prefix, price = line.split(",")
+                tree.insert(prefix, (names[int(number)], int(price)))
+        tree.save(shard_path(folder, key))
+        os.remove(text_path)
+
+    # the manifest is written last, so a build that stopped
+    # halfway leaves no manifest, & is redone next time.
+    indexfile.write_index(os.path.join(folder, MANIFEST), {
+        "keys": array("B", "\n".join(sorted(buffers)).encode()),
+        "digits": array("Q", [digits]),
+        "size": array("Q", [routes]),
+    }, list(carriers.values()))
+    remove_old_versions(root)
+    return folder
+
+
+class ShardedIndex(object):
+    def __init__(self, folder, keys, digits, size=0, max_shards=None,
+                 use_mmap=True):
+        """
+        Initialize a sharded index over the shard files in
+        folder. No shard is loaded until it is first needed.
+        """
+        self.folder = folder
+        self.keys = frozenset(keys)
+        self.digits = digits
+        self.max_shards = max_shards
+        self.use_mmap = use_mmap
+
+        # like the trees, size counts the routes (before they
+        # were split, so a short route is only counted once).
+        self.size = size
+
+        # {shard key: tree}, least recently used first.
+        self.shards = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.loads = 0
+        self.evictions = 0
+        _open_indexes.add(self)
+
+
+    @classmethod
+    def open(cls, folder, sources=None, max_shards=None, use_mmap=True):
+        """
+        Open the latest complete version of the shards saved in
+        folder, without loading any.
+        Return None if there are none yet, or if any of the
+        source route files has changed since they were built.
+        """
+        for version in reversed(versions(folder)):
+            path = version_path(folder, version)
+            if not os.path.exists(os.path.join(path, MANIFEST)):
+                continue
+            columns = indexfile.read_index(os.path.join(path, MANIFEST), sources)
+            if columns is None:
+                return None
+            keys = bytes(columns["keys"]).decode()
+            return cls(path, keys.split("\n") if keys else [],
+                       columns["digits"][0], columns["size"][0],
+                       max_shards, use_mmap)
+        return None
+
+
+    def __repr__(self):
+        """
+        Visually represent this index using a string.
+        Return the formatted string.
+        """
+        return (f"ShardedIndex({len(self.shards)}/{len(self.keys)} "
+                f"shards loaded, {self.size} routes)")
+
+
+    def shard(self, key):
+        """
+        Return the tree of a shard, loading it on first use.
+        Return None if no route starts with key.
+        """
+        if key not in self.keys:
+            return None
+        # without a cap the use order does not matter, so a
+        # loaded shard is returned without taking the lock.
+        tree = self.shards.get(key)
+        if tree is not None and not self.max_shards:
+            return tree
+        with self._lock:
+            tree = self.shards.get(key)
+            if tree is not None:
+                self.shards.move_to_end(key)
+                return tree
+
+            tree = FlatDecimalTree.load(
+                shard_path(self.folder, key), use_mmap=self.use_mmap)
+            if tree is None:
+                raise FileNotFoundError(shard_path(self.folder, key))
+            self.shards[key] = tree
+            self.loads += 1
+            # a lookup still running on an evicted shard keeps
+            # its own reference, so dropping ours is safe.
+            while self.max_shards and len(self.shards) > self.max_shards:
+                self.shards.popitem(last=False)
+                self.evictions += 1
+            return tree
+
+
+    def retire(self):
+        """
+        Load every shard that is not loaded yet, then delete the
+        version folder of this index. A lookup that is still
+        running on this index is then served from the loaded
+        (or mapped) shards, which outlive their files.
+        """
+        with self._lock:
+            # nothing may be evicted, as it could not be reloaded.
+            self.max_shards = None
+        for key in self.keys:
+            self.shard(key)
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+
+    def get_price(self, phone):
+        """
+        Find the longest matching prefix of a phone number.
+        Return its (carrier, price), or None if none match.
+        """
+        if not phone:
+            return None
+        tree = self.shard(phone_key(phone, self.digits))
+        return tree.get_price(phone) if tree is not None else None
+
+
+    def price_many(self, phones):
+        """
+        Find the longest matching prefix of many phone numbers.
+        Each shard prices its own numbers in one batch.
+        Return a list of (carrier, price) or None, in the same
+        order as the given phone numbers.
+        """
+        groups = {}
+        for index, phone in enumerate(phones):
+            if phone:
+                groups.setdefault(phone_key(phone, self.digits), []).append(index)
+
+        results = [None] * len(phones)
+        for key, indexes in groups.items():
+            tree = self.shard(key)
+            if tree is None:
+                continue
+            prices = tree.price_many([phones[index] for index in indexes])
+            for index, result in zip(indexes, prices):
+                results[index] = result
+        return results
+
+
+def retire_on_swap(old_engine, new_engine):
+    """
+    A LiveIndex listener: once a new version of a sharded index
+    is swapped in, retire the old one (see ShardedIndex.retire).
+    """
+    if (isinstance(old_engine, ShardedIndex)
+            and getattr(new_engine, "folder", None) != old_engine.folder):
+        old_engine.retire()
+
+
+def load_sharded(folder, carriers, digits=1, max_shards=None, use_mmap=True):
+    """
+    Open the shards of many carriers' route files, building
+    them first (in a new version folder) if they are missing
+    or stale. An index that is already open is never changed.
+    carriers is a dict of {carrier name: route file path}.
+    """
+    sources = list(carriers.values())
+    index = ShardedIndex.open(folder, sources, max_shards, use_mmap)
+    if index is None or index.digits != digits:
+        build_shards(folder, carriers, digits)
+        index = ShardedIndex.open(folder, sources, max_shards, use_mmap)
+    return index
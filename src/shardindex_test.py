@@ -0,0 +1,167 @@
+from decimaltree import DecimalSearchTree
+from fixedpoint import parse_micros
+from liveindex import LiveIndex
+import os
+import shardindex
+from shardindex import ShardedIndex
+import shutil
+import tempfile
+import threading
+import unittest
+
+
+ROUTES_A = '+1,0.5\n+1415,0.02\n+44,0.1\n+4420,0.07\n+86,0.3\n'
+ROUTES_B = '+1415,0.01\n+4,0.2\n+449,0.04\n'
+
+
+class ShardedIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.carriers = {}
+        for name, text in (('A', ROUTES_A), ('B', ROUTES_B)):
+            path = os.path.join(self.folder, name + '.txt')
+            with open(path, 'w') as file:
+                file.write(text)
+            self.carriers[name] = path
+        self.shards = os.path.join(self.folder, 'shards')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def reference(self):
+        tree = DecimalSearchTree()
+        for name, text in (('A', ROUTES_A), ('B', ROUTES_B)):
+            for line in text.splitlines():
+                prefix, price = line[1:].split(',')
+                tree.insert(prefix, (name, parse_micros(price)))
+        return tree
+
+    def test_shard_keys(self):
+        assert shardindex.shard_keys('4420', 2) == ['44']
+        assert shardindex.shard_keys('4', 2) == ['4' + d for d in '0123456789']
+        assert shardindex.shard_keys('4', 1) == ['4']
+
+    def test_matches_one_tree(self):
+        phones = ['14155550000', '1212', '442071234567', '4499', '4',
+                  '41', '8613800000000', '33123', '']
+        tree = self.reference()
+        for digits in (1, 2):
+            index = shardindex.load_sharded(self.shards, self.carriers, digits)
+            assert index.digits == digits
+            assert index.size == 8
+            for phone in phones:
+                assert index.get_price(phone) == tree.get_price(phone), phone
+            assert index.price_many(phones) == [tree.get_price(phone) for phone in phones]
+
+    def test_lazy_loading(self):
+        index = shardindex.load_sharded(self.shards, self.carriers, 2)
+        # Opening the index loads no shard at all
+        assert index.shards == {} and index.loads == 0
+        index.get_price('442071234567')
+        index.get_price('449')
+        assert list(index.shards) == ['44'] and index.loads == 1
+        # No route starts with 3, so nothing is loaded for it
+        assert index.get_price('33123') is None
+        assert index.loads == 1
+
+    def test_max_shards(self):
+        index = shardindex.load_sharded(self.shards, self.carriers, 2,
+                                        max_shards=2)
+        index.get_price('14155550000')
+        index.get_price('442071234567')
+        index.get_price('14155550000')
+        index.get_price('8613800000000')
+        # 44 was the least recently used shard
+        assert list(index.shards) == ['14', '86']
+        assert index.evictions == 1
+        assert index.get_price('4420') == ('A', 70000)
+        assert index.loads == 4
+
+    def test_stale_shards(self):
+        shardindex.build_shards(self.shards, self.carriers, 1)
+        sources = list(self.carriers.values())
+        assert ShardedIndex.open(self.shards, sources) is not None
+        with open(self.carriers['B'], 'a') as file:
+            file.write('+86,0.001\n')
+        assert ShardedIndex.open(self.shards, sources) is None
+        index = shardindex.load_sharded(self.shards, self.carriers, 1)
+        assert index.get_price('8613800000000') == ('B', 1000)
+
+    def test_versions(self):
+        first = shardindex.build_shards(self.shards, self.carriers, 1)
+        # A build that stopped halfway has no manifest, & is skipped
+        os.makedirs(shardindex.version_path(self.shards, 2))
+        index = ShardedIndex.open(self.shards)
+        assert index.folder == first
+        second = shardindex.build_shards(self.shards, self.carriers, 1)
+        # The open index still holds the first version
+        assert shardindex.versions(self.shards) == [1, 2]
+        assert second == shardindex.version_path(self.shards, 2)
+        assert ShardedIndex.open(self.shards).folder == second
+        # Once nothing holds them, older versions go with the next build
+        del index
+        third = shardindex.build_shards(self.shards, self.carriers, 1)
+        assert shardindex.versions(self.shards) == [3]
+        assert ShardedIndex.open(self.shards).folder == third
+
+    def test_rebuild_in_fresh_process(self):
+        for _ in range(2):
+            shardindex.build_shards(self.shards, self.carriers, 1)
+        # A later run finds the files changed, & rebuilds
+        with open(self.carriers['B'], 'a') as file:
+            file.write('+86,0.001\n')
+        index = shardindex.load_sharded(self.shards, self.carriers, 1)
+        assert shardindex.versions(self.shards) == [3]
+        assert index.get_price('8613800000000') == ('B', 1000)
+
+    def test_retire(self):
+        index = shardindex.load_sharded(self.shards, self.carriers, 2, max_shards=1)
+        index.get_price('14155550000')
+        index.retire()
+        assert not os.path.exists(index.folder)
+        # Every shard was loaded before the files were deleted
+        assert set(index.shards) == index.keys
+        assert index.get_price('4420') == ('A', 70000)
+
+    def test_reload_while_pricing(self):
+        live_index = LiveIndex(shardindex.load_sharded(
+            self.shards, self.carriers, 2, max_shards=1))
+        live_index.listeners.append(shardindex.retire_on_swap)
+        phones = ['14155550000', '442071234567', '8613800000000', '4499']
+        errors = []
+        done = threading.Event()
+
+        def price():
+            # max_shards=1 keeps loading shards from disk, while
+            # the reloads below build & delete versions.
+            while not done.is_set():
+                try:
+                    for phone in phones:
+                        assert live_index.get_price(phone) is not None
+                    live_index.price_many(phones)
+                except Exception as error:
+                    errors.append(error)
+                    return
+
+        thread = threading.Thread(target=price)
+        thread.start()
+        try:
+            for number in range(5):
+                with open(self.carriers['B'], 'a') as file:
+                    file.write(f'+86{number},0.00{number + 1}\n')
+                live_index.rebuild(lambda: shardindex.load_sharded(
+                    self.shards, self.carriers, 2, max_shards=1)).result()
+        finally:
+            done.set()
+            thread.join()
+            live_index.close()
+
+        assert errors == []
+        assert live_index.get_price('8624') == ('B', 3000)
+        # Only the version being served is left on disk
+        assert shardindex.versions(self.shards) == [6]
+
+
+if __name__ == '__main__':
+    unittest.main()
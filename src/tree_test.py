@@ -92,11 +92,11 @@ class DecimalSearchTreeTest(unittest.TestCase):
         """TODO: Modify this test after changing the input data"""
         tree = DecimalSearchTree()
         # Insert one item to the tree
-        tree.insert('00', ("hello", 1))
-        tree.insert('00', ("hello", 0.3))
+        tree.insert('00', ("hello", 1000000))
+        tree.insert('00', ("hello", 300000))
         child_node = tree.root.next[0]
         # Change the data since it is larger
-        assert child_node.next[0].data == ("hello", 0.3)
+        assert child_node.next[0].data == ("hello", 300000)
         tree.insert('01', ("hello", 34))
         assert child_node.next[1].data == ("hello", 34)
         # Doesn't change the data since it is larger
@@ -117,3 +117,49 @@ class DecimalSearchTreeTest(unittest.TestCase):
 
         assert tree.search('00') == ('hello', 1)
         assert tree.search('001') is None
+
+    def test_get_price(self):
+        tree = DecimalSearchTree()
+        tree.insert('1415', ('A', 20000))
+        tree.insert('1415234', ('A', 30000))
+        tree.insert('1415246', ('A', 10000))
+        tree.insert('1512', ('A', 40000))
+        # The deepest matching route wins, even if it costs more
+        assert tree.get_price('14152345678') == ('A', 30000)
+        assert tree.get_price('15124156620') == ('A', 40000)
+        # A route as long as the phone number itself still matches
+        assert tree.get_price('1415') == ('A', 20000)
+        assert tree.get_price('19876543210') is None
+
+    def test_trace(self):
+        tree = DecimalSearchTree()
+        tree.insert('1415', ('A', 20000))
+        tree.insert('1415234', ('B', 30000))
+        # 7 nodes are walked, & the 7 digit route matches
+        assert tree.trace('14152345678') == (('B', 30000), 7, 7)
+        # The walk goes on past the last route, until a dead end
+        assert tree.trace('14152') == (('A', 20000), 5, 4)
+        assert tree.trace('19876543210') == (None, 1, 0)
+
+    def test_price_many(self):
+        tree = DecimalSearchTree()
+        tree.insert('1415', ('A', 20000))
+        tree.insert('1415234', ('B', 30000))
+        tree.insert('1512', ('A', 40000))
+        phones = ['19876543210', '14152345678', '1415999', '15124156620',
+                  '14152345679', '1', '']
+        # Results come back in the input order, not sorted order
+        assert tree.price_many(phones) == [tree.get_price(p) for p in phones]
+        assert tree.price_many(phones)[:2] == [None, ('B', 30000)]
+
+    def test_rejects_non_digits(self):
+        tree = DecimalSearchTree()
+        tree.insert('1415', ('A', 20000))
+        # Like the other engines, a bad number is a ValueError, not a KeyError
+        for call in (tree.get_price, tree.trace, tree.contains, tree.price_many):
+            with self.assertRaises(ValueError):
+                call(['+14152345678'] if call == tree.price_many else '+14152345678')
+        with self.assertRaises(ValueError):
+            tree.get_price('1415-234')
+        with self.assertRaises(ValueError):
+            tree.insert('44 20', ('A', 10000))